@@ -10,8 +10,9 @@ setup(
         'console_scripts': [
             'dfs-namenode=src.namenode.server:main',
             'dfs-datanode=src.datanode.server:main',
-            'dfs-cli=src.client.cli:main',
+            'dfs-cli=src.client.daemon:main',
+            'dfs-balancer=src.namenode.balancer:main',
         ],
     },
-    python_requires='>=3.8',
+    python_requires='>=3.9',
 )
\ No newline at end of file
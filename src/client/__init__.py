@@ -1,6 +1,15 @@
 """
 Módulo del Cliente - Interfaz para interactuar con el DFS
 """
-from .cli import app as cli_app
 
-__all__ = ['cli_app']
\ No newline at end of file
+def __getattr__(name):
+    # La CLI se importa al usarse: el reenvío al daemon no carga typer ni grpc
+    if name == "cli_app":
+        from .cli import app
+        return app
+    if name == "DFSClient":
+        from .client import DFSClient
+        return DFSClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['cli_app', 'DFSClient']
@@ -0,0 +1,92 @@
+import json
+import os
+import time
+from typing import Dict, Optional
+
+MAX_ENTRIES = 1024  # Entradas máximas guardadas en disco
+
+def normalize(path: str) -> str:
+    return "/" + path.strip("/")
+
+def parent(path: str) -> str:
+    return normalize(os.path.dirname(normalize(path)))
+
+class MetadataCache:
+    """Caché de metadatos del NameNode (listados y ubicaciones de bloques).
+
+    Cada entrada vale lo que dura el lease que concede el NameNode, acotado
+    por ``ttl``. Con ``path`` la caché se comparte entre invocaciones de la
+    CLI a través de un archivo JSON; las mutaciones hechas por este cliente
+    invalidan la ruta afectada y el listado de su directorio padre.
+    """
+
+    def __init__(self, ttl: float, path: Optional[str] = None):
+        self.ttl = ttl
+        self.path = os.path.expanduser(path) if path else None
+        self.entries: Optional[Dict[str, dict]] = None
+        self.dirty = False
+
+    def _load(self) -> Dict[str, dict]:
+        if self.entries is None:
+            self.entries = {}
+            if self.path and self.ttl > 0:
+                try:
+                    with open(self.path, 'r') as f:
+                        self.entries = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return self.entries
+
+    @staticmethod
+    def key(route: str, path: str, params: dict = None) -> str:
+        query = "&".join(f"{name}={value}" for name, value in sorted((params or {}).items()) if value is not None)
+        return f"{route}:{normalize(path)}?{query}"
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._load().get(key)
+        if entry is None:
+            return None
+        if entry["expires"] <= time.time():
+            del self.entries[key]
+            self.dirty = True
+            return None
+        return entry["value"]
+
+    def put(self, key: str, path: str, value: dict, lease: float):
+        ttl = min(self.ttl, lease)
+        if ttl <= 0:
+            return
+        self._load()[key] = {"path": normalize(path), "expires": time.time() + ttl, "value": value}
+        self.dirty = True
+
+    def invalidate(self, path: str) -> int:
+        """Descarta los metadatos de ``path`` y el listado de su directorio; devuelve cuántos había"""
+        paths = {normalize(path), parent(path)}
+        entries = self._load()
+        stale = [key for key, entry in entries.items() if entry["path"] in paths]
+        for key in stale:
+            del entries[key]
+        self.dirty = self.dirty or bool(stale)
+        return len(stale)
+
+    def clear(self):
+        self.entries = {}
+        self.dirty = True
+
+    def save(self):
+        """Persiste las entradas vigentes; el reemplazo atómico evita archivos a medias"""
+        if not self.path or not self.dirty:
+            return
+        now = time.time()
+        entries = sorted(
+            ((key, entry) for key, entry in self._load().items() if entry["expires"] > now),
+            key=lambda item: item[1]["expires"]
+        )[-MAX_ENTRIES:]
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, 'w') as f:
+                json.dump(dict(entries), f)
+            os.replace(temporary, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Error saving metadata cache: {e}")
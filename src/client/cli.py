@@ -1,17 +1,43 @@
 import typer
-import requests
-import grpc
-import asyncio
+import atexit
+import importlib
 import os
+import itertools
+import shlex
+import signal
+import sys
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from pathlib import Path
-from typing import Optional
-from ..proto import dfs_pb2, dfs_pb2_grpc
-from ..common.config import Config
+from typing import List, Optional, Tuple
+from ..common.checksum import content_digest
+from ..common.lazy import LazyObject
+from . import daemon
+from .cache import MetadataCache
+from .transfer import (
+    grpc, requests, dfs_pb2, compression, file_chunks, stream_blocks, upload, renew_lease, plan_reads, read_piece,
+    pack_batches, pack_files, DIGEST_BATCH
+)
 
 app = typer.Typer()
-config = Config.load()
 SESSION_PATH_FILE = os.path.expanduser("~/.dfs_client_path")
 
+def create_metadata_cache() -> MetadataCache:
+    cache = MetadataCache(config.CLIENT_CACHE_TTL, config.CLIENT_CACHE_FILE)
+    atexit.register(cache.save)
+    return cache
+
+def create_session():
+    """Sesión HTTP con conexiones persistentes al NameNode (se reutilizan en shell y daemon)"""
+    return requests.Session()
+
+# La configuración se lee en el primer acceso: pwd no carga el YAML
+config = LazyObject(lambda: importlib.import_module("src.common.config").Config.load())
+metadata_cache = LazyObject(create_metadata_cache)
+http = LazyObject(create_session)
+
 def load_current_path():
     if os.path.exists(SESSION_PATH_FILE):
         with open(SESSION_PATH_FILE, 'r') as f:
@@ -24,20 +50,43 @@ def save_current_path(path):
 
 current_path = load_current_path()
 
+def namenode_get(route: str, path: str, params: dict = None) -> Tuple[int, dict]:
+    """Consulta metadatos al NameNode pasando por la caché; devuelve (código HTTP, JSON)"""
+    key = metadata_cache.key(route, path, params)
+    cached = metadata_cache.get(key)
+    if cached is not None:
+        return 200, cached
+    response = http.get(
+        f"http://{config.NAMENODE_HOST}:{config.NAMENODE_PORT}/{route}/{path}",
+        params={name: value for name, value in (params or {}).items() if value is not None}
+    )
+    body = response.json()
+    if response.status_code == 200:
+        metadata_cache.put(key, path, body, body.get("lease", 0))
+    return response.status_code, body
+
 @app.command()
 def ls(path: Optional[str] = None):
     """Lista el contenido de un directorio"""
     target_path = path if path else current_path
-    response = requests.get(f"http://{config.NAMENODE_HOST}:{config.NAMENODE_PORT}/ls/{target_path}")
-    if response.status_code == 200:
-        contents = response.json()["contents"]
-        for name, type_ in contents.items():
-            if type_ == "file":
-                typer.echo(f"FILE\t{name}")
+    if not target_path.startswith("/"):
+        target_path = str(Path(current_path) / target_path)
+
+    # El NameNode devuelve el directorio por páginas
+    start_after = None
+    while True:
+        status, listing = namenode_get("ls", target_path, {"start_after": start_after})
+        if status != 200:
+            typer.echo(f"Error: {listing['detail']}")
+            return
+        for entry in listing["entries"]:
+            if entry["type"] == "file":
+                typer.echo(f"FILE\t{entry['name']}\t{entry['size']}")
             else:
-                typer.echo(f"DIR\t{name}/")
-    else:
-        typer.echo(f"Error: {response.json()['detail']}")
+                typer.echo(f"DIR\t{entry['name']}/")
+        start_after = listing["next"]
+        if not start_after:
+            break
 
 @app.command()
 def cd(path: str):
@@ -48,8 +97,9 @@ def cd(path: str):
     else:
         new_path = str(Path(current_path) / path)
     
-    response = requests.get(f"http://{config.NAMENODE_HOST}:{config.NAMENODE_PORT}/ls/{new_path}")
-    if response.status_code == 200:
+    # Basta con la cabecera del listado para saber si es un directorio
+    status, listing = namenode_get("ls", new_path, {"limit": 0})
+    if status == 200 and listing["type"] == "directory":
         current_path = new_path
         save_current_path(current_path)
         typer.echo(f"Directorio actual: {current_path}")
@@ -62,10 +112,11 @@ def mkdir(path: str):
     if not path.startswith("/"):
         path = str(Path(current_path) / path)
     
-    response = requests.post(
+    response = http.post(
         f"http://{config.NAMENODE_HOST}:{config.NAMENODE_PORT}/directory",
         params={"path": path}
     )
+    metadata_cache.invalidate(path)
     if response.status_code == 200:
         typer.echo(f"Directorio creado: {path}")
     else:
@@ -77,10 +128,11 @@ def rmdir(path: str):
     if not path.startswith("/"):
         path = str(Path(current_path) / path)
     
-    response = requests.delete(
+    response = http.delete(
         f"http://{config.NAMENODE_HOST}:{config.NAMENODE_PORT}/directory",
         params={"path": path}
     )
+    metadata_cache.invalidate(path)
     if response.status_code == 200:
         typer.echo(f"Directorio eliminado: {path}")
     else:
@@ -92,107 +144,396 @@ def rm(path: str):
     if not path.startswith("/"):
         path = str(Path(current_path) / path)
     
-    response = requests.delete(
+    response = http.delete(
         f"http://{config.NAMENODE_HOST}:{config.NAMENODE_PORT}/files",
         params={"path": path}
     )
+    metadata_cache.invalidate(path)
     if response.status_code == 200:
         typer.echo(f"Archivo eliminado: {path}")
     else:
         typer.echo(f"Error: {response.json()['detail']}")
 
 @app.command()
-def put(local_path: str, dfs_path: str):
-    """Sube un archivo al DFS"""
+def put(local_path: str, dfs_path: str, workers: Optional[int] = None, ec_policy: Optional[str] = None,
+        codec: Optional[str] = None, dedup: bool = False):
+    """Sube un archivo al DFS ("-" lee de la entrada estándar); --codec zstd|lz4|zlib lo comprime.
+
+    Con --dedup solo se suben los bloques cuyo contenido no está ya en el clúster.
+    """
     if not dfs_path.startswith("/"):
         dfs_path = str(Path(current_path) / dfs_path)
+    namenode_url = f"http://{config.NAMENODE_HOST}:{config.NAMENODE_PORT}"
+    if dedup and (ec_policy or codec):
+        typer.echo("Error: La deduplicación solo admite archivos replicados y sin compresión")
+        return
+    if codec:
+        try:
+            compression.require_codec(codec)
+        except ValueError as e:
+            typer.echo(f"Error: {e}")
+            return
+    # El archivo local se abre antes de crear el remoto: si no se puede leer no queda nada en construcción
+    fd = None
+    if local_path != "-":
+        try:
+            fd = os.open(local_path, os.O_RDONLY)
+        except OSError as e:
+            typer.echo(f"Error: {e}")
+            return
     
-    file_size = Path(local_path).stat().st_size
-    
-    # Solicitar asignación de bloques al NameNode
-    response = requests.post(
-        f"http://{config.NAMENODE_HOST}:{config.NAMENODE_PORT}/files",
-        params={"filename": dfs_path, "size": file_size}
-    )
-    
+    # Crear el archivo en construcción; los bloques se piden a medida que se suben
+    params = {"filename": dfs_path}
+    if ec_policy:
+        params["ec_policy"] = ec_policy
+    if codec:
+        params["codec"] = codec
+    response = http.post(f"{namenode_url}/files/open", params=params)
+    metadata_cache.invalidate(dfs_path)
     if response.status_code != 200:
         typer.echo(f"Error: {response.json()['detail']}")
+        if fd is not None:
+            os.close(fd)
         return
-    
-    blocks = response.json()["blocks"]
-    
-    # Transferir bloques a los DataNodes
-    with open(local_path, 'rb') as f:
-        for block in blocks:
-            # Conectar con el leader DataNode
-            channel = grpc.insecure_channel(block["leader"]["address"])
-            stub = dfs_pb2_grpc.FileServiceStub(channel)
-            
-            # Leer y enviar el bloque
-            chunk_size = config.BLOCK_SIZE
-            while chunk := f.read(chunk_size):
-                response = stub.PutBlock(iter([
-                    dfs_pb2.BlockData(
-                        block_id=block["block_id"],
-                        data=chunk,
-                        replica_nodes=[node["address"] for node in block["followers"]]
+    lease_id = response.json()["lease_id"]
+    block_size = response.json()["block_size"]
+    # Con erasure coding cada "bloque" es un grupo de celdas de datos y paridad
+    policy = response.json().get("ec_policy")
+    workers = workers or config.TRANSFER_WORKERS
+
+    if fd is None:
+        source = stream_blocks(sys.stdin.buffer, block_size, config.CHUNK_SIZE)
+        total_blocks = "?"
+    else:
+        file_size = os.fstat(fd).st_size
+        source = (
+            (file_chunks(fd, offset, min(block_size, file_size - offset), config.CHUNK_SIZE),
+             min(block_size, file_size - offset))
+            for offset in range(0, file_size, block_size)
+        )
+        total_blocks = -(-file_size // block_size)
+
+    stop_renewal = threading.Event()
+    threading.Thread(target=renew_lease, args=(http, namenode_url, dfs_path, lease_id, stop_renewal), daemon=True).start()
+
+    def finished(future, futures) -> bool:
+        """Informa el resultado de un bloque; False si falló"""
+        index, block, length = futures.pop(future)
+        try:
+            result, elapsed = future.result()
+        except grpc.RpcError as e:
+            result, elapsed = dfs_pb2.BlockResponse(success=False, message=e.details()), 0
+        if not result.success:
+            typer.echo(f"Error al escribir bloque {block['block_id']}: {result.message}")
+            return False
+        elapsed = max(elapsed, 1e-6)
+        target = f"{len(block['cells'])} DataNodes" if policy else block['leader']['node_id']
+        typer.echo(
+            f"Bloque {index + 1}/{total_blocks} subido a {target}: "
+            f"{length / 2**20:.1f} MB en {elapsed:.2f}s ({length / 2**20 / elapsed:.1f} MB/s)"
+        )
+        if result.message:
+            typer.echo(f"Advertencia: {result.message}")
+        return True
+
+    # Transferir varios bloques a la vez, cada uno a su propio leader
+    start = time.monotonic()
+    total_size = 0
+    deduplicated = 0
+    ok = True
+    # Con dedup los digests se envían por lotes. De un archivo local solo se guarda el digest
+    # y el bloque se vuelve a leer al subirlo; de la entrada estándar el lote queda en memoria.
+    hashed = []
+    digest_batch = DIGEST_BATCH if fd is not None else workers
+
+    def add_digests(executor, futures) -> bool:
+        """Registra los digests pendientes y encola la subida de los bloques que faltan; False si falló"""
+        nonlocal total_size, deduplicated
+        batch = hashed[:]
+        hashed.clear()
+        if not batch:
+            return True
+        response = http.post(
+            f"{namenode_url}/files/adddigests",
+            json={"filename": dfs_path, "lease_id": lease_id, "digests": [digest for _, _, _, digest in batch]}
+        )
+        if response.status_code != 200:
+            typer.echo(f"Error: {response.json()['detail']}")
+            return False
+        for (index, chunks, length, _), block in zip(batch, response.json()["blocks"]):
+            total_size += length
+            if block["exists"]:
+                deduplicated += 1
+                typer.echo(f"Bloque {index + 1}/{total_blocks} ya almacenado en el clúster, no se sube")
+                continue
+            if fd is not None:
+                chunks = file_chunks(fd, index * block_size, length, config.CHUNK_SIZE)
+            future = executor.submit(upload, block, chunks, length)
+            futures[future] = (index, block, length)
+        return True
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            allocated = []
+            for index, (chunks, length) in enumerate(source):
+                # Limitar los bloques en vuelo también acota la memoria al leer de un stream
+                while len(futures) >= workers and ok:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    ok = all([finished(future, futures) for future in done])
+                if not ok:
+                    break
+                if dedup:
+                    # El bloque se identifica por su contenido: solo se sube si el clúster no lo tiene
+                    if fd is None:
+                        chunks = list(chunks)
+                    hashed.append((index, chunks, length, content_digest(chunks)))
+                    if len(hashed) >= digest_batch:
+                        ok = add_digests(executor, futures)
+                        if not ok:
+                            break
+                    continue
+                if not allocated:
+                    response = http.post(
+                        f"{namenode_url}/files/addblock",
+                        params={"filename": dfs_path, "lease_id": lease_id, "count": workers}
                     )
-                ]))
-                
-                if not response.success:
-                    typer.echo(f"Error al escribir bloque: {response.message}")
-                    return
+                    if response.status_code != 200:
+                        typer.echo(f"Error: {response.json()['detail']}")
+                        ok = False
+                        break
+                    allocated.extend(response.json()["blocks"])
+                block = allocated.pop(0)
+                future = executor.submit(upload, block, chunks, length, policy, codec)
+                futures[future] = (index, block, length)
+                total_size += length
 
-    typer.echo(f"Archivo subido exitosamente: {dfs_path}")
+            if ok:
+                ok = add_digests(executor, futures)
+            for future in as_completed(list(futures)):
+                ok = finished(future, futures) and ok
+    except BaseException:
+        # Un error de lectura local o una interrupción también descartan el archivo remoto
+        http.delete(f"{namenode_url}/files", params={"path": dfs_path})
+        raise
+    finally:
+        stop_renewal.set()
+        if fd is not None:
+            os.close(fd)
+
+    if not ok:
+        # Descartar el archivo incompleto y sus bloques
+        http.delete(f"{namenode_url}/files", params={"path": dfs_path})
+        return
+
+    response = http.post(
+        f"{namenode_url}/files/complete",
+        params={"filename": dfs_path, "lease_id": lease_id, "size": total_size}
+    )
+    metadata_cache.invalidate(dfs_path)
+    if response.status_code != 200:
+        typer.echo(f"Error: {response.json()['detail']}")
+        return
+
+    elapsed = max(time.monotonic() - start, 1e-6)
+    typer.echo(
+        f"Archivo subido exitosamente: {dfs_path} "
+        f"({total_size / 2**20:.1f} MB en {elapsed:.2f}s, {total_size / 2**20 / elapsed:.1f} MB/s)"
+    )
+    if deduplicated:
+        typer.echo(f"{deduplicated} bloques ya estaban en el clúster y no se transfirieron")
 
 @app.command()
-def get(dfs_path: str, local_path: str):
+def pack(local_dir: str, dfs_dir: str, threshold: Optional[int] = None, workers: Optional[int] = None):
+    """Sube un directorio; los archivos menores que --threshold bytes se empaquetan en bloques contenedores"""
+    if not dfs_dir.startswith("/"):
+        dfs_dir = str(Path(current_path) / dfs_dir)
+    if not os.path.isdir(local_dir):
+        typer.echo(f"Error: {local_dir} no es un directorio")
+        return
+    namenode_url = f"http://{config.NAMENODE_HOST}:{config.NAMENODE_PORT}"
+    threshold = config.SMALL_FILE_THRESHOLD if threshold is None else threshold
+    workers = workers or config.TRANSFER_WORKERS
+
+    small, large = [], []
+    for root, _, names in os.walk(local_dir):
+        for name in sorted(names):
+            local_path = os.path.join(root, name)
+            dfs_path = str(Path(dfs_dir) / os.path.relpath(local_path, local_dir))
+            size = os.path.getsize(local_path)
+            # Los archivos vacíos no ocupan bloques: se crean como cualquier otro
+            if 0 < size < threshold:
+                small.append((local_path, dfs_path, size))
+            else:
+                large.append((local_path, dfs_path))
+
+    def pack_batch(batch) -> dict:
+        files = []
+        for local_path, dfs_path, _ in batch:
+            with open(local_path, 'rb') as f:
+                files.append((dfs_path, f.read()))
+        return pack_files(http, namenode_url, files, config.CHUNK_SIZE)
+
+    # Cada contenedor ocupa como mucho un bloque y se sube con una sola escritura
+    start = time.monotonic()
+    packed = packed_size = containers = 0
+    batches = list(pack_batches(small, config.BLOCK_SIZE, size=lambda item: item[2]))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(pack_batch, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                result = future.result()
+            except OSError as e:
+                typer.echo(f"Error al empaquetar {len(batch)} archivos: {e}")
+                continue
+            containers += 1
+            packed += result["files"]
+            packed_size += result["size"]
+            typer.echo(f"Contenedor {result['block_id']}: {result['files']} archivos, {result['size'] / 2**20:.1f} MB")
+    metadata_cache.clear()
+
+    elapsed = max(time.monotonic() - start, 1e-6)
+    if batches:
+        typer.echo(
+            f"{packed} archivos pequeños empaquetados en {containers} contenedores "
+            f"({packed_size / 2**20:.1f} MB en {elapsed:.2f}s, {packed / elapsed:.0f} archivos/s)"
+        )
+    for local_path, dfs_path in large:
+        put(local_path, dfs_path, workers)
+
+def fetch_file_info(dfs_path: str, err: bool = False) -> Optional[dict]:
+    """Metadatos de un archivo listo para leer; informa el error y devuelve None si no lo es"""
+    status, file_info = namenode_get("files", dfs_path)
+    if status != 200:
+        typer.echo(f"Error: {file_info['detail']}", err=err)
+        return None
+    if file_info.get("codec"):
+        try:
+            compression.require_codec(file_info["codec"])
+        except ValueError as e:
+            typer.echo(f"Error: {e}", err=err)
+            return None
+    return file_info
+
+def download_file(dfs_path: str, local_path: str, workers: Optional[int], split: bool) -> Optional[bool]:
+    """Descarga un archivo del DFS; False si no pudo recuperarse algún bloque, None si no hay metadatos"""
+    file_info = fetch_file_info(dfs_path)
+    if file_info is None:
+        return None
+    file_size = file_info["size"]
+    workers = workers or config.TRANSFER_WORKERS
+    reads = plan_reads(file_info, 0, file_size, split)
+
+    # Preasignar el archivo local y escribir cada rango en su posición
+    start = time.monotonic()
+    fd = os.open(local_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        if hasattr(os, 'posix_fallocate') and file_size > 0:
+            os.posix_fallocate(fd, 0, file_size)
+        os.ftruncate(fd, file_size)
+
+        def write(data, position: int):
+            os.pwrite(fd, data, position)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(function, write, block, *args): block for block, _, _, function, args in reads}
+            for future in as_completed(futures):
+                block = futures[future]
+                if future.result() is None:
+                    typer.echo(f"Error: No se pudo recuperar el bloque {block['block_id']}")
+                    for pending in futures:
+                        pending.cancel()
+                    return False
+    finally:
+        os.close(fd)
+
+    elapsed = max(time.monotonic() - start, 1e-6)
+    typer.echo(
+        f"Archivo descargado exitosamente: {local_path} "
+        f"({file_size / 2**20:.1f} MB en {elapsed:.2f}s, {file_size / 2**20 / elapsed:.1f} MB/s)"
+    )
+    return True
+
+@app.command()
+def get(dfs_path: str, local_path: str, workers: Optional[int] = None, split: bool = False):
     """Descarga un archivo del DFS"""
     if not dfs_path.startswith("/"):
         dfs_path = str(Path(current_path) / dfs_path)
-    
-    # Obtener metadata del archivo
-    response = requests.get(
-        f"http://{config.NAMENODE_HOST}:{config.NAMENODE_PORT}/files/{dfs_path}"
-    )
-    
+    if download_file(dfs_path, local_path, workers, split) is False and metadata_cache.invalidate(dfs_path):
+        # Las ubicaciones en caché pudieron quedar obsoletas: se reintenta con metadatos frescos
+        typer.echo("Reintentando con metadatos actualizados del NameNode")
+        download_file(dfs_path, local_path, workers, split)
+
+def parse_range(spec: str, size: int) -> Tuple[int, int]:
+    """Convierte un rango estilo HTTP (``inicio-fin`` inclusivo, ``inicio-`` o ``-últimos``) en (offset, bytes)"""
+    first, separator, last = spec.partition("-")
+    if not separator or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+        raise ValueError(f"Rango inválido: {spec} (use inicio-fin, inicio- o -bytes)")
+    if not first:
+        length = min(int(last), size)
+        return size - length, length
+    offset = int(first)
+    end = size if not last else min(int(last) + 1, size)
+    if not last or int(last) >= offset:
+        return min(offset, size), max(end - offset, 0)
+    raise ValueError(f"Rango inválido: {spec} (el fin es menor que el inicio)")
+
+@app.command()
+def cat(dfs_path: str, workers: Optional[int] = None,
+        byte_range: Optional[str] = typer.Option(None, "--range", help="Bytes a leer: inicio-fin, inicio- o -últimos")):
+    """Escribe un archivo o un rango de bytes en la salida estándar leyendo solo los bloques necesarios"""
+    if not dfs_path.startswith("/"):
+        dfs_path = str(Path(current_path) / dfs_path)
+    # La salida estándar lleva los datos: los errores van a stderr
+    file_info = fetch_file_info(dfs_path, err=True)
+    if file_info is None:
+        raise typer.Exit(1)
+    try:
+        offset, length = parse_range(byte_range, file_info["size"]) if byte_range else (0, file_info["size"])
+    except ValueError as e:
+        typer.echo(f"Error: {e}", err=True)
+        raise typer.Exit(2)
+    workers = workers or config.TRANSFER_WORKERS
+
+    # Las piezas se descargan en paralelo pero se escriben en orden, con a lo sumo ``workers`` en memoria
+    reads = iter(plan_reads(file_info, offset, length))
+    out = sys.stdout.buffer
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque(
+            (read[0], executor.submit(read_piece, *read)) for read in itertools.islice(reads, workers)
+        )
+        while pending:
+            block, future = pending.popleft()
+            data = future.result()
+            if data is None:
+                for _, other in pending:
+                    other.cancel()
+                # Las ubicaciones en caché pudieron quedar obsoletas
+                metadata_cache.invalidate(dfs_path)
+                typer.echo(f"Error: No se pudo recuperar el bloque {block['block_id']}", err=True)
+                raise typer.Exit(1)
+            out.write(data)
+            for read in itertools.islice(reads, 1):
+                pending.append((read[0], executor.submit(read_piece, *read)))
+    out.flush()
+
+@app.command()
+def ec(path: str, policy: Optional[str] = None, unset: bool = False):
+    """Muestra o fija la política de erasure coding de un directorio (p. ej. RS-6-3-1024k)"""
+    if not path.startswith("/"):
+        path = str(Path(current_path) / path)
+    namenode_url = f"http://{config.NAMENODE_HOST}:{config.NAMENODE_PORT}"
+
+    if policy or unset:
+        response = http.post(f"{namenode_url}/ecpolicy", params={"path": path, "policy": policy or ""})
+        metadata_cache.invalidate(path)
+    else:
+        response = http.get(f"{namenode_url}/ecpolicy/{path}")
     if response.status_code != 200:
         typer.echo(f"Error: {response.json()['detail']}")
         return
-    
-    file_info = response.json()
-    
-    # Descargar bloques
-    with open(local_path, 'wb') as f:
-        for block in file_info["blocks"]:
-            # Intentar con el leader primero
-            success = False
-            nodes = [block["leader"]] + block["followers"]
-            
-            for node in nodes:
-                try:
-                    channel = grpc.insecure_channel(node["address"])
-                    stub = dfs_pb2_grpc.FileServiceStub(channel)
-                    
-                    # Obtener bloque
-                    response = stub.GetBlock(dfs_pb2.BlockRequest(
-                        block_id=block["block_id"]
-                    ))
-                    
-                    # Escribir datos
-                    for chunk in response:
-                        f.write(chunk.data)
-                    
-                    success = True
-                    break
-                except Exception as e:
-                    continue
-            
-            if not success:
-                typer.echo(f"Error: No se pudo recuperar el bloque {block['block_id']}")
-                return
-
-    typer.echo(f"Archivo descargado exitosamente: {local_path}")
+    typer.echo(f"{path}: {response.json()['ec_policy'] or 'replicación'}")
 
 @app.command()
 def pwd():
@@ -201,7 +542,72 @@ def pwd():
     current_path = load_current_path()
     typer.echo(f"Directorio actual: {current_path}")
 
-# Cambio para forzar commit en git
+def run_command(args: List[str], out=None, err=None) -> int:
+    """Ejecuta un comando de la CLI en este proceso y devuelve su código de salida"""
+    from contextlib import redirect_stderr, redirect_stdout
+    with redirect_stdout(out or sys.stdout), redirect_stderr(err or sys.stderr):
+        try:
+            app(args=args, prog_name="dfs")
+            status = 0
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 0 if e.code is None else 1
+        except KeyboardInterrupt:
+            status = 130
+        metadata_cache.save()
+    return status
+
+@app.command()
+def shell():
+    """Abre una sesión interactiva que mantiene conexiones, cachés y directorio actual"""
+    try:
+        import readline  # noqa: F401 - historial y edición de líneas
+    except ImportError:
+        pass
+    while True:
+        try:
+            line = input(f"dfs:{current_path}> ")
+        except EOFError:
+            typer.echo()
+            break
+        except KeyboardInterrupt:
+            typer.echo()
+            continue
+        try:
+            args = shlex.split(line)
+        except ValueError as e:
+            typer.echo(f"Error: {e}")
+            continue
+        if not args:
+            continue
+        if args[0] in ("exit", "quit"):
+            break
+        if args[0] in ("shell", "daemon"):
+            typer.echo(f"Error: {args[0]} no está disponible dentro de la sesión")
+            continue
+        run_command(args)
+
+@app.command("daemon")
+def run_daemon(socket_path: str = daemon.SOCKET_PATH):
+    """Atiende los comandos de otras invocaciones de la CLI por un socket Unix"""
+    def run(args: List[str], out, err) -> int:
+        if args and args[0] in ("shell", "daemon"):
+            err.write(f"Error: {args[0]} no puede ejecutarse en el daemon\n")
+            return 2
+        return run_command(args, out, err)
+
+    # Con SIGTERM también se borra el socket al salir
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    typer.echo(f"Daemon del cliente escuchando en {socket_path}")
+    try:
+        daemon.serve(run, socket_path)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        typer.echo(f"Error: {e}")
+        raise typer.Exit(1)
+
+def main():
+    app(prog_name="dfs")
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    daemon.main()
\ No newline at end of file
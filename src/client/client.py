@@ -0,0 +1,418 @@
+import io
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from ..common.checksum import content_digest
+from ..common.config import Config
+from .cache import MetadataCache, normalize
+from .transfer import (
+    grpc, requests, compression, plan_reads, read_piece, renew_lease, upload, pack_batches, pack_files
+)
+
+READ_BUFFER_SIZE = 8 * 1024 * 1024  # Bytes de cada lectura remota del lector (sin cruzar bloques)
+PREFETCH_DEPTH = 2  # Segmentos leídos por adelantado mientras la lectura sea secuencial
+
+def raise_for_status(response) -> dict:
+    """Devuelve el JSON de una respuesta del NameNode o lanza la excepción que corresponde a su código"""
+    try:
+        body = response.json()
+    except ValueError:
+        body = {"detail": response.text}
+    if response.status_code == 200:
+        return body
+    detail = body.get("detail", f"HTTP {response.status_code}")
+    if response.status_code == 404:
+        raise FileNotFoundError(detail)
+    if response.status_code == 400:
+        raise ValueError(detail)
+    raise OSError(detail)
+
+class DFSClient:
+    """Cliente del DFS para programas Python.
+
+    ``open`` devuelve objetos ``io.RawIOBase``: los lectores admiten ``seek`` y
+    leen por adelantado los segmentos siguientes, y los escritores suben cada
+    bloque en segundo plano mientras se llena el siguiente. Las rutas son
+    absolutas; el cliente puede usarse desde varios hilos.
+
+        with DFSClient() as dfs:
+            with dfs.open("/datos/log.csv", "rb") as f:
+                f.seek(-1024, io.SEEK_END)
+                footer = f.read()
+    """
+
+    def __init__(self, config: Optional[Config] = None, workers: Optional[int] = None):
+        self.config = config or Config.load()
+        self.url = f"http://{self.config.NAMENODE_HOST}:{self.config.NAMENODE_PORT}"
+        self.workers = workers or self.config.TRANSFER_WORKERS
+        self.session = requests.Session()
+        self.cache = MetadataCache(self.config.CLIENT_CACHE_TTL)
+        self.cache_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dfs")
+
+    def _request(self, method: str, route: str, body: Optional[dict] = None, **params) -> dict:
+        response = self.session.request(method, f"{self.url}/{route}", params=params, json=body)
+        return raise_for_status(response)
+
+    def _invalidate(self, path: str):
+        with self.cache_lock:
+            self.cache.invalidate(path)
+
+    def stat(self, path: str) -> dict:
+        """Metadatos y ubicaciones de bloques de un archivo"""
+        path = normalize(path)
+        key = self.cache.key("files", path)
+        with self.cache_lock:
+            info = self.cache.get(key)
+        if info is None:
+            info = self._request("GET", f"files/{path}")
+            with self.cache_lock:
+                self.cache.put(key, path, info, info.get("lease", 0))
+        return info
+
+    def listdir(self, path: str = "/") -> List[dict]:
+        """Entradas de un directorio (resúmenes de archivos y subdirectorios)"""
+        entries = []
+        start_after = None
+        while True:
+            params = {"start_after": start_after} if start_after else {}
+            listing = self._request("GET", f"ls/{normalize(path)}", **params)
+            entries.extend(listing["entries"])
+            start_after = listing["next"]
+            if not start_after:
+                return entries
+
+    def mkdir(self, path: str):
+        self._request("POST", "directory", path=normalize(path))
+        self._invalidate(path)
+
+    def rmdir(self, path: str):
+        self._request("DELETE", "directory", path=normalize(path))
+        self._invalidate(path)
+
+    def remove(self, path: str):
+        self._request("DELETE", "files", path=normalize(path))
+        self._invalidate(path)
+
+    def pack(self, files: Iterable[Tuple[str, bytes]]) -> int:
+        """Crea archivos pequeños ``(ruta, datos)`` empaquetándolos en bloques contenedores.
+
+        Cada contenedor se sube en paralelo con una sola escritura y sus
+        archivos aparecen juntos al confirmarlo. Devuelve cuántos archivos se
+        crearon; si un contenedor falla se lanza OSError tras esperar al resto.
+        """
+        files = [(normalize(path), bytes(data)) for path, data in files]
+        for path, data in files:
+            if len(data) > self.config.BLOCK_SIZE:
+                raise ValueError(f"{path} no cabe en un contenedor ({len(data)} bytes)")
+        batches = pack_batches(files, self.config.BLOCK_SIZE, size=lambda item: len(item[1]))
+        futures = [
+            self.executor.submit(pack_files, self.session, self.url, batch, self.config.CHUNK_SIZE)
+            for batch in batches
+        ]
+        created = 0
+        error = None
+        for future in futures:
+            try:
+                created += future.result()["files"]
+            except OSError as e:
+                error = error or e
+        with self.cache_lock:
+            for path, _ in files:
+                self.cache.invalidate(path)
+        if error is not None:
+            raise error
+        return created
+
+    def open(self, path: str, mode: str = "rb", buffer_size: int = READ_BUFFER_SIZE,
+             prefetch: int = PREFETCH_DEPTH, ec_policy: Optional[str] = None, codec: Optional[str] = None,
+             dedup: bool = False):
+        """Abre un archivo para lectura (``rb``) o para crearlo (``wb``); el DFS no admite modificarlos.
+
+        Con ``dedup`` el escritor solo sube los bloques cuyo contenido no está ya en el clúster.
+        """
+        if mode == "rb":
+            info = self.stat(path)
+            if info.get("codec"):
+                compression.require_codec(info["codec"])
+            return DFSReader(self, info, buffer_size, prefetch)
+        if mode == "wb":
+            return DFSWriter(self, normalize(path), ec_policy, codec, dedup)
+        raise ValueError(f"Modo no soportado: {mode} (use 'rb' o 'wb')")
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class DFSReader(io.RawIOBase):
+    """Lector de acceso aleatorio sobre un archivo del DFS.
+
+    El archivo se lee por segmentos de ``buffer_size`` bytes alineados dentro
+    de cada bloque. Mientras las lecturas son secuenciales se piden por
+    adelantado los ``prefetch`` segmentos siguientes; un ``seek`` a otra zona
+    descarta esas lecturas. Los bloques comprimidos se leen completos porque
+    sus frames solo se decodifican desde el principio.
+    """
+
+    def __init__(self, client: DFSClient, info: dict, buffer_size: int = READ_BUFFER_SIZE,
+                 prefetch: int = PREFETCH_DEPTH):
+        super().__init__()
+        self.client = client
+        self.info = info
+        self.name = info["name"]
+        self.size = info["size"]
+        self.block_size = info["block_size"]
+        self.segment_size = self.block_size if info.get("codec") else min(buffer_size, self.block_size)
+        self.prefetch = prefetch
+        self.position = 0
+        self.buffer = memoryview(b"")
+        self.buffer_start = 0
+        self.pending: Dict[int, Future] = {}
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"whence inválido: {whence}")
+        if position < 0:
+            raise ValueError(f"Posición negativa: {position}")
+        self.position = position
+        return position
+
+    def _segment(self, position: int):
+        """Inicio y longitud del segmento que contiene ``position``"""
+        block_start = position - position % self.block_size
+        start = position - (position - block_start) % self.segment_size
+        return start, min(self.segment_size, block_start + self.block_size - start, self.size - start)
+
+    def _read(self, start: int, length: int) -> bytes:
+        parts = []
+        for read in plan_reads(self.info, start, length):
+            data = read_piece(*read)
+            if data is None:
+                raise OSError(f"No se pudo recuperar el bloque {read[0]['block_id']} de {self.name}")
+            parts.append(data)
+        return parts[0] if len(parts) == 1 else b"".join(parts)
+
+    def _submit(self, start: int) -> Future:
+        future = self.pending.pop(start, None)
+        if future is None:
+            future = self.client.executor.submit(self._read, *self._segment(start))
+        return future
+
+    def _load(self, position: int):
+        """Deja en el buffer el segmento de ``position``, leyendo por adelantado si la lectura es secuencial"""
+        start, length = self._segment(position)
+        sequential = start in self.pending or start == self.buffer_start + len(self.buffer)
+        future = self._submit(start)
+        if sequential:
+            ahead = start + length
+            for _ in range(self.prefetch):
+                if ahead >= self.size:
+                    break
+                if ahead not in self.pending:
+                    self.pending[ahead] = self.client.executor.submit(self._read, *self._segment(ahead))
+                ahead += self._segment(ahead)[1]
+        else:
+            # Acceso aleatorio: las lecturas anticipadas ya no sirven
+            for stale in self.pending.values():
+                stale.cancel()
+            self.pending.clear()
+        self.buffer = memoryview(future.result())
+        self.buffer_start = start
+
+    def readinto(self, b) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        if self.position >= self.size:
+            return 0
+        if not self.buffer_start <= self.position < self.buffer_start + len(self.buffer):
+            self._load(self.position)
+        offset = self.position - self.buffer_start
+        view = memoryview(b).cast("B")
+        count = min(len(view), len(self.buffer) - offset)
+        view[:count] = self.buffer[offset:offset + count]
+        self.position += count
+        return count
+
+    def readall(self) -> bytes:
+        parts = []
+        while self.position < self.size:
+            if not self.buffer_start <= self.position < self.buffer_start + len(self.buffer):
+                self._load(self.position)
+            parts.append(self.buffer[self.position - self.buffer_start:])
+            self.position = self.buffer_start + len(self.buffer)
+        return b"".join(parts)
+
+    def close(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.buffer = memoryview(b"")
+        super().close()
+
+class DFSWriter(io.RawIOBase):
+    """Escritor de un archivo nuevo del DFS con escritura diferida.
+
+    Los datos se acumulan hasta completar un bloque, que se sube en segundo
+    plano mientras se llena el siguiente; como mucho ``workers`` bloques
+    quedan en vuelo. ``close`` sube el último bloque y confirma el archivo;
+    si alguna subida falla el archivo se descarta y se lanza OSError. Con
+    ``dedup`` cada bloque se identifica por su SHA-256 y los que ya están en
+    el clúster no se suben; los digests se consultan en lotes de ``workers``
+    bloques, que esperan en memoria la respuesta.
+    """
+
+    def __init__(self, client: DFSClient, path: str, ec_policy: Optional[str] = None, codec: Optional[str] = None,
+                 dedup: bool = False):
+        super().__init__()
+        if codec:
+            compression.require_codec(codec)
+        if dedup and (ec_policy or codec):
+            raise ValueError("La deduplicación solo admite archivos replicados y sin compresión")
+        self.client = client
+        self.name = path
+        self.codec = codec
+        self.dedup = dedup
+        self.deduplicated = 0
+        params = {"filename": path}
+        if ec_policy:
+            params["ec_policy"] = ec_policy
+        if codec:
+            params["codec"] = codec
+        opened = client._request("POST", "files/open", **params)
+        client._invalidate(path)
+        self.lease_id = opened["lease_id"]
+        self.block_size = opened["block_size"]
+        self.policy = opened.get("ec_policy")
+        self.buffer = bytearray()
+        self.size = 0
+        self.allocated: List[dict] = []
+        self.inflight: List[Future] = []
+        self.hashed: List[Tuple[List[bytes], int, str]] = []  # Bloques con dedup a la espera de su lote de digests
+        self.stop_renewal = threading.Event()
+        threading.Thread(
+            target=renew_lease, args=(client.session, client.url, path, self.lease_id, self.stop_renewal), daemon=True
+        ).start()
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.size
+
+    def write(self, b) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        view = memoryview(b).cast("B")
+        written = 0
+        while written < len(view):
+            count = min(len(view) - written, self.block_size - len(self.buffer))
+            self.buffer += view[written:written + count]
+            written += count
+            if len(self.buffer) == self.block_size:
+                self._upload()
+        self.size += written
+        return written
+
+    def _upload(self):
+        """Sube el bloque del buffer en segundo plano"""
+        data = bytes(self.buffer)
+        self.buffer = bytearray()
+        chunk_size = self.client.config.CHUNK_SIZE
+        chunks = [data[offset:offset + chunk_size] for offset in range(0, len(data), chunk_size)]
+        if self.dedup:
+            self.hashed.append((chunks, len(data), content_digest(chunks)))
+            if len(self.hashed) >= self.client.workers:
+                self._add_digests()
+            return
+        if not self.allocated:
+            reply = self.client._request(
+                "POST", "files/addblock", filename=self.name, lease_id=self.lease_id, count=self.client.workers
+            )
+            self.allocated.extend(reply["blocks"])
+        self._submit(self.allocated.pop(0), chunks, len(data))
+
+    def _submit(self, block: dict, chunks: List[bytes], length: int):
+        while len(self.inflight) >= self.client.workers:
+            self._wait(self.inflight.pop(0))
+        self.inflight.append(
+            self.client.executor.submit(upload, block, chunks, length, self.policy, self.codec)
+        )
+
+    def _add_digests(self):
+        """Registra en una sola petición los digests pendientes y sube los bloques que el clúster no tiene"""
+        batch, self.hashed = self.hashed, []
+        if not batch:
+            return
+        body = {"filename": self.name, "lease_id": self.lease_id, "digests": [digest for _, _, digest in batch]}
+        blocks = self.client._request("POST", "files/adddigests", body)["blocks"]
+        for (chunks, length, _), block in zip(batch, blocks):
+            if block["exists"]:
+                self.deduplicated += 1
+            else:
+                self._submit(block, chunks, length)
+
+    def _wait(self, future: Future):
+        try:
+            result, _ = future.result()
+        except grpc.RpcError as e:
+            raise OSError(f"Error al escribir un bloque de {self.name}: {e.details()}") from e
+        if not result.success:
+            raise OSError(f"Error al escribir un bloque de {self.name}: {result.message}")
+
+    def flush(self):
+        """Espera las subidas en curso; el bloque incompleto se sube al cerrar"""
+        self._add_digests()
+        while self.inflight:
+            self._wait(self.inflight.pop(0))
+
+    def abort(self):
+        """Descarta el archivo y sus bloques ya subidos"""
+        if self.closed:
+            return
+        self.stop_renewal.set()
+        for future in self.inflight:
+            future.cancel()
+        self.inflight.clear()
+        self.hashed.clear()
+        try:
+            self.client._request("DELETE", "files", path=self.name)
+        except (OSError, requests.RequestException):
+            pass
+        self.client._invalidate(self.name)
+        super().close()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.buffer:
+                self._upload()
+            self.flush()
+            self.client._request("POST", "files/complete", filename=self.name, lease_id=self.lease_id, size=self.size)
+        except BaseException:
+            self.abort()
+            raise
+        self.stop_renewal.set()
+        self.client._invalidate(self.name)
+        super().close()
@@ -0,0 +1,136 @@
+import base64
+import json
+import os
+import socket
+import socketserver
+import sys
+from typing import Callable, List, Optional
+
+SOCKET_PATH = os.path.expanduser("~/.dfs_client.sock")
+
+class BinaryWriter:
+    """Salida binaria del daemon (p. ej. de cat): se envía en base64"""
+
+    def __init__(self, connection: socket.socket, stream: str):
+        self.connection = connection
+        self.stream = stream
+
+    def write(self, data) -> int:
+        if data:
+            message = {"bin": base64.b64encode(data).decode(), "stream": self.stream}
+            self.connection.sendall((json.dumps(message) + "\n").encode())
+        return len(data)
+
+    def flush(self):
+        pass
+
+class StreamWriter:
+    """Archivo de texto que reenvía cada escritura al cliente como un mensaje JSON"""
+
+    def __init__(self, connection: socket.socket, stream: str):
+        self.connection = connection
+        self.stream = stream
+        self.buffer = BinaryWriter(connection, stream)
+
+    def write(self, text: str) -> int:
+        # Como un archivo de texto real: click usa el TypeError para no escribir bytes
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        if text:
+            self.connection.sendall((json.dumps({self.stream: text}) + "\n").encode())
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+def serve(run: Callable[[List[str], StreamWriter, StreamWriter], int], socket_path: str = SOCKET_PATH):
+    """Atiende comandos de la CLI por un socket Unix hasta recibir una interrupción.
+
+    Cada conexión envía una línea JSON con ``args`` y ``cwd`` y recibe la
+    salida del comando en streaming seguida de ``{"exit": código}``. Los
+    comandos se ejecutan de a uno: comparten el directorio de trabajo y la
+    salida estándar del proceso.
+    """
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                request = json.loads(self.rfile.readline())
+            except ValueError:
+                return
+            out = StreamWriter(self.connection, "out")
+            err = StreamWriter(self.connection, "err")
+            try:
+                # Las rutas locales de put y get son relativas al directorio del cliente
+                os.chdir(request.get("cwd") or "/")
+                status = run(request["args"], out, err)
+            except Exception as e:
+                err.write(f"Error: {e}\n")
+                status = 1
+            self.connection.sendall((json.dumps({"exit": status}) + "\n").encode())
+
+    if os.path.exists(socket_path):
+        if daemon_running(socket_path):
+            raise OSError(f"Ya hay un daemon escuchando en {socket_path}")
+        os.unlink(socket_path)
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        os.chmod(socket_path, 0o600)
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+def daemon_running(socket_path: str = SOCKET_PATH) -> bool:
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(socket_path)
+            return True
+        except OSError:
+            return False
+
+def forward(args: List[str], socket_path: str = SOCKET_PATH) -> Optional[int]:
+    """Ejecuta un comando en el daemon; None si no hay daemon y debe ejecutarse localmente"""
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except OSError:
+        connection.close()
+        return None
+    with connection, connection.makefile("rb") as replies:
+        connection.sendall((json.dumps({"args": args, "cwd": os.getcwd()}) + "\n").encode())
+        for line in replies:
+            message = json.loads(line)
+            if "exit" in message:
+                return message["exit"]
+            if "bin" in message:
+                target = sys.stdout if message["stream"] == "out" else sys.stderr
+                target.buffer.write(base64.b64decode(message["bin"]))
+                target.buffer.flush()
+            elif "out" in message:
+                print(message["out"], end="", flush=True)
+            else:
+                print(message["err"], end="", flush=True, file=sys.stderr)
+    # El daemon terminó sin responder
+    return 1
+
+def main():
+    """Punto de entrada de dfs-cli: usa el daemon local si está activo.
+
+    Solo importa la biblioteca estándar, de modo que un comando reenviado no
+    paga el arranque de typer, grpc ni requests.
+    """
+    args = sys.argv[1:]
+    # shell, daemon y put desde la entrada estándar necesitan la terminal de este proceso
+    local = not args or args[0] in ("shell", "daemon", "--help") or (args[0] == "put" and "-" in args[1:])
+    status = None if local else forward(args)
+    if status is None:
+        from .cli import main as run_local
+        run_local()
+    sys.exit(status)
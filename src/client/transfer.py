@@ -0,0 +1,474 @@
+import importlib
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from ..common.checksum import crc, ChecksumError
+from ..common.lazy import LazyObject, lazy_import
+
+# Los módulos pesados se cargan al primer uso para que comandos como pwd arranquen al instante
+grpc = lazy_import("grpc")
+requests = lazy_import("requests")
+np = lazy_import("numpy")
+dfs_pb2 = lazy_import("src.proto.dfs_pb2")
+dfs_pb2_grpc = lazy_import("src.proto.dfs_pb2_grpc")
+erasure = lazy_import("src.common.erasure")
+compression = lazy_import("src.common.compression")
+
+# Un canal por DataNode, compartido por todos los bloques y reintentos del proceso
+channels = LazyObject(lambda: importlib.import_module("src.common.channels").ChannelPool())
+
+LEASE_RENEW_INTERVAL = 20.0  # Segundos entre renovaciones del lease de escritura
+DIGEST_BATCH = 64  # Digests por petición a /files/adddigests, el máximo que acepta el NameNode
+
+def file_chunks(fd: int, offset: int, length: int, chunk_size: int):
+    """Lee un rango del archivo local en chunks, por posición"""
+    end = offset + length
+    while offset < end:
+        data = os.pread(fd, min(chunk_size, end - offset), offset)
+        if not data:
+            break
+        yield data
+        offset += len(data)
+
+def stream_blocks(stream, block_size: int, chunk_size: int):
+    """Divide un stream de longitud desconocida en bloques de chunks en memoria"""
+    while True:
+        chunks = []
+        size = 0
+        while size < block_size:
+            data = stream.read(min(chunk_size, block_size - size))
+            if not data:
+                break
+            chunks.append(data)
+            size += len(data)
+        if chunks:
+            yield chunks, size
+        if size < block_size:
+            return
+
+def block_chunks(block: dict, chunks):
+    """Genera los mensajes de un bloque; el primero lleva la cadena de réplicas"""
+    first = True
+    for data in chunks:
+        yield dfs_pb2.BlockData(
+            block_id=block["block_id"],
+            data=data,
+            replica_nodes=[node["address"] for node in block["followers"]] if first else [],
+            checksum=crc(data)
+        )
+        first = False
+
+def upload_block(block: dict, chunks):
+    """Sube un bloque a su leader en chunks; el leader lo reenvía a los followers.
+
+    Devuelve la respuesta del leader y los segundos que tomó la transferencia.
+    """
+    start = time.monotonic()
+    with channels.channel(block["leader"]["address"]) as channel:
+        stub = dfs_pb2_grpc.FileServiceStub(channel)
+        response = stub.PutBlock(block_chunks(block, chunks))
+    return response, time.monotonic() - start
+
+CELL_QUEUE_DEPTH = 4  # Celdas en cola por bloque interno al subir un grupo con erasure coding
+
+def regroup(chunks, size: int):
+    """Reagrupa un iterador de chunks en trozos de ``size`` bytes (el último puede ser menor)"""
+    buffer = bytearray()
+    for data in chunks:
+        buffer += data
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+def queue_chunks(cells: queue.Queue, failed: threading.Event):
+    """Chunks encolados hasta ``None``; si el grupo falla el stream se aborta en vez de esperar más celdas"""
+    while True:
+        if failed.is_set():
+            raise OSError("Subida del grupo abortada")
+        try:
+            data = cells.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if data is None:
+            return
+        yield data
+
+def upload_group(group: dict, chunks, length: int, policy: dict):
+    """Codifica un grupo de bloques por franjas y sube cada celda a su DataNode.
+
+    Cada franja de ``data_units`` celdas se codifica en memoria y sus celdas de
+    datos y paridad se encolan hacia un stream PutBlock por bloque interno, de
+    modo que todos los DataNodes del grupo reciben datos a la vez.
+    """
+    start = time.monotonic()
+    ec = erasure.ECPolicy(policy["data_units"], policy["parity_units"], policy["cell_size"])
+    codec = erasure.ReedSolomon(ec.data_units, ec.parity_units)
+    lengths = ec.internal_lengths(length)
+    cells = {index: cell for index, cell in enumerate(group["cells"]) if lengths[index] > 0}
+    queues = {index: queue.Queue(maxsize=CELL_QUEUE_DEPTH) for index in cells}
+    failed = threading.Event()
+
+    def offer(index: int, data) -> bool:
+        # Si otro bloque interno falló, su cola puede no vaciarse nunca
+        while True:
+            try:
+                queues[index].put(data, timeout=0.5)
+                return True
+            except queue.Full:
+                if failed.is_set():
+                    return False
+
+    def send(index: int):
+        cell = cells[index]
+        try:
+            response, _ = upload_block(
+                {"block_id": cell["block_id"], "leader": cell, "followers": []}, queue_chunks(queues[index], failed)
+            )
+        except grpc.RpcError as e:
+            response = dfs_pb2.BlockResponse(success=False, message=f"{cell['node_id']}: {e.details()}")
+        except Exception as e:
+            response = dfs_pb2.BlockResponse(success=False, message=f"{cell['node_id']}: {e}")
+        if not response.success:
+            failed.set()
+        return response
+
+    with ThreadPoolExecutor(max_workers=len(cells) or 1) as executor:
+        senders = [executor.submit(send, index) for index in cells]
+        try:
+            for stripe in regroup(chunks, ec.cell_size * ec.data_units):
+                cell_lengths = ec.cell_lengths(len(stripe))
+                data = np.zeros((ec.data_units, cell_lengths[0]), dtype=np.uint8)
+                data.reshape(-1)[:len(stripe)] = np.frombuffer(stripe, dtype=np.uint8)
+                parity = codec.encode(data)
+                for index, cell_length in enumerate(cell_lengths):
+                    if cell_length and not offer(index, stripe[index * ec.cell_size:index * ec.cell_size + cell_length]):
+                        break
+                for index in range(ec.parity_units):
+                    if not offer(ec.data_units + index, parity[index].tobytes()):
+                        break
+                if failed.is_set():
+                    break
+        except BaseException:
+            # Los streams abiertos se abortan para que el executor no espere celdas que no llegarán
+            failed.set()
+            raise
+        finally:
+            # Tras un fallo no se cierra ningún stream: se abortan y no queda ninguna celda a medias
+            if not failed.is_set():
+                for index in cells:
+                    offer(index, None)
+        responses = [sender.result() for sender in senders]
+
+    errors = [response.message for response in responses if not response.success]
+    if errors:
+        return dfs_pb2.BlockResponse(success=False, message="; ".join(errors)), time.monotonic() - start
+    return dfs_pb2.BlockResponse(success=True), time.monotonic() - start
+
+def upload(block: dict, chunks, length: int, policy: Optional[dict] = None, codec: Optional[str] = None):
+    """Sube un bloque según el tipo de archivo: grupo con erasure coding, frames comprimidos o réplicas"""
+    if policy:
+        return upload_group(block, chunks, length, policy)
+    if codec:
+        # Cada chunk se comprime en el hilo de la transferencia, como un frame independiente
+        chunks = (compression.compress_frame(codec, data) for data in chunks)
+    return upload_block(block, chunks)
+
+def pack_batches(items, capacity: int, size=len):
+    """Agrupa en orden los elementos cuyos tamaños (``size(elemento)``) caben juntos en ``capacity`` bytes"""
+    batch, used = [], 0
+    for item in items:
+        length = size(item)
+        if batch and used + length > capacity:
+            yield batch
+            batch, used = [], 0
+        batch.append(item)
+        used += length
+    if batch:
+        yield batch
+
+def pack_files(session, namenode_url: str, files: List[tuple], chunk_size: int) -> dict:
+    """Guarda archivos pequeños ``(ruta, datos)`` en un contenedor nuevo con una sola subida.
+
+    El contenedor es la concatenación de los datos y el NameNode registra el
+    offset de cada archivo al confirmar el lote: aparecen todos o ninguno.
+    Si algo falla el contenedor se descarta y se lanza OSError.
+    """
+    response = session.post(f"{namenode_url}/containers/open")
+    if response.status_code != 200:
+        raise OSError(response.json()["detail"])
+    block = response.json()["block"]
+    lease_id = response.json()["lease_id"]
+    entries = []
+    offset = 0
+    for path, data in files:
+        entries.append({"path": path, "offset": offset, "size": len(data)})
+        offset += len(data)
+    content = b"".join(data for _, data in files)
+
+    try:
+        result, _ = upload_block(block, (content[start:start + chunk_size] for start in range(0, len(content), chunk_size)))
+        error = None if result.success else result.message
+    except grpc.RpcError as e:
+        error = e.details()
+    if error is None:
+        response = session.post(
+            f"{namenode_url}/containers/commit",
+            json={"block_id": block["block_id"], "lease_id": lease_id, "files": entries}
+        )
+        if response.status_code == 200:
+            return response.json()
+        error = response.json()["detail"]
+    try:
+        session.delete(f"{namenode_url}/containers", params={"block_id": block["block_id"], "lease_id": lease_id})
+    except requests.RequestException:
+        pass
+    raise OSError(error)
+
+def renew_lease(session, namenode_url: str, dfs_path: str, lease_id: str, stop: threading.Event):
+    """Renueva el lease mientras dure la subida"""
+    while not stop.wait(LEASE_RENEW_INTERVAL):
+        try:
+            session.post(f"{namenode_url}/files/renew", params={"filename": dfs_path, "lease_id": lease_id})
+        except requests.RequestException:
+            pass
+
+def download_range(write, block: dict, file_offset: int, block_offset: int, length: int, nodes: list):
+    """Descarga un rango de un bloque entregando los datos a ``write(datos, posición en el archivo)``.
+
+    Prueba las réplicas en el orden dado; si una falla a mitad del stream, la
+    siguiente continúa desde el último byte recibido. Devuelve el nodo que
+    completó el rango o None si ninguna réplica respondió.
+    """
+    received = 0
+    for node in nodes:
+        try:
+            with channels.channel(node["address"]) as channel:
+                stub = dfs_pb2_grpc.FileServiceStub(channel)
+                stream = stub.GetBlock(dfs_pb2.BlockRequest(
+                    block_id=block["block_id"],
+                    offset=block_offset + received,
+                    length=length - received
+                ))
+                for chunk in stream:
+                    if chunk.HasField('checksum') and crc(chunk.data) != chunk.checksum:
+                        raise ChecksumError(f"Checksum inválido recibido de {node['node_id']}")
+                    write(chunk.data, file_offset + received)
+                    received += len(chunk.data)
+            if received == length:
+                return node
+        except (grpc.RpcError, OSError, ChecksumError):
+            continue
+    return None
+
+class CellReader:
+    """Lee en orden los bytes de un bloque interno desde un offset, verificando checksums"""
+
+    def __init__(self, cell: dict, offset: int, length: int):
+        self.node_id = cell["node_id"]
+        self.address = cell["address"]
+        self.position = offset
+        self.buffer = bytearray()
+        stub = dfs_pb2_grpc.FileServiceStub(channels.acquire(self.address))
+        self.stream = stub.GetBlock(dfs_pb2.BlockRequest(block_id=cell["block_id"], offset=offset, length=length))
+
+    def read(self, size: int) -> bytes:
+        while len(self.buffer) < size:
+            chunk = next(self.stream, None)
+            if chunk is None:
+                raise EOFError(f"Bloque incompleto en {self.node_id}")
+            if chunk.HasField('checksum') and crc(chunk.data) != chunk.checksum:
+                raise ChecksumError(f"Checksum inválido recibido de {self.node_id}")
+            self.buffer += chunk.data
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        self.position += size
+        return data
+
+    def close(self):
+        self.stream.cancel()
+        channels.release(self.address)
+
+def download_group(write, group: dict, file_offset: int, length: int, policy: dict, start: int = 0,
+                   stop: Optional[int] = None):
+    """Descarga los bytes ``[start, stop)`` de un grupo con erasure coding.
+
+    ``length`` son los bytes de datos del grupo y ``file_offset`` su posición
+    en el archivo. Solo se leen las celdas de datos que tocan el rango; si un
+    bloque interno no responde o está corrupto, sus celdas se reconstruyen
+    desde la paridad franja por franja (lectura degradada). Devuelve el grupo
+    o None si faltan más celdas de las que la paridad puede recuperar.
+    """
+    ec = erasure.ECPolicy(policy["data_units"], policy["parity_units"], policy["cell_size"])
+    codec = erasure.ReedSolomon(ec.data_units, ec.parity_units)
+    stripe_size = ec.cell_size * ec.data_units
+    stop = length if stop is None else min(stop, length)
+    lengths = ec.internal_lengths(length)
+    # Los bloques internos se leen solo hasta la última franja del rango
+    internal_stop = -(-stop // stripe_size) * ec.cell_size
+    cells = group["cells"]
+    failed = {index for index, cell in enumerate(cells) if not cell.get("alive", True)}
+    readers = {}
+
+    def read_cell(index: int, offset: int, size: int) -> Optional[bytes]:
+        if index in failed:
+            return None
+        try:
+            reader = readers.get(index)
+            if reader is not None and reader.position != offset:
+                readers.pop(index).close()
+                reader = None
+            if reader is None:
+                limit = min(lengths[index], internal_stop)
+                reader = readers[index] = CellReader(cells[index], offset, limit - offset)
+            return reader.read(size)
+        except (grpc.RpcError, OSError, EOFError, ChecksumError):
+            failed.add(index)
+            reader = readers.pop(index, None)
+            if reader is not None:
+                reader.close()
+            return None
+
+    try:
+        for stripe_offset in range(start - start % stripe_size, stop, stripe_size):
+            cell_lengths = ec.cell_lengths(min(stripe_size, length - stripe_offset))
+            offset = stripe_offset // ec.data_units
+            # Celdas de datos que se solapan con el rango pedido
+            wanted = [
+                index for index, cell_length in enumerate(cell_lengths)
+                if cell_length and stripe_offset + index * ec.cell_size < stop
+                and stripe_offset + index * ec.cell_size + cell_length > start
+            ]
+            shards = {}
+            for index in wanted:
+                data = read_cell(index, offset, cell_lengths[index])
+                if data is not None:
+                    shards[index] = data
+            missing = [index for index in wanted if index not in shards]
+            if missing:
+                # Cualquier combinación de k celdas reconstruye la franja
+                for index in range(ec.total_units):
+                    if len(shards) >= ec.data_units:
+                        break
+                    if index in shards or index in missing:
+                        continue
+                    size = cell_lengths[index] if index < ec.data_units else cell_lengths[0]
+                    data = read_cell(index, offset, size) if size else b""
+                    if data is not None:
+                        shards[index] = data
+                if len(shards) < ec.data_units:
+                    return None
+                # Las celdas cortas de la última franja se completan con los ceros de la codificación
+                padded = {}
+                for index, data in shards.items():
+                    padded[index] = np.zeros(cell_lengths[0], dtype=np.uint8)
+                    padded[index][:len(data)] = np.frombuffer(data, dtype=np.uint8)
+                decoded = codec.decode(padded)
+                for index in missing:
+                    shards[index] = decoded[index, :cell_lengths[index]].tobytes()
+            for index in wanted:
+                cell_start = stripe_offset + index * ec.cell_size
+                low = max(start, cell_start)
+                high = min(stop, cell_start + cell_lengths[index])
+                write(shards[index][low - cell_start:high - cell_start], file_offset + low)
+        return group
+    finally:
+        for reader in readers.values():
+            reader.close()
+
+def download_compressed(write, block: dict, file_offset: int, nodes: list, codec: str, start: int, stop: int):
+    """Descarga los bytes originales ``[start, stop)`` de un bloque comprimido.
+
+    Los frames no tienen índice, así que el bloque se descomprime desde el
+    principio y la lectura se corta al superar ``stop``. Si una réplica falla,
+    la siguiente continúa desde el último frame completo.
+    """
+    decoder = compression.FrameDecoder(codec)
+    received = 0
+    for node in nodes:
+        decoder.reset()
+        try:
+            with channels.channel(node["address"]) as channel:
+                stub = dfs_pb2_grpc.FileServiceStub(channel)
+                stream = stub.GetBlock(dfs_pb2.BlockRequest(block_id=block["block_id"], offset=decoder.consumed))
+                try:
+                    for chunk in stream:
+                        if chunk.HasField('checksum') and crc(chunk.data) != chunk.checksum:
+                            raise ChecksumError(f"Checksum inválido recibido de {node['node_id']}")
+                        for data in decoder.feed(chunk.data):
+                            low, high = max(start, received), min(stop, received + len(data))
+                            if low < high:
+                                write(data[low - received:high - received], file_offset + low)
+                            received += len(data)
+                        if received >= stop:
+                            break
+                finally:
+                    stream.cancel()
+            if received >= stop:
+                return node
+        except (grpc.RpcError, OSError, ChecksumError, compression.CompressionError):
+            continue
+    return None
+
+def plan_reads(file_info: dict, offset: int, length: int, split: bool = False) -> List[tuple]:
+    """Traduce un rango de bytes del archivo a lecturas de los bloques que toca.
+
+    Devuelve tuplas ``(bloque, posición, bytes, función, argumentos)`` en el
+    orden del archivo; cada función se invoca como ``función(write, bloque,
+    *argumentos)`` y entrega a ``write`` los datos con su posición en el
+    archivo. Con ``split`` el rango de cada bloque replicado se reparte entre
+    sus réplicas. Un archivo empaquetado tiene un solo bloque, el contenedor,
+    con el ``offset`` donde empiezan sus datos.
+    """
+    file_size = file_info["size"]
+    block_size = file_info["block_size"]
+    policy = file_info.get("ec_policy")
+    codec = file_info.get("codec")
+    end = min(file_size, offset + length)
+    reads = []
+    if end <= offset:
+        return reads
+    for index in range(offset // block_size, -(-end // block_size)):
+        block = file_info["blocks"][index]
+        block_offset = index * block_size
+        block_length = min(block_size, file_size - block_offset)
+        start = max(offset, block_offset) - block_offset
+        stop = min(end, block_offset + block_length) - block_offset
+        if policy:
+            # Un grupo ya se lee en paralelo desde sus DataNodes de datos
+            reads.append((block, block_offset + start, stop - start, download_group,
+                          (block_offset, block_length, policy, start, stop)))
+            continue
+        nodes = [block["leader"]] + block["followers"]
+        if codec:
+            # Los frames comprimidos no permiten dividir el bloque por offsets originales
+            order = nodes[index % len(nodes):] + nodes[:index % len(nodes)]
+            reads.append((block, block_offset + start, stop - start, download_compressed,
+                          (block_offset, order, codec, start, stop)))
+            continue
+        base = block.get("offset", 0)
+        parts = len(nodes) if split else 1
+        part_size = -(-(stop - start) // parts)
+        for part in range(parts):
+            part_start = start + part * part_size
+            if part_start >= stop:
+                break
+            # Rotar el orden de réplicas para repartir la carga entre nodos
+            order = nodes[(index + part) % len(nodes):] + nodes[:(index + part) % len(nodes)]
+            size = min(part_size, stop - part_start)
+            reads.append((block, block_offset + part_start, size, download_range,
+                          (block_offset + part_start, base + part_start, size, order)))
+    return reads
+
+def read_piece(block: dict, position: int, size: int, function, args) -> Optional[bytearray]:
+    """Ejecuta una lectura de ``plan_reads`` y devuelve sus bytes, o None si falló"""
+    buffer = bytearray(size)
+
+    def write(data, offset: int):
+        buffer[offset - position:offset - position + len(data)] = data
+
+    return buffer if function(write, block, *args) is not None else None
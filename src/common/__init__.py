@@ -1,6 +1,12 @@
 """
 Módulo común - Utilidades y configuraciones compartidas
 """
-from .config import Config
 
-__all__ = ['Config']
\ No newline at end of file
+def __getattr__(name):
+    # Config se importa al usarse: la CLI no carga yaml en comandos que no lo necesitan
+    if name == "Config":
+        from .config import Config
+        return Config
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['Config']
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+import grpc
+
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+IDLE_TIMEOUT = 300.0  # Segundos sin uso tras los que se cierra un canal
+
+# Opciones comunes: mensajes grandes, keepalive HTTP/2 para detectar conexiones
+# muertas sin esperar al timeout de TCP y ventanas de control de flujo amplias
+# para que un solo stream pueda llenar el enlace
+CHANNEL_OPTIONS = [
+    ("grpc.max_send_message_length", MAX_MESSAGE_SIZE),
+    ("grpc.max_receive_message_length", MAX_MESSAGE_SIZE),
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.http2.bdp_probe", 1),
+    ("grpc.http2.lookahead_bytes", 8 * 1024 * 1024),
+]
+
+# El servidor debe aceptar los pings de keepalive de los clientes inactivos
+SERVER_OPTIONS = [
+    ("grpc.max_send_message_length", MAX_MESSAGE_SIZE),
+    ("grpc.max_receive_message_length", MAX_MESSAGE_SIZE),
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.min_recv_ping_interval_without_data_ms", 10000),
+    ("grpc.http2.max_ping_strikes", 0),
+    ("grpc.http2.bdp_probe", 1),
+    ("grpc.http2.lookahead_bytes", 8 * 1024 * 1024),
+]
+
+class ChannelPool:
+    """Canales gRPC reutilizables por dirección (y compresión).
+
+    Un canal multiplexa streams concurrentes sobre una misma conexión HTTP/2,
+    así que cada bloque evita el handshake TCP y HTTP/2. Los canales sin
+    streams activos durante ``idle_timeout`` se cierran al pedir otro canal.
+    """
+
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT, options: list = None):
+        self.idle_timeout = idle_timeout
+        self.options = options or CHANNEL_OPTIONS
+        self.channels: Dict[Tuple[str, grpc.Compression], dict] = {}
+        self.lock = threading.Lock()
+
+    def _create(self, address: str, compression: grpc.Compression):
+        return grpc.insecure_channel(address, options=self.options, compression=compression)
+
+    def _close(self, channel):
+        channel.close()
+
+    def acquire(self, address: str, compression: grpc.Compression = grpc.Compression.NoCompression):
+        """Devuelve el canal de ``address`` marcándolo en uso; liberar con ``release``"""
+        key = (address, compression)
+        with self.lock:
+            self._evict_idle()
+            entry = self.channels.get(key)
+            if entry is None:
+                entry = self.channels[key] = {"channel": self._create(address, compression), "users": 0}
+            entry["users"] += 1
+            entry["last_used"] = time.monotonic()
+            return entry["channel"]
+
+    def release(self, address: str, compression: grpc.Compression = grpc.Compression.NoCompression):
+        with self.lock:
+            entry = self.channels.get((address, compression))
+            if entry is not None:
+                entry["users"] -= 1
+                entry["last_used"] = time.monotonic()
+
+    @contextmanager
+    def channel(self, address: str, compression: grpc.Compression = grpc.Compression.NoCompression):
+        channel = self.acquire(address, compression)
+        try:
+            yield channel
+        finally:
+            self.release(address, compression)
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        for key, entry in list(self.channels.items()):
+            if entry["users"] <= 0 and now - entry["last_used"] > self.idle_timeout:
+                del self.channels[key]
+                self._close(entry["channel"])
+
+    def close(self):
+        with self.lock:
+            channels, self.channels = self.channels, {}
+        for entry in channels.values():
+            self._close(entry["channel"])
+
+class AsyncChannelPool(ChannelPool):
+    """Versión para grpc.aio; debe usarse desde el event loop que crea los canales"""
+
+    def _create(self, address: str, compression: grpc.Compression):
+        return grpc.aio.insecure_channel(address, options=self.options, compression=compression)
+
+    def _close(self, channel):
+        asyncio.get_running_loop().create_task(channel.close())
+
+    async def aclose(self):
+        channels, self.channels = self.channels, {}
+        await asyncio.gather(*(entry["channel"].close() for entry in channels.values()))
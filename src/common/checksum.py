@@ -0,0 +1,98 @@
+import hashlib
+import re
+import struct
+import zlib
+from array import array
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+BYTES_PER_CHECKSUM = 512 * 1024
+MAGIC = b"DFSC"
+HEADER = struct.Struct("<4sI")  # magic, bytes por checksum
+DIGEST_PATTERN = re.compile(r"sha256-[0-9a-f]{64}")
+
+class ChecksumError(Exception):
+    """Los datos no coinciden con su checksum"""
+
+def crc(data) -> int:
+    # zlib.crc32 está implementado en C y libera el GIL con buffers grandes
+    return zlib.crc32(data)
+
+def content_digest(chunks) -> str:
+    """Identificador de un bloque direccionado por contenido: el SHA-256 de sus datos"""
+    digest = hashlib.sha256()
+    for data in chunks:
+        digest.update(data)
+    return f"sha256-{digest.hexdigest()}"
+
+def is_digest(value: str) -> bool:
+    return DIGEST_PATTERN.fullmatch(value) is not None
+
+def sidecar_path(block_path: Path) -> Path:
+    """Ruta del archivo de checksums de un bloque (oculto para los block reports)"""
+    return block_path.with_name(f".{block_path.name}.crc")
+
+class ChunkChecksummer:
+    """Calcula los checksums de un bloque de forma incremental mientras llega en streaming"""
+
+    def __init__(self, bytes_per_checksum: int = BYTES_PER_CHECKSUM):
+        self.bytes_per_checksum = bytes_per_checksum
+        self.checksums = array('I')
+        self.current = 0
+        self.filled = 0
+
+    def update(self, data):
+        view = memoryview(data)
+        while view:
+            take = min(len(view), self.bytes_per_checksum - self.filled)
+            self.current = zlib.crc32(view[:take], self.current)
+            self.filled += take
+            view = view[take:]
+            if self.filled == self.bytes_per_checksum:
+                self.checksums.append(self.current)
+                self.current = 0
+                self.filled = 0
+
+    def finish(self) -> array:
+        if self.filled:
+            self.checksums.append(self.current)
+            self.current = 0
+            self.filled = 0
+        return self.checksums
+
+def write_sidecar(path: Path, checksums: array, bytes_per_checksum: int = BYTES_PER_CHECKSUM):
+    data = array('I', checksums)
+    if data.itemsize != 4:
+        raise RuntimeError("array('I') debe tener elementos de 4 bytes")
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, bytes_per_checksum))
+        f.write(data.tobytes())
+
+def read_sidecar(path: Path) -> Optional[Tuple[int, array]]:
+    """Devuelve (bytes por checksum, checksums) o None si el bloque no tiene checksums"""
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return None
+    magic, bytes_per_checksum = HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise ChecksumError(f"Archivo de checksums inválido: {path}")
+    checksums = array('I')
+    checksums.frombytes(raw[HEADER.size:])
+    return bytes_per_checksum, checksums
+
+def verify_range(view, start: int, end: int, bytes_per_checksum: int, checksums: array) -> List[int]:
+    """Verifica los chunks de checksum que cubren [start, end) en ``view``.
+
+    Devuelve los índices de los chunks corruptos (lista vacía si todo coincide).
+    """
+    bad = []
+    first = start // bytes_per_checksum
+    last = (end - 1) // bytes_per_checksum if end > start else first - 1
+    for index in range(first, last + 1):
+        chunk_start = index * bytes_per_checksum
+        chunk_end = min(chunk_start + bytes_per_checksum, len(view))
+        if index >= len(checksums) or zlib.crc32(view[chunk_start:chunk_end]) != checksums[index]:
+            bad.append(index)
+    return bad
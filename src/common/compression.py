@@ -0,0 +1,104 @@
+import struct
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # Opcional: pip install zstandard
+    zstandard = None
+
+try:
+    import lz4.block
+except ImportError:  # Opcional: pip install lz4
+    lz4 = None
+
+KNOWN_CODECS = ("zstd", "lz4", "zlib")
+FRAME = struct.Struct("<II")  # bytes almacenados, bytes originales
+
+class CompressionError(Exception):
+    """Un frame comprimido no pudo decodificarse"""
+
+def _codecs() -> Dict[str, Tuple[Callable, Callable]]:
+    """Códecs disponibles: nombre -> (comprimir(datos), descomprimir(datos, tamaño original))"""
+    codecs = {"zlib": (lambda data: zlib.compress(data, 1), lambda data, size: zlib.decompress(data, bufsize=size))}
+    if zstandard is not None:
+        codecs["zstd"] = (
+            lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+            lambda data, size: zstandard.ZstdDecompressor().decompress(data, max_output_size=size)
+        )
+    if lz4 is not None:
+        codecs["lz4"] = (
+            lambda data: lz4.block.compress(data, store_size=False),
+            lambda data, size: lz4.block.decompress(data, uncompressed_size=size)
+        )
+    return codecs
+
+CODECS = _codecs()
+
+def check_codec(name: Optional[str]) -> Optional[str]:
+    """Valida el nombre de un códec; no exige que su biblioteca esté instalada"""
+    if name and name not in KNOWN_CODECS:
+        raise ValueError(f"Códec desconocido: {name} (disponibles: {', '.join(KNOWN_CODECS)})")
+    return name or None
+
+def require_codec(name: str):
+    """Falla si el códec no puede usarse en este proceso"""
+    check_codec(name)
+    if name not in CODECS:
+        package = "zstandard" if name == "zstd" else name
+        raise ValueError(f"El códec {name} requiere instalar el paquete {package}")
+
+def compress_frame(codec: str, data) -> bytes:
+    """Comprime un chunk como un frame independiente.
+
+    Si comprimir no reduce el tamaño, el frame guarda los datos tal cual
+    (bytes almacenados == bytes originales).
+    """
+    compressed = CODECS[codec][0](data)
+    if len(compressed) >= len(data):
+        return FRAME.pack(len(data), len(data)) + bytes(data)
+    return FRAME.pack(len(compressed), len(data)) + compressed
+
+def decompress_frame(codec: str, payload: bytes, raw_length: int) -> bytes:
+    if len(payload) == raw_length:
+        return payload
+    try:
+        data = CODECS[codec][1](payload, raw_length)
+    except Exception as e:
+        raise CompressionError(f"Frame {codec} inválido: {e}") from e
+    if len(data) != raw_length:
+        raise CompressionError(f"Frame {codec} de {len(data)} bytes, se esperaban {raw_length}")
+    return data
+
+class FrameDecoder:
+    """Descomprime en streaming un bloque formado por frames consecutivos.
+
+    ``consumed`` son los bytes almacenados de los frames ya entregados, para
+    reanudar la lectura desde otra réplica en el límite de un frame.
+    """
+
+    def __init__(self, codec: str):
+        require_codec(codec)
+        self.codec = codec
+        self.buffer = bytearray()
+        self.consumed = 0
+
+    def feed(self, data) -> List[bytes]:
+        """Agrega bytes almacenados y devuelve los chunks originales de los frames completos"""
+        self.buffer += data
+        chunks = []
+        position = 0
+        while len(self.buffer) - position >= FRAME.size:
+            stored, raw = FRAME.unpack_from(self.buffer, position)
+            end = position + FRAME.size + stored
+            if len(self.buffer) < end:
+                break
+            chunks.append(decompress_frame(self.codec, bytes(self.buffer[position + FRAME.size:end]), raw))
+            position = end
+        del self.buffer[:position]
+        self.consumed += position
+        return chunks
+
+    def reset(self):
+        """Descarta el frame incompleto tras un fallo de la réplica"""
+        self.buffer.clear()
@@ -12,8 +12,20 @@ class Config:
         self.NAMENODE_HOST = "localhost"
         self.NAMENODE_PORT = 8000
         self.DATANODES = {}
+        self.DATANODE_RACKS = {}  # Rack o zona de cada DataNode, para repartir las réplicas
+        self.PLACEMENT_POLICY = "p2c"  # Elección de DataNodes: p2c, random o load
+        self.BALANCER_THRESHOLD = 10.0  # Puntos porcentuales de utilización tolerados respecto de la media
+        self.BALANCER_PERIOD = 0  # Segundos entre corridas automáticas del balancer (0 solo a pedido)
         self.REPLICATION_FACTOR = 2
         self.BLOCK_SIZE = 64 * 1024 * 1024  # 64MB
+        self.CHUNK_SIZE = 1024 * 1024  # 1MB por mensaje gRPC
+        self.TRANSFER_WORKERS = 4  # Bloques transferidos en paralelo por el cliente
+        self.REPLICATION_BANDWIDTH = 20 * 1024 * 1024  # Bytes/s por DataNode para re-replicación
+        self.REPLICATION_COMPRESSION = None  # Compresión gRPC entre DataNodes: gzip, deflate o None
+        self.CACHE_SIZE = 128 * 1024 * 1024  # Bytes de la caché de lectura de cada DataNode (0 la desactiva)
+        self.CLIENT_CACHE_TTL = 5.0  # Segundos máximos que el cliente reutiliza metadatos (0 la desactiva)
+        self.CLIENT_CACHE_FILE = "~/.dfs_client_cache.json"  # Caché compartida entre invocaciones ("" solo en memoria)
+        self.SMALL_FILE_THRESHOLD = 1024 * 1024  # Archivos menores que esto se empaquetan en contenedores (0 no empaqueta)
         
         # Cargar configuración si existe
         if config_path and os.path.exists(config_path):
@@ -35,11 +47,42 @@ class Config:
                 node_id: f"{node_info['host']}:{node_info['port']}"
                 for node_id, node_info in config['datanodes'].items()
             }
+            self.DATANODE_RACKS = {
+                node_id: str(node_info.get('rack', node_info.get('zone')))
+                for node_id, node_info in config['datanodes'].items()
+                if node_info.get('rack', node_info.get('zone')) is not None
+            }
+
+        # Ubicación de bloques
+        if 'placement' in config:
+            self.PLACEMENT_POLICY = config['placement'].get('policy', self.PLACEMENT_POLICY)
+
+        # Balanceo del uso de disco
+        if 'balancer' in config:
+            self.BALANCER_THRESHOLD = config['balancer'].get('threshold', self.BALANCER_THRESHOLD)
+            self.BALANCER_PERIOD = config['balancer'].get('interval', self.BALANCER_PERIOD)
         
         # Configuración de replicación
         if 'replication' in config:
             self.REPLICATION_FACTOR = config['replication']['factor']
             self.BLOCK_SIZE = config['replication']['block_size']
+            self.REPLICATION_BANDWIDTH = config['replication'].get('bandwidth', self.REPLICATION_BANDWIDTH)
+            self.REPLICATION_COMPRESSION = config['replication'].get('compression', self.REPLICATION_COMPRESSION)
+
+        # Configuración de transferencia de datos
+        if 'transfer' in config:
+            self.CHUNK_SIZE = config['transfer'].get('chunk_size', self.CHUNK_SIZE)
+            self.TRANSFER_WORKERS = config['transfer'].get('workers', self.TRANSFER_WORKERS)
+
+        # Caché de lectura de los DataNodes
+        if 'cache' in config:
+            self.CACHE_SIZE = config['cache'].get('size', self.CACHE_SIZE)
+
+        # Caché de metadatos del cliente
+        if 'client' in config:
+            self.CLIENT_CACHE_TTL = config['client'].get('cache_ttl', self.CLIENT_CACHE_TTL)
+            self.CLIENT_CACHE_FILE = config['client'].get('cache_file', self.CLIENT_CACHE_FILE)
+            self.SMALL_FILE_THRESHOLD = config['client'].get('small_file_threshold', self.SMALL_FILE_THRESHOLD)
 
     @classmethod
     def load(cls, config_path: Optional[str] = None) -> 'Config':
@@ -0,0 +1,192 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+CELL_SIZE = 1024 * 1024
+PRIMITIVE_POLY = 0x11d  # x^8 + x^4 + x^3 + x^2 + 1
+
+# Tablas de GF(2^8): exponentes duplicados para evitar el módulo al multiplicar
+GF_EXP = [0] * 512
+GF_LOG = [0] * 256
+_value = 1
+for _power in range(255):
+    GF_EXP[_power] = _value
+    GF_LOG[_value] = _power
+    _value <<= 1
+    if _value & 0x100:
+        _value ^= PRIMITIVE_POLY
+for _power in range(255, 512):
+    GF_EXP[_power] = GF_EXP[_power - 255]
+
+def gf_mul(a: int, b: int) -> int:
+    if a == 0 or b == 0:
+        return 0
+    return GF_EXP[GF_LOG[a] + GF_LOG[b]]
+
+def gf_inv(a: int) -> int:
+    if a == 0:
+        raise ZeroDivisionError("0 no tiene inverso en GF(2^8)")
+    return GF_EXP[255 - GF_LOG[a]]
+
+# MUL_TABLE[c] multiplica un arreglo de bytes por c con una sola búsqueda vectorizada
+MUL_TABLE = np.array([[gf_mul(a, b) for b in range(256)] for a in range(256)], dtype=np.uint8)
+
+class ECPolicy:
+    """Política de erasure coding: celdas de datos, de paridad y tamaño de celda"""
+
+    def __init__(self, data_units: int, parity_units: int, cell_size: int = CELL_SIZE):
+        self.data_units = data_units
+        self.parity_units = parity_units
+        self.cell_size = cell_size
+        self.name = f"RS-{data_units}-{parity_units}-{cell_size // 1024}k"
+
+    @property
+    def total_units(self) -> int:
+        return self.data_units + self.parity_units
+
+    def internal_block_size(self, block_size: int) -> int:
+        """Tamaño máximo de cada bloque interno, redondeado a celdas completas"""
+        return -(-block_size // self.cell_size) * self.cell_size
+
+    def group_size(self, block_size: int) -> int:
+        """Bytes de datos de un grupo de bloques"""
+        return self.internal_block_size(block_size) * self.data_units
+
+    def cell_lengths(self, stripe_length: int) -> List[int]:
+        """Longitud de cada celda de datos de una franja con ``stripe_length`` bytes"""
+        return [max(0, min(self.cell_size, stripe_length - i * self.cell_size)) for i in range(self.data_units)]
+
+    def internal_lengths(self, group_length: int) -> List[int]:
+        """Bytes almacenados en cada bloque interno de un grupo (datos y luego paridad)"""
+        stripe_size = self.cell_size * self.data_units
+        full, rest = divmod(group_length, stripe_size)
+        last = self.cell_lengths(rest)
+        lengths = [full * self.cell_size + length for length in last]
+        return lengths + [full * self.cell_size + last[0]] * self.parity_units
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "data_units": self.data_units,
+            "parity_units": self.parity_units,
+            "cell_size": self.cell_size
+        }
+
+POLICIES = {policy.name: policy for policy in (ECPolicy(3, 2), ECPolicy(6, 3), ECPolicy(10, 4))}
+
+def get_policy(name: Optional[str]) -> Optional[ECPolicy]:
+    if not name:
+        return None
+    try:
+        return POLICIES[name]
+    except KeyError:
+        raise ValueError(f"Política de erasure coding desconocida: {name} (disponibles: {', '.join(POLICIES)})")
+
+@lru_cache(maxsize=256)
+def _mul_table16(coefficient: int) -> np.ndarray:
+    """Tabla que multiplica por ``coefficient`` dos bytes a la vez (65536 entradas uint16)"""
+    index = np.arange(65536, dtype=np.uint32)
+    table = MUL_TABLE[coefficient]
+    return (table[index & 0xff].astype(np.uint16) | (table[index >> 8].astype(np.uint16) << 8))
+
+def _mul_add(acc: np.ndarray, coefficient: int, shard: np.ndarray):
+    """acc ^= coefficient * shard en GF(2^8)"""
+    if coefficient == 0:
+        return
+    if coefficient == 1:
+        np.bitwise_xor(acc, shard, out=acc)
+        return
+    # Buscar de a dos bytes reduce a la mitad las búsquedas en tabla
+    even = len(shard) & ~1
+    if even:
+        acc16 = acc[:even].view(np.uint16)
+        np.bitwise_xor(acc16, _mul_table16(coefficient).take(shard[:even].view(np.uint16)), out=acc16)
+    if even != len(shard):
+        acc[-1] ^= MUL_TABLE[coefficient][shard[-1]]
+
+def _invert(matrix: List[List[int]]) -> List[List[int]]:
+    """Inversa de una matriz cuadrada en GF(2^8) por Gauss-Jordan"""
+    size = len(matrix)
+    rows = [list(row) + [1 if i == j else 0 for j in range(size)] for i, row in enumerate(matrix)]
+    for col in range(size):
+        pivot = next((r for r in range(col, size) if rows[r][col]), None)
+        if pivot is None:
+            raise ValueError("Matriz singular")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        factor = gf_inv(rows[col][col])
+        rows[col] = [gf_mul(factor, value) for value in rows[col]]
+        for r in range(size):
+            if r != col and rows[r][col]:
+                factor = rows[r][col]
+                rows[r] = [value ^ gf_mul(factor, pivot_value) for value, pivot_value in zip(rows[r], rows[col])]
+    return [row[size:] for row in rows]
+
+class ReedSolomon:
+    """Código Reed-Solomon sistemático sobre GF(2^8) con matriz de Cauchy.
+
+    Cualquier subconjunto de ``data_units`` celdas de una franja, de datos o
+    de paridad, basta para reconstruir las celdas de datos. Las operaciones
+    trabajan sobre arreglos de bytes completos con búsquedas en tabla de NumPy.
+    """
+
+    def __init__(self, data_units: int, parity_units: int):
+        if data_units + parity_units > 256:
+            raise ValueError("GF(2^8) admite como máximo 256 celdas por franja")
+        self.data_units = data_units
+        self.parity_units = parity_units
+        # Cauchy: 1 / (x_i + y_j) con x_i = k + i, y_j = j (todos distintos)
+        matrix = [[gf_inv((data_units + i) ^ j) for j in range(data_units)] for i in range(parity_units)]
+        # Escalar filas y columnas conserva la propiedad MDS; con la primera
+        # fila y columna en 1 esas celdas se combinan con XOR sin tabla
+        for j in range(data_units):
+            factor = gf_inv(matrix[0][j])
+            for row in matrix:
+                row[j] = gf_mul(row[j], factor)
+        for row in matrix:
+            factor = gf_inv(row[0])
+            row[:] = [gf_mul(value, factor) for value in row]
+        self.parity_matrix = matrix
+
+    def row(self, index: int) -> List[int]:
+        """Fila de la matriz generadora para la celda ``index``"""
+        if index < self.data_units:
+            return [1 if j == index else 0 for j in range(self.data_units)]
+        return self.parity_matrix[index - self.data_units]
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        """Calcula las celdas de paridad de una franja ``data`` de forma (k, n)"""
+        parity = np.zeros((self.parity_units, data.shape[1]), dtype=np.uint8)
+        for i, coefficients in enumerate(self.parity_matrix):
+            for j, coefficient in enumerate(coefficients):
+                _mul_add(parity[i], coefficient, data[j])
+        return parity
+
+    @lru_cache(maxsize=64)
+    def _decode_matrix(self, indices: Tuple[int, ...]) -> List[List[int]]:
+        return _invert([self.row(index) for index in indices])
+
+    def decode(self, shards: Dict[int, np.ndarray]) -> np.ndarray:
+        """Reconstruye las celdas de datos a partir de al menos k celdas de la franja.
+
+        ``shards`` asocia el índice de cada celda disponible (0..k-1 datos,
+        k.. paridad) con su contenido; todas deben tener la misma longitud.
+        """
+        if len(shards) < self.data_units:
+            raise ValueError(f"Se necesitan {self.data_units} celdas y solo hay {len(shards)}")
+        # Se prefieren las celdas de datos: las presentes no necesitan cálculo
+        indices = tuple(sorted(shards)[:self.data_units])
+        length = len(shards[indices[0]])
+        data = np.empty((self.data_units, length), dtype=np.uint8)
+        if indices == tuple(range(self.data_units)):
+            for i in indices:
+                data[i] = shards[i]
+            return data
+        matrix = self._decode_matrix(indices)
+        for i in range(self.data_units):
+            if i in shards:
+                data[i] = shards[i]
+                continue
+            data[i] = 0
+            for coefficient, index in zip(matrix[i], indices):
+                _mul_add(data[i], coefficient, shards[index])
+        return data
@@ -0,0 +1,31 @@
+import importlib
+import threading
+from typing import Callable
+
+class LazyObject:
+    """Construye el objeto con ``factory`` en el primer acceso a uno de sus atributos.
+
+    La construcción se serializa con un lock: los hilos de transferencia de la
+    CLI pueden llegar a la vez al primer uso.
+    """
+
+    def __init__(self, factory: Callable):
+        self._factory = factory
+        self._target = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Solo se invoca para atributos que no son del proxy
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = self._factory()
+        return getattr(self._target, name)
+
+def lazy_import(name: str) -> LazyObject:
+    """Módulo ``name`` que se importa al acceder a su primer atributo.
+
+    Permite que la CLI arranque sin cargar grpc, requests o NumPy en comandos
+    que no los usan.
+    """
+    return LazyObject(lambda: importlib.import_module(name))
@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+class Throttler:
+    """Limita el ancho de banda de un flujo con un token bucket.
+
+    Se comparte entre todas las transferencias de fondo de un nodo para que
+    la re-replicación y el balanceo no compitan con el tráfico de clientes.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate  # Bytes por segundo; 0 desactiva el límite
+        self.burst = burst if burst is not None else rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def consume(self, size: int):
+        """Espera hasta que haya ancho de banda disponible para ``size`` bytes"""
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= size
+            if self.tokens < 0:
+                # La deuda se paga esperando; las siguientes llamadas quedan en cola
+                await asyncio.sleep(-self.tokens / self.rate)
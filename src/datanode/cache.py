@@ -0,0 +1,101 @@
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+CACHE_SIZE = 128 * 1024 * 1024  # Bytes de chunks de bloques en memoria por DataNode
+
+class BlockCache:
+    """Caché LRU de chunks de bloques con presupuesto en bytes.
+
+    Las claves son (bloque, índice de chunk alineado). Si varios lectores piden
+    a la vez un chunk ausente, solo uno lo lee de disco y el resto espera ese
+    mismo resultado. Con ``capacity`` 0 no se guarda nada, pero las lecturas
+    concurrentes se siguen compartiendo.
+    """
+
+    def __init__(self, capacity: int = CACHE_SIZE):
+        self.capacity = capacity
+        self.entries: "OrderedDict[Tuple[str, int], bytes]" = OrderedDict()
+        self.block_keys: Dict[str, Set[Tuple[str, int]]] = {}
+        self.loading: Dict[Tuple[str, int], asyncio.Future] = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    async def get(self, key: Tuple[str, int], load: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Devuelve el chunk de ``key``, leyéndolo con ``load`` si no está en caché"""
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+        future = self.loading.get(key)
+        if future is not None:
+            self.shared += 1
+        else:
+            self.misses += 1
+            # La lectura corre en su propia tarea: cancelar a un lector no la cancela para los demás
+            future = self.loading[key] = asyncio.ensure_future(load())
+            future.add_done_callback(lambda done: self._loaded(key, done))
+        return await asyncio.shield(future)
+
+    def peek(self, key: Tuple[str, int]) -> Optional[bytes]:
+        """Devuelve el chunk de ``key`` solo si ya está en caché"""
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return data
+
+    def _loaded(self, key: Tuple[str, int], future: asyncio.Future):
+        # Si el bloque se invalidó durante la lectura, la tarea ya no está registrada
+        if self.loading.get(key) is not future:
+            return
+        del self.loading[key]
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.put(key, future.result())
+
+    def put(self, key: Tuple[str, int], data: bytes):
+        if len(data) > self.capacity:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self.entries[key] = data
+        self.block_keys.setdefault(key[0], set()).add(key)
+        self.size += len(data)
+        while self.size > self.capacity:
+            evicted_key, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+            keys = self.block_keys.get(evicted_key[0])
+            if keys is not None:
+                keys.discard(evicted_key)
+                if not keys:
+                    del self.block_keys[evicted_key[0]]
+
+    def invalidate(self, block_id: str):
+        """Descarta los chunks de un bloque borrado o reescrito"""
+        for key in self.block_keys.pop(block_id, set()):
+            data = self.entries.pop(key, None)
+            if data is not None:
+                self.size -= len(data)
+        for key in [key for key in self.loading if key[0] == block_id]:
+            del self.loading[key]
+
+    def report(self) -> dict:
+        lookups = self.hits + self.misses + self.shared
+        return {
+            "capacity_bytes": self.capacity,
+            "size_bytes": self.size,
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_reads": self.shared,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits + self.shared) / lookups if lookups else None
+        }
@@ -0,0 +1,308 @@
+import math
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import psutil
+
+SAMPLE_INTERVAL = 1.0  # Segundos entre muestras de CPU, disco y tasas de transferencia
+RATE_WINDOW = 10.0  # Segundos sobre los que se promedian los bytes/s
+SKETCH_ACCURACY = 0.01  # Error relativo máximo de los cuantiles
+SKETCH_WINDOW = 60.0  # Los cuantiles cubren entre uno y dos de estos períodos
+PING_INTERVAL = 5.0  # Segundos entre pings a los demás DataNodes
+PING_TIMEOUT = 2.0
+TRACKED_RPCS = ("PutBlock", "ReplicateBlock", "GetBlock", "SyncBlock")
+TRANSFER_RPCS = ("PutBlock", "ReplicateBlock", "GetBlock")  # Streams de datos que cuentan como in_flight
+QUANTILES = (0.5, 0.99)
+
+class QuantileSketch:
+    """Histograma logarítmico con error relativo acotado, al estilo de DDSketch.
+
+    Cada valor cae en el bucket ``ceil(log_gamma(valor))``, por lo que
+    cualquier cuantil se estima con error relativo ``accuracy`` usando memoria
+    proporcional al logaritmo del rango de valores y no a la cantidad de
+    muestras. Registrar una muestra cuesta un logaritmo y un acceso a dict.
+    """
+
+    def __init__(self, accuracy: float = SKETCH_ACCURACY):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other: 'QuantileSketch'):
+        self.count += other.count
+        self.zeros += other.zeros
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Punto del bucket con el mismo error relativo hacia ambos bordes
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+class WindowedSketch:
+    """Cuantiles de las muestras recientes: rota dos sketches cada ``window`` segundos"""
+
+    def __init__(self, window: float = SKETCH_WINDOW, accuracy: float = SKETCH_ACCURACY):
+        self.window = window
+        self.accuracy = accuracy
+        self.current = QuantileSketch(accuracy)
+        self.previous = QuantileSketch(accuracy)
+        self.rotated_at = time.monotonic()
+        # Totales acumulados desde el arranque, como la suma y el conteo de un summary de Prometheus
+        self.count = 0
+        self.sum = 0.0
+
+    def _rotate(self):
+        now = time.monotonic()
+        if now - self.rotated_at >= self.window:
+            # Tras más de una ventana sin muestras, la anterior también está vencida
+            self.previous = self.current if now - self.rotated_at < 2 * self.window else QuantileSketch(self.accuracy)
+            self.current = QuantileSketch(self.accuracy)
+            self.rotated_at = now
+
+    def add(self, value: float):
+        self._rotate()
+        self.current.add(value)
+        self.count += 1
+        self.sum += value
+
+    def quantiles(self, qs: Iterable[float] = QUANTILES) -> Dict[float, Optional[float]]:
+        self._rotate()
+        merged = QuantileSketch(self.accuracy)
+        merged.merge(self.previous)
+        merged.merge(self.current)
+        return {q: merged.quantile(q) for q in qs}
+
+class RateMeter:
+    """Contador acumulado y su tasa por segundo en los últimos ``window`` segundos"""
+
+    def __init__(self, window: float = RATE_WINDOW):
+        self.window = window
+        self.total = 0
+        self.samples: deque = deque()
+
+    def add(self, amount: int):
+        self.total += amount
+
+    def sample(self, now: float):
+        self.samples.append((now, self.total))
+        while len(self.samples) > 2 and now - self.samples[1][0] >= self.window:
+            self.samples.popleft()
+
+    def rate(self) -> float:
+        if len(self.samples) < 2:
+            return 0.0
+        (start, first), (end, last) = self.samples[0], self.samples[-1]
+        return (last - first) / (end - start) if end > start else 0.0
+
+class RpcStats:
+    def __init__(self):
+        self.active = 0
+        self.errors = 0
+        self.latency = WindowedSketch()
+
+class PeerStats:
+    def __init__(self, address: str):
+        self.address = address
+        self.rtt = WindowedSketch()
+        self.last_rtt: Optional[float] = None
+        self.failures = 0  # Pings fallidos seguidos
+        self.last_error: Optional[str] = None
+
+    @property
+    def up(self) -> bool:
+        return self.last_rtt is not None and not self.failures
+
+def inflight_path(storage_path: Path) -> Optional[Path]:
+    """Archivo de sysfs con las operaciones en curso del dispositivo que aloja ``storage_path`` (solo Linux)"""
+    try:
+        device = os.stat(storage_path).st_dev
+    except OSError:
+        return None
+    path = Path(f"/sys/dev/block/{os.major(device)}:{os.minor(device)}/inflight")
+    return path if path.exists() else None
+
+class DataNodeMetrics:
+    """Métricas medidas del DataNode para el NameNode, ``/metrics`` y Prometheus.
+
+    La CPU, la cola del disco y las tasas de transferencia se muestrean en una
+    única tarea cada ``SAMPLE_INTERVAL`` segundos, de modo que leer las
+    métricas no altera la medición. Las latencias de cada RPC y el RTT hacia
+    cada DataNode vecino se resumen con sketches de cuantiles que cuestan
+    memoria constante por serie.
+    """
+
+    def __init__(self, storage_path: Path, peers: Optional[Dict[str, str]] = None):
+        self.rpcs: Dict[str, RpcStats] = {method: RpcStats() for method in TRACKED_RPCS}
+        self.peers: Dict[str, PeerStats] = {node_id: PeerStats(address) for node_id, address in (peers or {}).items()}
+        self.bytes_in = RateMeter()
+        self.bytes_out = RateMeter()
+        self.inflight_path = inflight_path(storage_path)
+        self.disk_queue: Optional[int] = None
+        self.cpu = 0.0
+        # La primera llamada solo fija el punto de partida de cpu_percent
+        psutil.cpu_percent()
+
+    def in_flight(self) -> int:
+        return sum(self.rpcs[method].active for method in TRANSFER_RPCS)
+
+    @contextmanager
+    def track(self, method: str):
+        """Cuenta una llamada en curso y registra su duración al terminar"""
+        stats = self.rpcs[method]
+        stats.active += 1
+        start = time.perf_counter()
+        try:
+            yield stats
+        except BaseException:
+            stats.errors += 1
+            raise
+        finally:
+            stats.active -= 1
+            stats.latency.add(time.perf_counter() - start)
+
+    def record_ping(self, node_id: str, rtt: Optional[float], error: str = None):
+        peer = self.peers[node_id]
+        if rtt is None:
+            peer.failures += 1
+            peer.last_error = error
+            return
+        peer.failures = 0
+        peer.last_error = None
+        peer.last_rtt = rtt
+        peer.rtt.add(rtt)
+
+    def read_disk_queue(self) -> Optional[int]:
+        if self.inflight_path is None:
+            return None
+        try:
+            reads, writes = self.inflight_path.read_text().split()
+            return int(reads) + int(writes)
+        except (OSError, ValueError):
+            return None
+
+    def sample(self):
+        """Toma una muestra de CPU, cola del disco y bytes transferidos"""
+        now = time.monotonic()
+        self.cpu = psutil.cpu_percent()
+        self.disk_queue = self.read_disk_queue()
+        self.bytes_in.sample(now)
+        self.bytes_out.sample(now)
+
+    def latency_ms(self) -> float:
+        """Mediana de los RTT hacia los vecinos alcanzables, en milisegundos (0 sin vecinos)"""
+        rtts = sorted(
+            peer.rtt.quantiles((0.5,))[0.5] for peer in self.peers.values()
+            if peer.up and peer.rtt.count
+        )
+        return 1000 * rtts[len(rtts) // 2] if rtts else 0.0
+
+    def report(self) -> dict:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(1000 * value, 3)
+
+        return {
+            "cpu_percent": self.cpu,
+            "bytes_in_per_second": self.bytes_in.rate(),
+            "bytes_out_per_second": self.bytes_out.rate(),
+            "bytes_in_total": self.bytes_in.total,
+            "bytes_out_total": self.bytes_out.total,
+            "disk_queue_depth": self.disk_queue,
+            "rpcs": {
+                method: {
+                    "in_flight": stats.active,
+                    "calls": stats.latency.count,
+                    "errors": stats.errors,
+                    **{f"p{int(q * 100)}_ms": ms(value) for q, value in stats.latency.quantiles().items()}
+                }
+                for method, stats in self.rpcs.items()
+            },
+            "peers": {
+                node_id: {
+                    "up": peer.up,
+                    "rtt_ms": ms(peer.last_rtt),
+                    **{f"rtt_p{int(q * 100)}_ms": ms(value) for q, value in peer.rtt.quantiles().items()},
+                    "error": peer.last_error
+                }
+                for node_id, peer in sorted(self.peers.items())
+            }
+        }
+
+    def prometheus(self, node_id: str, gauges: Dict[str, Tuple[str, float]],
+                   counters: Dict[str, Tuple[str, float]]) -> str:
+        """Exposición en formato de texto de Prometheus (versión 0.0.4).
+
+        ``gauges`` y ``counters`` agregan series propias del DataNode, como el
+        espacio en disco o los aciertos de la caché: nombre -> (ayuda, valor).
+        """
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples: List[Tuple[str, Dict[str, str], float]]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                if value is None:
+                    continue
+                labels = {"node": node_id, **labels}
+                rendered = ",".join(f'{key}="{label_value(val)}"' for key, val in labels.items())
+                lines.append(f"{name}{suffix}{{{rendered}}} {float(value)!r}")
+
+        for name, (help_text, value) in gauges.items():
+            family(f"dfs_datanode_{name}", "gauge", help_text, [("", {}, value)])
+        for name, (help_text, value) in counters.items():
+            family(f"dfs_datanode_{name}", "counter", help_text, [("", {}, value)])
+        family("dfs_datanode_cpu_percent", "gauge", "Uso de CPU del host", [("", {}, self.cpu)])
+        family("dfs_datanode_disk_queue_depth", "gauge", "Operaciones de E/S en curso en el disco de almacenamiento",
+               [("", {}, self.disk_queue)])
+        family("dfs_datanode_received_bytes_total", "counter", "Bytes de bloques recibidos",
+               [("", {}, self.bytes_in.total)])
+        family("dfs_datanode_sent_bytes_total", "counter", "Bytes de bloques enviados a clientes y réplicas",
+               [("", {}, self.bytes_out.total)])
+        family("dfs_datanode_rpc_in_flight", "gauge", "Llamadas gRPC en curso",
+               [("", {"method": method}, stats.active) for method, stats in self.rpcs.items()])
+        family("dfs_datanode_rpc_errors_total", "counter", "Llamadas gRPC fallidas",
+               [("", {"method": method}, stats.errors) for method, stats in self.rpcs.items()])
+        family("dfs_datanode_rpc_duration_seconds", "summary", "Duración de las llamadas gRPC", [
+            sample
+            for method, stats in self.rpcs.items()
+            for sample in summary_samples({"method": method}, stats.latency)
+        ])
+        family("dfs_datanode_peer_up", "gauge", "1 si el último ping al DataNode vecino respondió",
+               [("", {"peer": node_id}, int(peer.up)) for node_id, peer in sorted(self.peers.items())])
+        family("dfs_datanode_peer_rtt_seconds", "summary", "RTT de los pings gRPC a los DataNodes vecinos", [
+            sample
+            for node_id, peer in sorted(self.peers.items())
+            for sample in summary_samples({"peer": node_id}, peer.rtt)
+        ])
+        return "\n".join(lines) + "\n"
+
+def summary_samples(labels: Dict[str, str], sketch: WindowedSketch) -> List[Tuple[str, Dict[str, str], float]]:
+    samples = [("", dict(labels, quantile=str(q)), value) for q, value in sketch.quantiles().items()]
+    samples.append(("_sum", labels, sketch.sum))
+    samples.append(("_count", labels, sketch.count))
+    return samples
+
+def label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -6,96 +6,640 @@ from ..proto import dfs_pb2, dfs_pb2_grpc
 import psutil
 import time
 from fastapi import FastAPI
-import random 
-from typing import List 
+from fastapi.responses import PlainTextResponse
+from typing import Dict, List
 import argparse
 import uvicorn
+import os
+import uuid
+import hashlib
+import mmap
+import socket
+import aiohttp
+from ..common.config import Config
+from ..common.throttle import Throttler
+from ..common.channels import AsyncChannelPool, SERVER_OPTIONS
+from .cache import BlockCache, CACHE_SIZE
+from .metrics import DataNodeMetrics, SAMPLE_INTERVAL, PING_INTERVAL, PING_TIMEOUT
+from ..common.checksum import (ChunkChecksummer, ChecksumError, crc, sidecar_path,
+                               write_sidecar, read_sidecar, verify_range, is_digest)
+
+GRPC_COMPRESSION = {
+    None: grpc.Compression.NoCompression,
+    "none": grpc.Compression.NoCompression,
+    "gzip": grpc.Compression.Gzip,
+    "deflate": grpc.Compression.Deflate,
+}
+HEARTBEAT_INTERVAL = 3.0  # Segundos entre heartbeats al NameNode
+FULL_REPORT_INTERVAL = 600.0  # Segundos entre block reports completos
+
+class BlockWriter:
+    """Escribe un bloque en streaming a un archivo temporal y lo publica atómicamente.
+
+    Los checksums se calculan de forma incremental mientras llegan los datos y
+    se publican en el archivo auxiliar antes que el bloque. Un bloque cuyo
+    identificador es un digest de contenido solo se publica si los datos
+    recibidos tienen ese SHA-256.
+    """
+
+    def __init__(self, storage_path: Path, block_id: str):
+        self.final_path = storage_path / block_id
+        suffix = uuid.uuid4().hex
+        self.tmp_path = storage_path / f".{block_id}.{suffix}.tmp"
+        self.tmp_sidecar = storage_path / f".{block_id}.{suffix}.crc.tmp"
+        self.file = open(self.tmp_path, 'wb')
+        self.checksummer = ChunkChecksummer()
+        self.block_id = block_id
+        self.digest = hashlib.sha256() if is_digest(block_id) else None
+        self.size = 0
+
+    def _write(self, data: bytes):
+        self.file.write(data)
+        self.checksummer.update(data)
+        if self.digest is not None:
+            self.digest.update(data)
+
+    async def write(self, data: bytes):
+        # La escritura se hace fuera del event loop para no bloquear otros streams
+        await asyncio.to_thread(self._write, data)
+        self.size += len(data)
+
+    def _commit(self):
+        if self.digest is not None and f"sha256-{self.digest.hexdigest()}" != self.block_id:
+            # La deduplicación entregaría este contenido a otros archivos con ese digest
+            raise ChecksumError(f"El contenido no coincide con el digest {self.block_id}")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        write_sidecar(self.tmp_sidecar, self.checksummer.finish())
+        with open(self.tmp_sidecar, 'rb') as f:
+            os.fsync(f.fileno())
+        # Primero los checksums: nunca existe un bloque publicado sin ellos
+        os.replace(self.tmp_sidecar, sidecar_path(self.final_path))
+        os.replace(self.tmp_path, self.final_path)
+        # Persistir la entrada del directorio tras el rename
+        dir_fd = os.open(self.final_path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    async def commit(self):
+        """Sincroniza a disco y renombra el temporal al nombre definitivo"""
+        await asyncio.to_thread(self._commit)
+
+    def abort(self):
+        """Descarta los archivos temporales"""
+        if not self.file.closed:
+            self.file.close()
+        self.tmp_path.unlink(missing_ok=True)
+        self.tmp_sidecar.unlink(missing_ok=True)
+
+
+class MappedBlock:
+    """Archivo de bloque abierto y mapeado una sola vez para toda una lectura.
+
+    Se anuncia acceso secuencial sobre el rango pedido. Las lecturas de la
+    caché que usan el mapeo toman una referencia: el mapeo se cierra cuando
+    lo liberan el lector y todas ellas, aunque el lector termine antes.
+    """
+
+    def __init__(self, block_path: Path, start: int, limit: int):
+        self.file = open(block_path, 'rb')
+        try:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(self.file.fileno(), start, limit - start, os.POSIX_FADV_SEQUENTIAL)
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.file.close()
+            raise
+        if hasattr(self.mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            self.mm.madvise(mmap.MADV_SEQUENTIAL)
+        self.view = memoryview(self.mm)
+        self.limit = min(limit, len(self.mm))
+        self.users = 1
+
+    def acquire(self):
+        self.users += 1
+
+    def release(self):
+        self.users -= 1
+        if self.users == 0:
+            self.view.release()
+            self.mm.close()
+            self.file.close()
+
+class ReplicationPipeline:
+    """Reenvía los chunks de un bloque al siguiente nodo de la cadena.
+
+    Se abre un único stream ReplicateBlock hacia el primer nodo de
+    ``downstream``; ese nodo recibe el resto de la cadena y repite el proceso,
+    de modo que todas las réplicas reciben datos a la vez. El canal se toma
+    del pool del DataNode y se devuelve al cerrar el stream.
+    """
+
+    def __init__(self, node_id: str, block_id: str, downstream: List[str], channels: AsyncChannelPool,
+                 depth: int = 4, compression: grpc.Compression = grpc.Compression.NoCompression):
+        self.node_id = node_id
+        self.block_id = block_id
+        self.downstream = downstream
+        self.failed = False
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=depth)
+        self.channels = channels
+        self.compression = compression
+        channel = channels.acquire(downstream[0], compression)
+        stub = dfs_pb2_grpc.FileServiceStub(channel)
+        self.task = asyncio.ensure_future(stub.ReplicateBlock(self._requests()))
+
+    async def _requests(self):
+        first = True
+        while (item := await self.queue.get()) is not None:
+            data, checksum = item
+            yield dfs_pb2.BlockData(
+                block_id=self.block_id,
+                data=data,
+                source_node=self.node_id,
+                replica_nodes=self.downstream[1:] if first else [],
+                checksum=checksum
+            )
+            first = False
+
+    async def _put(self, item):
+        # Si el follower cae, la cola deja de consumirse: no bloquear al leader
+        put = asyncio.ensure_future(self.queue.put(item))
+        done, _ = await asyncio.wait({put, self.task}, return_when=asyncio.FIRST_COMPLETED)
+        if put not in done:
+            put.cancel()
+            self.failed = True
+
+    async def send(self, data: bytes, checksum: int):
+        """Encola un chunk y su checksum para el siguiente nodo de la cadena"""
+        if not self.failed:
+            await self._put((data, checksum))
+
+    async def close(self):
+        """Cierra el stream y devuelve (éxito, mensaje) de la cadena"""
+        try:
+            if not self.failed:
+                await self._put(None)
+            response = await self.task
+            return response.success, response.message
+        except grpc.RpcError as e:
+            return False, f"Error replicando a {self.downstream[0]}: {e.details()}"
+        except Exception as e:
+            return False, f"Error replicando a {self.downstream[0]}: {e}"
+        finally:
+            self.channels.release(self.downstream[0], self.compression)
+
+    async def abort(self):
+        """Cancela el stream hacia la cadena"""
+        self.task.cancel()
+        self.channels.release(self.downstream[0], self.compression)
+
 
 class DataNode(dfs_pb2_grpc.FileServiceServicer):
-    def __init__(self, node_id: str, storage_path: str = "./storage"):
+    def __init__(self, node_id: str, storage_path: str = "./storage", chunk_size: int = 1024 * 1024,
+                 address: str = None, namenode_address: str = None, replication_bandwidth: int = 0,
+                 replication_compression: str = None, cache_size: int = CACHE_SIZE,
+                 peers: Dict[str, str] = None):
         self.node_id = node_id
+        self.chunk_size = chunk_size
+        self.cache = BlockCache(cache_size)
+        # Ancho de banda compartido por las copias ordenadas por el NameNode
+        self.replication_throttle = Throttler(replication_bandwidth)
+        # Compresión del canal hacia los siguientes nodos de la cadena (útil si la red es el cuello de botella)
+        if replication_compression not in GRPC_COMPRESSION:
+            raise ValueError(f"Compresión de replicación desconocida: {replication_compression}")
+        self.replication_compression = GRPC_COMPRESSION[replication_compression]
+        # Canales hacia otros DataNodes, compartidos por todos los pipelines
+        self.channels = AsyncChannelPool()
+        self.address = address
+        self.namenode_address = namenode_address
+        # Block report incremental pendiente de enviar en el próximo heartbeat
+        self.added_blocks = set()
+        self.removed_blocks = set()
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(parents=True, exist_ok=True)
+        # Eliminar temporales de escrituras interrumpidas
+        for stale in self.storage_path.glob('.*.tmp'):
+            stale.unlink(missing_ok=True)
+        # Bloques almacenados localmente y sus bytes
+        self.blocks = {block_id: (self.storage_path / block_id).stat().st_size for block_id in self.list_blocks()}
         self.leader_blocks = set()  # Bloques para los que este nodo es leader
         self.follower_blocks = set()  # Bloques para los que este nodo es follower
+        # Demás DataNodes del clúster, a los que se mide el RTT
+        self.metrics = DataNodeMetrics(self.storage_path, {
+            peer_id: peer for peer_id, peer in (peers or {}).items() if peer_id != node_id and peer != address
+        })
         self.metrics_app = FastAPI()
         self.setup_metrics_endpoint()
 
+    @property
+    def in_flight(self) -> int:
+        """Streams PutBlock/ReplicateBlock/GetBlock activos"""
+        return self.metrics.in_flight()
+
     def setup_metrics_endpoint(self):
         @self.metrics_app.get("/metrics")
         async def get_metrics():
             return {
-                "load": psutil.cpu_percent(),
+                "load": self.metrics.cpu,
                 "available_space": psutil.disk_usage(str(self.storage_path)).free,
-                "latency": self.get_network_latency()
+                "latency": self.get_network_latency(),
+                "in_flight": self.in_flight,
+                "block_count": len(self.blocks),
+                "dfs_used": sum(self.blocks.values()),
+                **self.metrics.report(),
+                "cache": self.cache.report()
+            }
+
+        @self.metrics_app.get("/metrics/prometheus", response_class=PlainTextResponse)
+        async def get_prometheus_metrics():
+            disk = psutil.disk_usage(str(self.storage_path))
+            cache = self.cache.report()
+            gauges = {
+                "capacity_bytes": ("Capacidad del disco de almacenamiento", disk.total),
+                "available_bytes": ("Espacio libre del disco de almacenamiento", disk.free),
+                "used_bytes": ("Bytes ocupados por bloques", sum(self.blocks.values())),
+                "blocks": ("Bloques almacenados", len(self.blocks)),
+                "cache_size_bytes": ("Bytes en la caché de lectura", cache["size_bytes"]),
+            }
+            counters = {
+                "cache_hits_total": ("Lecturas servidas desde la caché", cache["hits"]),
+                "cache_misses_total": ("Lecturas que fueron al disco", cache["misses"]),
+                "cache_evictions_total": ("Chunks desalojados de la caché", cache["evictions"]),
+            }
+            return PlainTextResponse(self.metrics.prometheus(self.node_id, gauges, counters),
+                                     media_type="text/plain; version=0.0.4")
+
+    def get_network_latency(self) -> float:
+        """Mediana del RTT medido hacia los demás DataNodes, en milisegundos"""
+        return self.metrics.latency_ms()
+
+    async def sample_loop(self):
+        """Muestrea CPU, cola del disco y tasas de transferencia a intervalos fijos"""
+        while True:
+            await asyncio.to_thread(self.metrics.sample)
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    async def ping(self, peer_id: str, address: str):
+        request = dfs_pb2.PingRequest(source_node=self.node_id)
+        start = time.perf_counter()
+        try:
+            with self.channels.channel(address) as channel:
+                await dfs_pb2_grpc.FileServiceStub(channel).Ping(request, timeout=PING_TIMEOUT)
+        except grpc.RpcError as e:
+            self.metrics.record_ping(peer_id, None, e.details() or str(e.code()))
+            return
+        self.metrics.record_ping(peer_id, time.perf_counter() - start)
+
+    async def ping_loop(self):
+        """Mide el RTT gRPC hacia cada DataNode vecino con pings concurrentes"""
+        while True:
+            await asyncio.gather(*(
+                self.ping(peer_id, peer.address) for peer_id, peer in self.metrics.peers.items()
+            ))
+            await asyncio.sleep(PING_INTERVAL)
+
+    def list_blocks(self) -> List[str]:
+        """Identificadores de los bloques almacenados localmente"""
+        return [path.name for path in self.storage_path.iterdir() if not path.name.startswith('.')]
+
+    def build_heartbeat(self) -> dict:
+        disk = psutil.disk_usage(str(self.storage_path))
+        heartbeat = {
+            "node_id": self.node_id,
+            "address": self.address,
+            "capacity": disk.total,
+            "available_space": disk.free,
+            "load": self.metrics.cpu,
+            "latency": self.get_network_latency(),
+            "in_flight": self.in_flight,
+            "block_count": len(self.blocks),
+            "dfs_used": sum(self.blocks.values()),
+            "bytes_in_per_second": self.metrics.bytes_in.rate(),
+            "bytes_out_per_second": self.metrics.bytes_out.rate(),
+            "disk_queue_depth": self.metrics.disk_queue
+        }
+        if self.added_blocks or self.removed_blocks:
+            heartbeat["blocks"] = {
+                "added": sorted(self.added_blocks),
+                "removed": sorted(self.removed_blocks)
             }
+        return heartbeat
+
+    async def send_heartbeat(self, session: aiohttp.ClientSession) -> dict:
+        """Envía un heartbeat con el block report incremental acumulado"""
+        added, removed = set(self.added_blocks), set(self.removed_blocks)
+        async with session.post(f"http://{self.namenode_address}/heartbeat", json=self.build_heartbeat()) as response:
+            response.raise_for_status()
+            result = await response.json()
+        # Solo se descartan los cambios que el NameNode ya recibió
+        self.added_blocks -= added
+        self.removed_blocks -= removed
+        return result
+
+    async def send_block_report(self, session: aiohttp.ClientSession):
+        """Envía la lista completa de bloques almacenados"""
+        blocks = await asyncio.to_thread(self.list_blocks)
+        async with session.post(
+            f"http://{self.namenode_address}/blockreport",
+            json={"node_id": self.node_id, "blocks": blocks}
+        ) as response:
+            response.raise_for_status()
+
+    def unlink_block(self, block_id: str):
+        """Borra del disco un bloque y su sidecar de checksums"""
+        block_path = self.block_path(block_id)
+        block_path.unlink(missing_ok=True)
+        sidecar_path(block_path).unlink(missing_ok=True)
 
-    def get_network_latency(self):
-        # Simulación simple de latencia
-        return random.uniform(0.1, 2.0)
+    async def delete_block(self, block_id: str):
+        """Elimina un bloque local y lo anota para el próximo block report"""
+        # Solo el borrado va a un hilo: la caché y el registro de bloques pertenecen al event loop
+        await asyncio.to_thread(self.unlink_block, block_id)
+        self.cache.invalidate(block_id)
+        self.blocks.pop(block_id, None)
+        self.added_blocks.discard(block_id)
+        self.removed_blocks.add(block_id)
 
-    async def become_leader(self, block_id: str, follower_nodes: List[str]):
-        """Gestiona el rol de leader para un bloque"""
+    async def execute_commands(self, commands: List[dict]):
+        """Ejecuta los comandos devueltos por el NameNode en la respuesta al heartbeat"""
+        for command in commands:
+            if command.get("action") == "delete":
+                for block_id in command.get("blocks", []):
+                    try:
+                        await self.delete_block(block_id)
+                    except Exception as e:
+                        print(f"Error deleting block {block_id}: {e}")
+
+    async def heartbeat_loop(self):
+        """Mantiene al NameNode informado del estado y los bloques de este nodo"""
+        last_full_report = None
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=HEARTBEAT_INTERVAL)) as session:
+            while True:
+                try:
+                    result = await self.send_heartbeat(session)
+                    await self.execute_commands(result.get("commands", []))
+                    if last_full_report is None or time.monotonic() - last_full_report > FULL_REPORT_INTERVAL:
+                        await self.send_block_report(session)
+                        last_full_report = time.monotonic()
+                except Exception as e:
+                    print(f"Error sending heartbeat to NameNode {self.namenode_address}: {e}")
+                    # Tras reconectar, el NameNode necesita un block report completo
+                    last_full_report = None
+                await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def become_leader(self, block_id: str, follower_nodes: List[str], throttle: Throttler = None):
+        """Envía un bloque ya almacenado a la cadena de followers en un único stream"""
         self.leader_blocks.add(block_id)
-        
-        # Coordinar con followers
-        for follower in follower_nodes:
-            try:
-                channel = grpc.aio.insecure_channel(follower)
-                stub = dfs_pb2_grpc.FileServiceStub(channel)
-                
-                # Enviar datos a follower
-                block_path = self.storage_path / block_id
-                with open(block_path, 'rb') as f:
-                    while chunk := f.read(1024 * 1024):
-                        await stub.ReplicateBlock(
-                            dfs_pb2.BlockData(
-                                block_id=block_id,
-                                data=chunk,
-                                source_node=self.node_id
-                            )
-                        )
-            except Exception as e:
-                print(f"Error replicating to follower {follower}: {e}")
-                # Implementar reintentos o selección de follower alternativo
+        if not follower_nodes:
+            return True, ""
 
-    async def PutBlock(self, request_iterator, context):
-        """Maneja la escritura de bloques y coordina la replicación"""
-        block_data = b""
+        pipeline = ReplicationPipeline(self.node_id, block_id, follower_nodes, self.channels,
+                                       compression=self.replication_compression)
+        try:
+            # La copia local se verifica contra sus checksums antes de reenviarla
+            async for chunk in self.read_block(block_id):
+                if throttle is not None:
+                    await throttle.consume(len(chunk))
+                await pipeline.send(chunk, crc(chunk))
+                self.metrics.bytes_out.add(len(chunk))
+        except Exception as e:
+            await pipeline.abort()
+            return False, f"Error leyendo bloque {block_id}: {e}"
+        return await pipeline.close()
+
+    def block_path(self, block_id: str) -> Path:
+        """Ruta del bloque en el almacenamiento local, validando el identificador"""
+        if not block_id or '/' in block_id or block_id.startswith('.'):
+            raise ValueError(f"Identificador de bloque inválido: {block_id!r}")
+        return self.storage_path / block_id
+
+    async def receive_block(self, request_iterator, method: str):
+        """Persiste un bloque recibido en streaming y lo reenvía por la cadena.
+
+        Cada chunk se escribe directamente a un archivo temporal mientras se
+        reenvía al siguiente nodo de ``replica_nodes``, por lo que la memoria por
+        stream está acotada por el tamaño del chunk y la latencia de escritura
+        con N réplicas se aproxima a la de una sola transferencia.
+        """
+        with self.metrics.track(method) as stats:
+            block_id, response = await self._receive_block(request_iterator)
+            if not response.success:
+                stats.errors += 1
+            return block_id, response
+
+    async def _receive_block(self, request_iterator):
+        writer = None
+        pipeline = None
         block_id = None
-        replica_nodes = []
-        
-        async for request in request_iterator:
-            if block_id is None:
-                block_id = request.block_id
-                replica_nodes = request.replica_nodes
-            block_data += request.data
-
-        if block_id:
-            # Guardar bloque localmente
-            block_path = self.storage_path / block_id
-            with open(block_path, 'wb') as f:
-                f.write(block_data)
-            
-            # Si es leader, coordinar replicación
-            if self.node_id == replica_nodes[0]:
-                await self.become_leader(block_id, replica_nodes[1:])
-            
-            return dfs_pb2.BlockResponse(success=True)
-        
-        return dfs_pb2.BlockResponse(success=False, message="No block ID provided")
+
+        try:
+            async for request in request_iterator:
+                if writer is None:
+                    block_id = request.block_id
+                    self.block_path(block_id)
+                    writer = BlockWriter(self.storage_path, block_id)
+                    if request.replica_nodes:
+                        pipeline = ReplicationPipeline(self.node_id, block_id, list(request.replica_nodes),
+                                                       self.channels, compression=self.replication_compression)
+                checksum = crc(request.data)
+                if request.HasField('checksum') and checksum != request.checksum:
+                    raise ChecksumError(f"Checksum inválido en el bloque {block_id} (offset {writer.size})")
+                self.metrics.bytes_in.add(len(request.data))
+                if pipeline is not None:
+                    await asyncio.gather(writer.write(request.data), pipeline.send(request.data, checksum))
+                    self.metrics.bytes_out.add(len(request.data))
+                else:
+                    await writer.write(request.data)
+
+            if writer is None:
+                return None, dfs_pb2.BlockResponse(success=False, message="No block ID provided")
+
+            await writer.commit()
+            # Un bloque borrado y recibido de nuevo no debe servirse desde la caché
+            self.cache.invalidate(block_id)
+        except Exception as e:
+            if writer is not None:
+                writer.abort()
+            if pipeline is not None:
+                await pipeline.abort()
+            return block_id, dfs_pb2.BlockResponse(success=False, message=f"Error escribiendo bloque: {e}")
+
+        message = ""
+        if pipeline is not None:
+            # Un fallo aguas abajo no invalida la copia local: se informa en el mensaje
+            replicated, message = await pipeline.close()
+            if not replicated:
+                print(f"Error replicating block {block_id}: {message}")
+
+        self.blocks[block_id] = writer.size
+        self.added_blocks.add(block_id)
+        self.removed_blocks.discard(block_id)
+        return block_id, dfs_pb2.BlockResponse(success=True, message=message)
+
+    async def PutBlock(self, request_iterator, context):
+        """Maneja la escritura de bloques como leader del pipeline de replicación"""
+        block_id, response = await self.receive_block(request_iterator, "PutBlock")
+        if response.success:
+            self.leader_blocks.add(block_id)
+        return response
+
+    async def ReplicateBlock(self, request_iterator, context):
+        """Recibe un bloque de un nodo anterior de la cadena y lo reenvía al siguiente"""
+        block_id, response = await self.receive_block(request_iterator, "ReplicateBlock")
+        if response.success:
+            self.follower_blocks.add(block_id)
+        return response
+
+    async def SyncBlock(self, request, context):
+        """Copia un bloque local a los nodos indicados por el NameNode (re-replicación).
+
+        La copia usa el ancho de banda limitado de replicación para no competir
+        con las lecturas y escrituras de los clientes.
+        """
+        if not request.target_nodes:
+            return dfs_pb2.BlockResponse(success=False, message="No target nodes provided")
+        with self.metrics.track("SyncBlock") as stats:
+            success, message = await self.become_leader(
+                request.block_id, list(request.target_nodes), self.replication_throttle
+            )
+            if not success:
+                stats.errors += 1
+        return dfs_pb2.BlockResponse(success=success, message=message)
+
+    async def Ping(self, request, context):
+        """Responde de inmediato: el emisor mide el RTT de la llamada"""
+        return dfs_pb2.PingResponse(node_id=self.node_id)
+
+    def _read_chunk(self, block: MappedBlock, offset: int, end: int, sidecar) -> bytes:
+        """Copia [offset, end) del mapeo verificando las ventanas de checksum que lo cubren
+        y anticipa la lectura siguiente dentro del rango pedido"""
+        if hasattr(block.mm, 'madvise') and hasattr(mmap, 'MADV_WILLNEED') and end < block.limit:
+            # madvise exige un offset alineado a página
+            start = end - (end % mmap.PAGESIZE)
+            block.mm.madvise(mmap.MADV_WILLNEED, start, min(end + self.chunk_size, block.limit) - start)
+        if sidecar is not None:
+            bytes_per_checksum, checksums = sidecar
+            bad = verify_range(block.view, offset, end, bytes_per_checksum, checksums)
+            if bad:
+                raise ChecksumError(f"Checksum inválido en los chunks {bad}")
+        # protobuf exige bytes: se copia un único chunk, nunca el bloque completo
+        return bytes(block.view[offset:end])
+
+    async def read_block(self, block_id: str, offset: int = 0, length: int = 0):
+        """Lee un rango de un bloque local en chunks verificados contra sus checksums.
+
+        Los chunks completos se leen alineados a ``chunk_size`` a través de la
+        caché, de modo que lecturas repetidas o concurrentes del mismo bloque
+        comparten una sola lectura de disco. Los chunks parciales de los bordes
+        del rango se sirven de la caché si ya están; si no, se leen y verifican
+        solo las ventanas de checksum que tocan el rango, sin guardarlos. Las
+        lecturas de disco comparten un único archivo abierto y mapeado, que se
+        abre en el primer fallo de caché. Lanza FileNotFoundError si el bloque
+        no existe y ChecksumError (tras informar al NameNode) si la copia local
+        está corrupta.
+        """
+        block_path = self.block_path(block_id)
+        size = (await asyncio.to_thread(os.stat, block_path)).st_size
+        start = min(max(offset, 0), size)
+        limit = size if length <= 0 else min(size, start + length)
+        if start >= limit:
+            return
+
+        sidecar = []
+        mapped: List[MappedBlock] = []
+        closed = False
+
+        async def load(base: int, end: int) -> bytes:
+            # Bloques escritos antes de existir los checksums se sirven sin verificar
+            if not sidecar:
+                sidecar.append(await asyncio.to_thread(read_sidecar, sidecar_path(block_path)))
+            if not mapped:
+                mapped.append(await asyncio.to_thread(MappedBlock, block_path, start, limit))
+                if closed:
+                    # El lector ya terminó: esta lectura se queda con su referencia
+                    mapped[0].release()
+            block = mapped[0]
+            block.acquire()
+            try:
+                # Los fallos de página y los CRC se resuelven fuera del event loop
+                return await asyncio.to_thread(self._read_chunk, block, base, end, sidecar[0])
+            finally:
+                block.release()
+
+        try:
+            for index in range(start // self.chunk_size, -(-limit // self.chunk_size)):
+                base = index * self.chunk_size
+                end = min(base + self.chunk_size, size)
+                low, high = max(start, base), min(limit, end)
+                try:
+                    if low == base and high == end:
+                        chunk = await self.cache.get((block_id, index), lambda base=base, end=end: load(base, end))
+                    else:
+                        cached = self.cache.peek((block_id, index))
+                        chunk = cached[low - base:high - base] if cached is not None else await load(low, high)
+                except ChecksumError:
+                    await self.report_bad_block(block_id)
+                    raise
+                yield chunk
+        finally:
+            closed = True
+            if mapped:
+                mapped[0].release()
+
+    async def report_bad_block(self, block_id: str):
+        """Informa al NameNode de una réplica corrupta para que la reemplace"""
+        print(f"Corrupt replica of block {block_id} detected on {self.node_id}")
+        if not self.namenode_address:
+            return
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=HEARTBEAT_INTERVAL)) as session:
+                async with session.post(
+                    f"http://{self.namenode_address}/badblock",
+                    json={"node_id": self.node_id, "block_id": block_id}
+                ) as response:
+                    response.raise_for_status()
+        except Exception as e:
+            print(f"Error reporting bad block {block_id}: {e}")
+
+    async def GetBlock(self, request, context):
+        """Envía un bloque (o el rango offset/length pedido) en chunks de tamaño fijo
+        leídos de un mapeo en memoria"""
+        with self.metrics.track("GetBlock"):
+            async for message in self.stream_block(request, context):
+                yield message
+
+    async def stream_block(self, request, context):
+        try:
+            async for data in self.read_block(request.block_id, request.offset, request.length):
+                self.metrics.bytes_out.add(len(data))
+                yield dfs_pb2.BlockData(
+                    block_id=request.block_id,
+                    data=data,
+                    source_node=self.node_id,
+                    checksum=crc(data)
+                )
+        except (ValueError, FileNotFoundError):
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"Bloque {request.block_id} no encontrado")
+        except ChecksumError as e:
+            await context.abort(grpc.StatusCode.DATA_LOSS, f"Bloque {request.block_id} corrupto: {e}")
 
 async def start_metrics_server(metrics_app, metrics_port):
     config = uvicorn.Config(metrics_app, host="0.0.0.0", port=metrics_port, log_level="info")
     server = uvicorn.Server(config)
     await server.serve()
 
-async def serve(node_id: str, port: int, storage_path: str):
+async def serve(node_id: str, port: int, storage_path: str, chunk_size: int = 1024 * 1024,
+                address: str = None, namenode_address: str = None, replication_bandwidth: int = 0,
+                replication_compression: str = None, cache_size: int = CACHE_SIZE, peers: Dict[str, str] = None):
     """Inicia el servidor gRPC y FastAPI del DataNode en paralelo"""
-    datanode = DataNode(node_id, storage_path)
+    datanode = DataNode(node_id, storage_path, chunk_size, address, namenode_address, replication_bandwidth,
+                        replication_compression, cache_size, peers)
 
     # Configurar servidor gRPC
-    grpc_server = grpc.aio.server(futures.ThreadPoolExecutor(max_workers=10))
+    grpc_server = grpc.aio.server(futures.ThreadPoolExecutor(max_workers=10), options=SERVER_OPTIONS)
     dfs_pb2_grpc.add_FileServiceServicer_to_server(datanode, grpc_server)
     server_address = f'[::]:{port}'
     grpc_server.add_insecure_port(server_address)
@@ -103,11 +647,16 @@ async def serve(node_id: str, port: int, storage_path: str):
     # Iniciar ambos servidores en paralelo
     metrics_port = port + 100  # Puerto para métricas = puerto gRPC + 100
     print(f"DataNode {node_id} escuchando en el puerto {port} (gRPC) y {metrics_port} (métricas)")
-    await asyncio.gather(
+    tasks = [
         grpc_server.start(),
         start_metrics_server(datanode.metrics_app, metrics_port),
-        grpc_server.wait_for_termination()
-    )
+        grpc_server.wait_for_termination(),
+        datanode.sample_loop(),
+        datanode.ping_loop()
+    ]
+    if namenode_address:
+        tasks.append(datanode.heartbeat_loop())
+    await asyncio.gather(*tasks)
 
 def main():
     """Punto de entrada principal para el DataNode"""
@@ -115,15 +664,31 @@ def main():
     parser.add_argument('--node-id', required=True, help='ID único del DataNode')
     parser.add_argument('--port', type=int, required=True, help='Puerto para el servidor gRPC')
     parser.add_argument('--storage', required=True, help='Ruta para almacenamiento de bloques')
+    parser.add_argument('--config', help='Ruta al archivo de configuración')
+    parser.add_argument('--chunk-size', type=int, help='Tamaño en bytes de cada mensaje de lectura')
+    parser.add_argument('--host', help='Host anunciado al NameNode y a otros DataNodes')
+    parser.add_argument('--namenode', help='Dirección host:puerto del NameNode')
+    parser.add_argument('--replication-compression', choices=['none', 'gzip', 'deflate'],
+                        help='Compresión gRPC de los streams de replicación hacia otros DataNodes')
+    parser.add_argument('--cache-size', type=int, help='Bytes de la caché de lectura de bloques (0 la desactiva)')
     
     args = parser.parse_args()
+    config = Config.load(args.config)
+    chunk_size = args.chunk_size or config.CHUNK_SIZE
+    if args.host:
+        address = f"{args.host}:{args.port}"
+    else:
+        address = config.DATANODES.get(args.node_id, f"{socket.gethostname()}:{args.port}")
+    namenode_address = args.namenode or f"{config.NAMENODE_HOST}:{config.NAMENODE_PORT}"
     
     # Crear directorio de almacenamiento si no existe
     storage_path = Path(args.storage)
     storage_path.mkdir(parents=True, exist_ok=True)
     
     # Iniciar el servidor
-    asyncio.run(serve(args.node_id, args.port, str(storage_path)))
+    asyncio.run(serve(args.node_id, args.port, str(storage_path), chunk_size, address, namenode_address,
+                      config.REPLICATION_BANDWIDTH, args.replication_compression or config.REPLICATION_COMPRESSION,
+                      args.cache_size if args.cache_size is not None else config.CACHE_SIZE, config.DATANODES))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+import grpc
+from ..proto import dfs_pb2, dfs_pb2_grpc
+from ..common.config import Config
+from .replication import PENDING_TIMEOUT
+
+BALANCE_THRESHOLD = 10.0  # Puntos porcentuales de utilización tolerados respecto de la media del clúster
+ITERATION_WAIT = 7.0  # Segundos entre iteraciones: los heartbeats deben reflejar los bloques movidos
+MAX_MOVES_PER_ITERATION = 64
+MAX_IDLE_ITERATIONS = 3  # Iteraciones seguidas sin mover nada tras las que la corrida se abandona
+STATUS_INTERVAL = 2.0
+
+class Balancer:
+    """Equilibra el uso de disco de los DataNodes moviendo réplicas de bloques.
+
+    La utilización de cada nodo son los bytes de bloques que informa en sus
+    heartbeats sobre su capacidad. Mientras algún nodo se aleje de la media
+    más que ``threshold`` puntos, cada iteración elige bloques sanos de los
+    nodos más llenos y los copia con ``SyncBlock`` a nodos con espacio; la
+    copia usa el ancho de banda limitado de la replicación. Al terminar, el
+    mapa de bloques pasa a apuntar al destino y la réplica de origen se
+    borra. Las copias se registran como pendientes en el monitor de
+    replicación, que mientras tanto no repara ni recorta esos bloques.
+
+    Solo se mueven bloques replicados: las celdas de erasure coding tienen su
+    nodo fijado en los metadatos del archivo.
+    """
+
+    def __init__(self, namenode, threshold: float = BALANCE_THRESHOLD, period: float = 0,
+                 wait: float = ITERATION_WAIT):
+        self.namenode = namenode
+        self.threshold = threshold
+        self.period = period
+        self.wait = wait
+        self.task: Optional[asyncio.Task] = None
+        self.periodic_task: Optional[asyncio.Task] = None
+        self.status = "idle"
+        self.iterations = 0
+        self.moved_blocks = 0
+        self.moved_bytes = 0
+        self.failed_moves = 0
+        self.started_at: Optional[float] = None
+
+    def utilization(self) -> Dict[str, Tuple[int, int]]:
+        """Bytes usados y capacidad de cada DataNode vivo que los informa"""
+        return {
+            metrics["node_id"]: (metrics.get("dfs_used", 0), metrics["capacity"])
+            for metrics in self.namenode.health.live_nodes()
+            if metrics.get("capacity") and metrics["node_id"] in self.namenode.datanodes
+        }
+
+    def spread(self) -> Optional[float]:
+        """Diferencia en puntos porcentuales entre el nodo más lleno y el más vacío"""
+        usage = self.utilization()
+        if len(usage) < 2:
+            return None
+        percents = [100 * used / capacity for used, capacity in usage.values()]
+        return max(percents) - min(percents)
+
+    def balanced(self) -> bool:
+        """Ningún nodo se aleja de la utilización media más que ``threshold`` puntos"""
+        usage = self.utilization()
+        if len(usage) < 2:
+            return True
+        average = 100 * sum(used for used, _ in usage.values()) / sum(capacity for _, capacity in usage.values())
+        return all(abs(100 * used / capacity - average) <= self.threshold for used, capacity in usage.values())
+
+    def block_bytes(self, block_id: str) -> int:
+        """Tamaño estimado de un bloque: el NameNode solo conoce el del archivo que lo contiene"""
+        file_node = self.namenode.namespace.blocks[block_id]
+        return min(file_node.block_size, file_node.size) if file_node.size else file_node.block_size
+
+    def movable(self, block_id: str) -> bool:
+        file_node = self.namenode.namespace.blocks.get(block_id)
+        replication = self.namenode.replication
+        return (
+            file_node is not None and not file_node.under_construction and not file_node.ec_policy
+            and block_id not in replication.pending
+            and len(replication.live_replicas(block_id)) >= file_node.replication
+        )
+
+    def plan(self) -> List[Tuple[str, str, str]]:
+        """Movimientos ``(bloque, origen, destino)`` de una iteración; vacío si el clúster está equilibrado"""
+        usage = self.utilization()
+        if self.balanced():
+            return []
+        average = sum(used for used, _ in usage.values()) / sum(capacity for _, capacity in usage.values())
+        percent = {node_id: used / capacity for node_id, (used, capacity) in usage.items()}
+        limit = self.threshold / 100
+        over = [node_id for node_id in usage if percent[node_id] > average + limit]
+        under = [node_id for node_id in usage if percent[node_id] < average - limit]
+        # Como el balancer de HDFS: si un lado está dentro del umbral se usan los nodos por encima o debajo de la media
+        sources = over or [node_id for node_id in usage if percent[node_id] > average]
+        targets = under or [node_id for node_id in usage if percent[node_id] < average]
+        excess = {node_id: usage[node_id][0] - average * usage[node_id][1] for node_id in sources}
+        room = {node_id: average * usage[node_id][1] - usage[node_id][0] for node_id in targets}
+
+        replication = self.namenode.replication
+        placement = self.namenode.placement
+        moves = []
+        assigned: Dict[str, int] = {}
+        for source in sorted(sources, key=lambda node_id: -percent[node_id]):
+            if not replication.available(source):
+                continue
+            for block_id in list(self.namenode.block_map.node_blocks.get(source, ())):
+                if excess[source] <= 0 or len(moves) >= MAX_MOVES_PER_ITERATION or not replication.available(source):
+                    break
+                if not self.movable(block_id):
+                    continue
+                size = self.block_bytes(block_id)
+                holders = self.namenode.block_map.get_locations(block_id)
+                invalidating = replication.invalidating(block_id)
+                eligible = {
+                    node_id for node_id in targets
+                    if room[node_id] >= size and node_id not in holders and node_id not in invalidating
+                    and replication.available(node_id)
+                }
+                if not eligible:
+                    continue
+                # Las demás réplicas cuentan para repartir racks; el destino sale de los nodos con espacio
+                chosen = placement.choose(1, replicas=holders - {source},
+                                          exclude=set(self.namenode.datanodes) - eligible, assigned=assigned)
+                if not chosen:
+                    continue
+                target = chosen[0]["node_id"]
+                moves.append((block_id, source, target))
+                excess[source] -= size
+                room[target] -= size
+                # Reserva los streams como una copia más del monitor de replicación
+                replication.pending[block_id] = {
+                    "source": source,
+                    "targets": [target],
+                    "deadline": time.monotonic() + PENDING_TIMEOUT,
+                    "balancer": True
+                }
+                for node_id in (source, target):
+                    replication.streams[node_id] = replication.streams.get(node_id, 0) + 1
+        return moves
+
+    async def move(self, block_id: str, source: str, target: str) -> bool:
+        """Copia un bloque al destino y retira la réplica de origen"""
+        replication = self.namenode.replication
+        work = replication.pending[block_id]
+        request = dfs_pb2.BlockRequest(block_id=block_id, target_nodes=[self.namenode.node_address(target)])
+        try:
+            with replication.channels.channel(self.namenode.node_address(source)) as channel:
+                stub = dfs_pb2_grpc.FileServiceStub(channel)
+                response = await stub.SyncBlock(request, timeout=PENDING_TIMEOUT)
+            success, message = response.success, response.message
+        except grpc.RpcError as e:
+            success, message = False, e.details()
+        except Exception as e:
+            success, message = False, str(e)
+
+        if replication.pending.get(block_id) is not work:
+            return False  # La copia expiró o el bloque se borró entretanto
+        replication.finish(block_id)
+        if not success:
+            print(f"Error moving block {block_id} from {source} to {target}: {message}")
+            return False
+        file_node = self.namenode.namespace.blocks.get(block_id)
+        if file_node is None:
+            return False
+        self.namenode.block_map.add(block_id, target)
+        # El origen solo se borra si sin él quedan las réplicas que pide el archivo
+        if len(replication.live_replicas(block_id)) - 1 >= file_node.replication:
+            self.namenode.block_map.remove(block_id, source)
+            self.namenode.invalidations.setdefault(source, set()).add(block_id)
+        return True
+
+    async def run(self, max_iterations: Optional[int] = None):
+        """Itera hasta equilibrar el clúster, quedarse sin movimientos posibles o agotar ``max_iterations``"""
+        self.status = "running"
+        self.iterations = self.moved_blocks = self.moved_bytes = self.failed_moves = 0
+        self.started_at = time.time()
+        idle = 0
+        try:
+            while max_iterations is None or self.iterations < max_iterations:
+                moves = self.plan()
+                if not moves:
+                    if self.balanced():
+                        self.status = "balanced"
+                        break
+                    idle += 1
+                    if idle >= MAX_IDLE_ITERATIONS:
+                        self.status = "no_moves"
+                        break
+                else:
+                    idle = 0
+                    self.iterations += 1
+                    sizes = {block_id: self.block_bytes(block_id) for block_id, _, _ in moves}
+                    results = await asyncio.gather(*(self.move(*move) for move in moves))
+                    for (block_id, source, target), moved in zip(moves, results):
+                        if moved:
+                            self.moved_blocks += 1
+                            self.moved_bytes += sizes[block_id]
+                        else:
+                            self.failed_moves += 1
+                    print(f"Balancer: iteración {self.iterations}, {sum(results)}/{len(moves)} bloques movidos")
+                await asyncio.sleep(self.wait)
+            else:
+                self.status = "stopped"
+        except asyncio.CancelledError:
+            self.status = "stopped"
+            raise
+        finally:
+            self.task = None
+
+    def start(self, threshold: Optional[float] = None) -> bool:
+        """Inicia una corrida en segundo plano; False si ya hay una en curso"""
+        if self.task is not None:
+            return False
+        if threshold is not None:
+            self.threshold = threshold
+        self.status = "running"
+        self.task = asyncio.create_task(self.run())
+        return True
+
+    async def run_periodically(self):
+        while True:
+            await asyncio.sleep(self.period)
+            self.start()
+
+    def start_periodic(self):
+        """Con ``period`` el NameNode lanza una corrida cada ``period`` segundos"""
+        if self.period > 0 and self.periodic_task is None:
+            self.periodic_task = asyncio.create_task(self.run_periodically())
+
+    async def stop(self):
+        for task in (self.periodic_task, self.task):
+            if task is not None:
+                task.cancel()
+        self.periodic_task = None
+        if self.task is not None:
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    def report(self) -> dict:
+        usage = self.utilization()
+        return {
+            "status": self.status,
+            "threshold": self.threshold,
+            "iterations": self.iterations,
+            "moved_blocks": self.moved_blocks,
+            "moved_bytes": self.moved_bytes,
+            "failed_moves": self.failed_moves,
+            "started_at": self.started_at,
+            "spread": self.spread(),
+            "utilization": {node_id: 100 * used / capacity for node_id, (used, capacity) in sorted(usage.items())}
+        }
+
+def main():
+    """Punto de entrada de dfs-balancer: lanza una corrida en el NameNode y muestra su progreso"""
+    import requests
+
+    parser = argparse.ArgumentParser(description='Equilibra el uso de disco de los DataNodes')
+    parser.add_argument('--config', help='Path to configuration file')
+    parser.add_argument('--threshold', type=float, help='Puntos porcentuales de utilización tolerados respecto de la media')
+    parser.add_argument('--stop', action='store_true', help='Detiene la corrida en curso')
+    args = parser.parse_args()
+
+    config = Config.load(args.config)
+    url = f"http://{config.NAMENODE_HOST}:{config.NAMENODE_PORT}/balancer"
+    if args.stop:
+        response = requests.delete(url)
+        print(response.json().get("status") or response.json()["detail"])
+        return
+    params = {"threshold": args.threshold} if args.threshold is not None else {}
+    response = requests.post(url, params=params)
+    if response.status_code != 200:
+        print(f"Error: {response.json()['detail']}")
+        sys.exit(1)
+
+    try:
+        while True:
+            report = response.json()
+            usage = ", ".join(f"{node_id} {percent:.2f}%" for node_id, percent in report["utilization"].items())
+            print(f"[{report['status']}] {report['moved_blocks']} bloques movidos "
+                  f"({report['moved_bytes'] / 2**20:.1f} MB), {report['failed_moves']} fallidos | {usage}")
+            if report["status"] != "running":
+                break
+            time.sleep(STATUS_INTERVAL)
+            response = requests.get(url)
+    except KeyboardInterrupt:
+        print("La corrida sigue en el NameNode; detenla con --stop")
+
+if __name__ == "__main__":
+    main()
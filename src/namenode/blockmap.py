@@ -0,0 +1,47 @@
+from typing import Dict, Iterable, Set
+
+class BlockMap:
+    """Mapa en memoria bloque -> DataNodes que lo almacenan, alimentado por block reports"""
+
+    def __init__(self):
+        self.locations: Dict[str, Set[str]] = {}
+        self.node_blocks: Dict[str, Set[str]] = {}
+
+    def add(self, block_id: str, node_id: str):
+        self.locations.setdefault(block_id, set()).add(node_id)
+        self.node_blocks.setdefault(node_id, set()).add(block_id)
+
+    def remove(self, block_id: str, node_id: str):
+        nodes = self.locations.get(block_id)
+        if nodes is not None:
+            nodes.discard(node_id)
+            if not nodes:
+                del self.locations[block_id]
+        blocks = self.node_blocks.get(node_id)
+        if blocks is not None:
+            blocks.discard(block_id)
+
+    def remove_node(self, node_id: str):
+        """Olvida todas las réplicas de un nodo"""
+        for block_id in self.node_blocks.pop(node_id, set()):
+            nodes = self.locations.get(block_id)
+            if nodes is not None:
+                nodes.discard(node_id)
+                if not nodes:
+                    del self.locations[block_id]
+
+    def get_locations(self, block_id: str) -> Set[str]:
+        return self.locations.get(block_id, set())
+
+    def process_report(self, node_id: str, added: Iterable[str] = (), removed: Iterable[str] = ()):
+        """Aplica un block report incremental"""
+        for block_id in added:
+            self.add(block_id, node_id)
+        for block_id in removed:
+            self.remove(block_id, node_id)
+
+    def process_full_report(self, node_id: str, blocks: Iterable[str]):
+        """Reemplaza las réplicas conocidas de un nodo por las de un block report completo"""
+        self.remove_node(node_id)
+        for block_id in blocks:
+            self.add(block_id, node_id)
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+CHECKPOINT_EDITS = 100000  # Ediciones acumuladas que disparan un checkpoint
+CHECKPOINT_INTERVAL = 3600.0  # Segundos máximos entre checkpoints
+IMAGE_FILE = "fsimage.json"
+
+def _fsync_dir(directory: Path):
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+class EditLog:
+    """Registro de ediciones append-only de los metadatos del NameNode.
+
+    Cada mutación se agrega como una línea JSON con un txid creciente. Las
+    ediciones que llegan mientras se sincroniza un lote se escriben juntas con
+    un único fsync (group commit) y recién entonces se aplican en memoria, en
+    orden de txid: el estado en memoria nunca contiene ediciones que no sean
+    durables. Periódicamente el estado completo se guarda en ``fsimage.json``
+    y los segmentos de ediciones ya incluidos se eliminan; al arrancar se
+    carga la imagen y se reproducen las ediciones posteriores.
+    """
+
+    def __init__(self, directory: str, checkpoint_edits: int = CHECKPOINT_EDITS,
+                 checkpoint_interval: float = CHECKPOINT_INTERVAL):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_edits = checkpoint_edits
+        self.checkpoint_interval = checkpoint_interval
+        self.txid = 0
+        self.applied_txid = 0  # Última edición sincronizada y aplicada en memoria
+        self.image_txid = 0
+        self.last_checkpoint = time.monotonic()
+        self.segment = None
+        self.pending: List[Tuple[bytes, dict, asyncio.Future]] = []
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+        self.snapshot: Optional[Callable[[], dict]] = None
+        self.apply: Optional[Callable[[dict], None]] = None
+
+    def segments(self) -> List[Path]:
+        """Segmentos de ediciones ordenados por su primer txid"""
+        return sorted(self.directory.glob("edits_*.log"), key=lambda p: int(p.stem.split('_')[1]))
+
+    def load(self) -> Tuple[Optional[dict], List[dict]]:
+        """Devuelve el último checkpoint y las ediciones posteriores a él"""
+        state = None
+        image_path = self.directory / IMAGE_FILE
+        if image_path.exists():
+            with open(image_path, 'r') as f:
+                image = json.load(f)
+            state = image["state"]
+            self.image_txid = self.txid = image["txid"]
+
+        edits = []
+        for segment in self.segments():
+            good = 0
+            with open(segment, 'rb') as f:
+                for line in f:
+                    try:
+                        # Sin salto de línea el registro quedó a medio escribir aunque sea JSON válido
+                        edit = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        edit = None
+                    if edit is None:
+                        break
+                    good += len(line)
+                    if edit["txid"] > self.txid:
+                        edits.append(edit)
+                        self.txid = edit["txid"]
+            if good < segment.stat().st_size:
+                # Descarta la cola rota por una caída o una escritura fallida, para no anexar tras ella
+                print(f"Edit log {segment.name}: descartados {segment.stat().st_size - good} bytes incompletos")
+                with open(segment, 'r+b') as f:
+                    f.truncate(good)
+                    os.fsync(f.fileno())
+        self.applied_txid = self.txid
+        return state, edits
+
+    def _open_segment(self):
+        if self.segment is not None:
+            self.segment.close()
+        self.segment = open(self.directory / f"edits_{self.txid + 1}.log", 'ab')
+        _fsync_dir(self.directory)
+
+    def start(self, snapshot: Callable[[], dict], apply: Callable[[dict], None]):
+        """Abre un segmento nuevo y lanza la tarea de group commit.
+
+        ``snapshot`` devuelve el estado completo serializable para los
+        checkpoints y ``apply`` aplica en memoria cada edición ya sincronizada.
+        """
+        self.snapshot = snapshot
+        self.apply = apply
+        self.wakeup = asyncio.Event()
+        self._open_segment()
+        self.task = asyncio.create_task(self.run())
+
+    def append(self, edit: dict) -> asyncio.Future:
+        """Asigna un txid a la edición y la encola.
+
+        El futuro se resuelve cuando la edición es durable y ya se aplicó en
+        memoria, o con la excepción de la escritura o de ``apply``.
+        """
+        self.txid += 1
+        edit["txid"] = self.txid
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((json.dumps(edit).encode() + b"\n", edit, future))
+        self.wakeup.set()
+        return future
+
+    def _write_batch(self, lines: List[bytes]):
+        self.segment.write(b"".join(lines))
+        self.segment.flush()
+        os.fsync(self.segment.fileno())
+
+    def _recover_segment(self, offset: int):
+        """Tras una escritura fallida, recorta el lote parcial y continúa en un segmento nuevo"""
+        try:
+            self.segment.truncate(offset)
+            os.fsync(self.segment.fileno())
+        except OSError as e:
+            # La carga descartará igualmente la cola que no sea un registro completo
+            print(f"Error truncating edit log segment: {e}")
+        # El estado del archivo abierto es incierto: no se vuelve a anexar en él
+        self._open_segment()
+
+    async def run(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            try:
+                await self.flush()
+                if (self.applied_txid - self.image_txid >= self.checkpoint_edits
+                        or time.monotonic() - self.last_checkpoint >= self.checkpoint_interval):
+                    await self.checkpoint()
+            except Exception as e:
+                print(f"Error in edit log: {e}")
+                # Nadie debe quedar esperando una edición que quizá no llegue a escribirse
+                batch, self.pending = self.pending, []
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def flush(self):
+        """Escribe con un solo fsync todas las ediciones encoladas y luego las aplica en memoria"""
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        offset = self.segment.tell()
+        try:
+            await asyncio.to_thread(self._write_batch, [line for line, _, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            await asyncio.to_thread(self._recover_segment, offset)
+            return
+        # Se aplican sin ceder el event loop y en orden de txid, igual que al reproducir el log;
+        # también las de peticiones canceladas, porque ya son durables
+        for _, edit, future in batch:
+            try:
+                self.apply(edit)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(None)
+            self.applied_txid = edit["txid"]
+
+    def _write_image(self, data: bytes):
+        tmp_path = self.directory / f"{IMAGE_FILE}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.directory / IMAGE_FILE)
+        _fsync_dir(self.directory)
+
+    async def checkpoint(self):
+        """Guarda el estado completo y descarta los segmentos que ya contiene"""
+        # El estado y el txid se capturan sin ceder el event loop; las ediciones
+        # aún encoladas no están aplicadas e irán al segmento nuevo
+        txid = self.applied_txid
+        data = json.dumps({"txid": txid, "state": self.snapshot()}).encode()
+        old_segments = self.segments()
+        self._open_segment()
+        await asyncio.to_thread(self._write_image, data)
+        for segment in old_segments:
+            segment.unlink(missing_ok=True)
+        self.image_txid = txid
+        self.last_checkpoint = time.monotonic()
+
+    async def stop(self):
+        """Sincroniza lo pendiente, hace un checkpoint final y cierra el segmento"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+        if self.applied_txid > self.image_txid:
+            await self.checkpoint()
+        if self.segment is not None:
+            self.segment.close()
+            self.segment = None
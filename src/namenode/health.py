@@ -0,0 +1,147 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Set
+import aiohttp
+
+REFRESH_INTERVAL = 2.0  # Segundos entre sondeos de métricas
+METRICS_TTL = 10.0  # Antigüedad máxima de unas métricas para considerar vivo al nodo
+REQUEST_TIMEOUT = 2.0
+
+class ClusterHealth:
+    """Vista en memoria de las métricas de los DataNodes.
+
+    Los DataNodes envían heartbeats periódicos con su estado; para los que no
+    lo hacen, una tarea en segundo plano sondea ``/metrics`` en paralelo sobre
+    una única sesión HTTP. La selección de nodos para un bloque y la detección
+    de fallos son cálculos en memoria sin viajes de red.
+    """
+
+    def __init__(self, datanodes: Dict[str, dict], interval: float = REFRESH_INTERVAL, ttl: float = METRICS_TTL):
+        self.datanodes = datanodes
+        self.interval = interval
+        self.ttl = ttl
+        self.metrics: Dict[str, dict] = {}
+        self.unreachable: Set[str] = set()  # Nodos cuyo último sondeo falló; el error se registra una sola vez
+        self.last_refresh: Optional[float] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def poll_node(self, node_id: str, node_info: dict):
+        """Obtiene y guarda las métricas de un DataNode"""
+        metrics_port = node_info['port'] + 100  # Usar puerto de métricas
+        try:
+            async with self.session.get(f"http://{node_info['host']}:{metrics_port}/metrics") as response:
+                metrics = await response.json()
+                self.metrics[node_id] = {
+                    "node_id": node_id,
+                    "load": metrics["load"],
+                    "available_space": metrics["available_space"],
+                    "latency": metrics["latency"],
+                    "updated_at": time.monotonic()
+                }
+            self.reachable(node_id)
+        except Exception as e:
+            if node_id not in self.unreachable:
+                self.unreachable.add(node_id)
+                print(f"Error getting metrics from {node_id}: {e}")
+
+    def reachable(self, node_id: str):
+        """Registra que un nodo que había dejado de responder volvió a hacerlo"""
+        if node_id in self.unreachable:
+            self.unreachable.discard(node_id)
+            print(f"DataNode {node_id} is reachable again")
+
+    def record_heartbeat(self, node_id: str, heartbeat: dict):
+        """Registra el estado enviado por un DataNode en su heartbeat"""
+        self.reachable(node_id)
+        self.metrics[node_id] = {
+            "node_id": node_id,
+            "load": heartbeat.get("load", 0),
+            "available_space": heartbeat.get("available_space", 0),
+            "capacity": heartbeat.get("capacity", 0),
+            "latency": heartbeat.get("latency", 0),
+            "in_flight": heartbeat.get("in_flight", 0),
+            "block_count": heartbeat.get("block_count", 0),
+            "dfs_used": heartbeat.get("dfs_used", 0),
+            "bytes_in_per_second": heartbeat.get("bytes_in_per_second", 0),
+            "bytes_out_per_second": heartbeat.get("bytes_out_per_second", 0),
+            "disk_queue_depth": heartbeat.get("disk_queue_depth"),
+            "heartbeat": True,
+            "updated_at": time.monotonic()
+        }
+
+    async def refresh(self):
+        """Sondea de forma concurrente los DataNodes sin heartbeat reciente"""
+        if self.session is None:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT))
+        now = time.monotonic()
+        await asyncio.gather(*(
+            self.poll_node(node_id, node_info) for node_id, node_info in list(self.datanodes.items())
+            if not self.metrics.get(node_id, {}).get("heartbeat")
+            or now - self.metrics[node_id]["updated_at"] > self.ttl / 2
+        ))
+        self.last_refresh = time.monotonic()
+
+    async def run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Lanza el refresco periódico en segundo plano"""
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def live_nodes(self) -> List[dict]:
+        """Métricas de los nodos cuyo último sondeo exitoso está dentro del TTL"""
+        now = time.monotonic()
+        return [
+            metrics for metrics in self.metrics.values()
+            if now - metrics["updated_at"] <= self.ttl
+        ]
+
+    def is_alive(self, node_id: str) -> bool:
+        metrics = self.metrics.get(node_id)
+        return metrics is not None and time.monotonic() - metrics["updated_at"] <= self.ttl
+
+    def dead_nodes(self) -> List[str]:
+        """DataNodes registrados sin heartbeat ni métricas dentro del TTL"""
+        return [node_id for node_id in self.datanodes if not self.is_alive(node_id)]
+
+    def staleness(self) -> Optional[float]:
+        """Segundos desde el último refresco completo, o None si nunca se refrescó"""
+        if self.last_refresh is None:
+            return None
+        return time.monotonic() - self.last_refresh
+
+    def report(self) -> dict:
+        """Resumen de la vista del clúster para exponer como métrica"""
+        now = time.monotonic()
+        return {
+            "staleness_seconds": self.staleness(),
+            "ttl_seconds": self.ttl,
+            "live_nodes": len(self.live_nodes()),
+            "dead_nodes": self.dead_nodes(),
+            "nodes": {
+                node_id: {
+                    "age_seconds": now - metrics["updated_at"],
+                    "load": metrics["load"],
+                    "available_space": metrics["available_space"],
+                    "in_flight": metrics.get("in_flight", 0),
+                    "latency_ms": metrics.get("latency", 0),
+                    "bytes_in_per_second": metrics.get("bytes_in_per_second", 0),
+                    "bytes_out_per_second": metrics.get("bytes_out_per_second", 0),
+                    "disk_queue_depth": metrics.get("disk_queue_depth"),
+                    "heartbeat": metrics.get("heartbeat", False)
+                }
+                for node_id, metrics in self.metrics.items()
+            }
+        }
@@ -0,0 +1,43 @@
+import time
+import uuid
+from typing import Dict, List, Optional
+
+LEASE_TIMEOUT = 60.0  # Segundos sin renovar tras los que un escritor se da por perdido
+
+class LeaseManager:
+    """Leases de escritura sobre archivos en construcción.
+
+    Solo el portador del lease puede pedir bloques o completar el archivo; cada
+    operación lo renueva. Los leases no se persisten: al reiniciar el NameNode
+    se conceden de nuevo para los archivos en construcción y, si el escritor no
+    vuelve, expiran.
+    """
+
+    def __init__(self, timeout: float = LEASE_TIMEOUT):
+        self.timeout = timeout
+        self.leases: Dict[str, dict] = {}
+
+    def grant(self, path: str, lease_id: str = None) -> str:
+        lease_id = lease_id or uuid.uuid4().hex
+        self.leases[path] = {"lease_id": lease_id, "expires": time.monotonic() + self.timeout}
+        return lease_id
+
+    def check(self, path: str, lease_id: str) -> bool:
+        """Comprueba que ``lease_id`` es el lease vigente de ``path`` y lo renueva"""
+        lease = self.leases.get(path)
+        if lease is None or lease["lease_id"] != lease_id:
+            return False
+        lease["expires"] = time.monotonic() + self.timeout
+        return True
+
+    def release(self, path: str):
+        self.leases.pop(path, None)
+
+    def holder(self, path: str) -> Optional[str]:
+        lease = self.leases.get(path)
+        return lease["lease_id"] if lease else None
+
+    def expired(self) -> List[str]:
+        """Rutas cuyos leases vencieron"""
+        now = time.monotonic()
+        return [path for path, lease in self.leases.items() if lease["expires"] < now]
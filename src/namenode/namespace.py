@@ -0,0 +1,498 @@
+import bisect
+import time
+from typing import Dict, List, Optional, Tuple
+
+def stored_block_ids(block: dict) -> List[str]:
+    """Identificadores de los bloques que guardan los DataNodes para una entrada de archivo.
+
+    Un bloque replicado se guarda con su propio identificador; un grupo con
+    erasure coding se guarda como un bloque interno por celda.
+    """
+    if "cells" in block:
+        return [cell["block_id"] for cell in block["cells"]]
+    return [block["block_id"]]
+
+def is_packed(block: dict) -> bool:
+    """Indica si la entrada es un tramo de un bloque contenedor y no un bloque propio"""
+    return "container" in block
+
+def is_shared(block: dict) -> bool:
+    """Indica si la entrada referencia un bloque compartido: un contenedor o un bloque deduplicado"""
+    return "container" in block or "digest" in block
+
+def split_path(path: str) -> List[str]:
+    """Divide una ruta absoluta en sus componentes"""
+    parts = [part for part in path.strip('/').split('/') if part]
+    for part in parts:
+        if part in ('.', '..'):
+            raise ValueError(f"Componente de ruta inválido en {path}")
+    return parts
+
+class INode:
+    """Nodo del árbol de nombres"""
+
+    is_directory = False
+
+    def __init__(self, name: str, mtime: float = None):
+        self.name = name
+        self.mtime = mtime if mtime is not None else time.time()
+
+    def summary(self) -> dict:
+        return {"name": self.name, "type": "file", "mtime": self.mtime}
+
+class INodeFile(INode):
+    """Archivo: tamaño, replicación y lista ordenada de bloques.
+
+    Con una política de erasure coding cada entrada de ``blocks`` es un grupo
+    de bloques y ``block_size`` son los bytes de datos de un grupo. Con un
+    ``codec`` los bloques guardan frames comprimidos; tamaños y offsets siguen
+    siendo los de los datos originales.
+    """
+
+    def __init__(self, name: str, size: int, blocks: List[dict], replication: int,
+                 block_size: int, mtime: float = None, under_construction: bool = False,
+                 ec_policy: str = None, codec: str = None):
+        super().__init__(name, mtime)
+        self.size = size
+        self.blocks = blocks
+        self.replication = replication
+        self.block_size = block_size
+        self.under_construction = under_construction
+        self.ec_policy = ec_policy
+        self.codec = codec
+
+    def summary(self) -> dict:
+        summary = {
+            "name": self.name,
+            "type": "file",
+            "size": self.size,
+            "mtime": self.mtime,
+            "replication": self.replication,
+            "block_size": self.block_size
+        }
+        if self.under_construction:
+            summary["under_construction"] = True
+        if self.ec_policy:
+            summary["ec_policy"] = self.ec_policy
+        if self.codec:
+            summary["codec"] = self.codec
+        if self.blocks and is_packed(self.blocks[0]):
+            summary["packed"] = True
+        return summary
+
+    def to_dict(self) -> dict:
+        return dict(self.summary(), blocks=self.blocks)
+
+class SharedBlock(INodeFile):
+    """Bloque guardado una vez y referenciado por varios archivos.
+
+    No forma parte del árbol y ``members`` cuenta las entradas de archivos
+    que lo usan; se borra de los DataNodes al quitar la última. Es un
+    contenedor de archivos pequeños, referenciado con ``{"container": id,
+    "offset": posición}``, o un bloque direccionado por contenido cuyo
+    identificador es el SHA-256 de sus datos, referenciado con ``{"digest":
+    id}``. ``under_construction`` indica que sus datos aún se están subiendo.
+    """
+
+    def __init__(self, block: dict, replication: int, block_size: int, mtime: float = None,
+                 under_construction: bool = True, size: int = 0):
+        super().__init__(block["block_id"], size, [block], replication, block_size, mtime, under_construction)
+        self.members = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "block": self.blocks[0],
+            "size": self.size,
+            "replication": self.replication,
+            "block_size": self.block_size,
+            "mtime": self.mtime,
+            "under_construction": self.under_construction
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SharedBlock':
+        return cls(data["block"], data["replication"], data["block_size"], data["mtime"],
+                   data["under_construction"], data["size"])
+
+class INodeDirectory(INode):
+    """Directorio: hijos indexados por nombre y lista ordenada para paginar"""
+
+    is_directory = True
+
+    def __init__(self, name: str, mtime: float = None, ec_policy: str = None):
+        super().__init__(name, mtime)
+        self.children: Dict[str, INode] = {}
+        self._sorted_names: Optional[List[str]] = None
+        # Política de erasure coding que heredan los archivos nuevos del subárbol
+        self.ec_policy = ec_policy
+
+    def add_child(self, child: INode):
+        self.children[child.name] = child
+        self._sorted_names = None
+
+    def remove_child(self, name: str) -> INode:
+        self._sorted_names = None
+        return self.children.pop(name)
+
+    def sorted_names(self) -> List[str]:
+        # Se ordena una vez y se reutiliza hasta la siguiente modificación
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self.children)
+        return self._sorted_names
+
+    def summary(self) -> dict:
+        summary = {"name": self.name, "type": "directory", "mtime": self.mtime, "children": len(self.children)}
+        if self.ec_policy:
+            summary["ec_policy"] = self.ec_policy
+        return summary
+
+    def to_dict(self) -> dict:
+        data = {
+            "name": self.name,
+            "type": "directory",
+            "mtime": self.mtime,
+            "children": [child.to_dict() for child in self.children.values()]
+        }
+        if self.ec_policy:
+            data["ec_policy"] = self.ec_policy
+        return data
+
+class Namespace:
+    """Árbol de nombres del DFS con búsquedas O(profundidad).
+
+    También mantiene el índice bloque -> archivo que usan la replicación y la
+    limpieza de bloques huérfanos; los bloques compartidos se indexan con su
+    ``SharedBlock``.
+    """
+
+    def __init__(self):
+        self.root = INodeDirectory("")
+        self.blocks: Dict[str, INodeFile] = {}
+        self.containers: Dict[str, SharedBlock] = {}
+        self.digests: Dict[str, SharedBlock] = {}
+
+    def resolve(self, path: str) -> Optional[INode]:
+        """Devuelve el nodo de ``path`` o None si no existe"""
+        node = self.root
+        for part in split_path(path):
+            if not node.is_directory:
+                return None
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def get_file(self, path: str) -> INodeFile:
+        node = self.resolve(path)
+        if node is None:
+            raise FileNotFoundError(f"Archivo no encontrado: {path}")
+        if node.is_directory:
+            raise IsADirectoryError(f"{path} es un directorio")
+        return node
+
+    def get_directory(self, path: str) -> INodeDirectory:
+        node = self.resolve(path)
+        if node is None:
+            raise FileNotFoundError(f"Directorio no encontrado: {path}")
+        if not node.is_directory:
+            raise NotADirectoryError(f"{path} no es un directorio")
+        return node
+
+    def mkdirs(self, path: str, mtime: float = None) -> INodeDirectory:
+        """Crea el directorio y los padres que falten"""
+        node = self.root
+        for part in split_path(path):
+            child = node.children.get(part)
+            if child is None:
+                child = INodeDirectory(part, mtime)
+                node.add_child(child)
+                node.mtime = child.mtime
+            elif not child.is_directory:
+                raise NotADirectoryError(f"{part} es un archivo en {path}")
+            node = child
+        return node
+
+    def _parent_and_name(self, path: str, create: bool = False, mtime: float = None) -> Tuple[INodeDirectory, str]:
+        parts = split_path(path)
+        if not parts:
+            raise ValueError("La raíz no puede modificarse")
+        parent_path = '/' + '/'.join(parts[:-1])
+        parent = self.mkdirs(parent_path, mtime) if create else self.get_directory(parent_path)
+        return parent, parts[-1]
+
+    def create_file(self, path: str, size: int, blocks: List[dict], replication: int,
+                    block_size: int, mtime: float = None, under_construction: bool = False,
+                    ec_policy: str = None, codec: str = None) -> INodeFile:
+        """Crea un archivo; los directorios padres se crean si no existen"""
+        parent, name = self._parent_and_name(path, create=True, mtime=mtime)
+        if name in parent.children:
+            raise FileExistsError(f"Ya existe: {path}")
+        node = INodeFile(name, size, blocks, replication, block_size, mtime, under_construction, ec_policy, codec)
+        parent.add_child(node)
+        parent.mtime = node.mtime
+        self._index_blocks(node, blocks)
+        return node
+
+    def _index_blocks(self, node: INodeFile, blocks: List[dict]):
+        for block in blocks:
+            if is_shared(block):
+                self._shared(block).members += 1
+                continue
+            for block_id in stored_block_ids(block):
+                self.blocks[block_id] = node
+
+    def _unindex_blocks(self, blocks: List[dict]) -> List[dict]:
+        """Quita bloques del índice y devuelve los que ya no usa ningún archivo"""
+        released = []
+        for block in blocks:
+            if is_shared(block):
+                shared = self._shared(block)
+                shared.members -= 1
+                if shared.members > 0:
+                    continue
+                self.containers.pop(shared.name, None)
+                self.digests.pop(shared.name, None)
+                block = shared.blocks[0]
+            for block_id in stored_block_ids(block):
+                self.blocks.pop(block_id, None)
+            released.append(block)
+        return released
+
+    def _shared(self, block: dict) -> SharedBlock:
+        if "digest" in block:
+            return self.digests[block["digest"]]
+        return self.containers[block["container"]]
+
+    def locate(self, block: dict) -> dict:
+        """Bloque que guarda los datos de una entrada; un tramo empaquetado incluye su ``offset`` en el contenedor"""
+        if not is_shared(block):
+            return block
+        stored = self._shared(block).blocks[0]
+        return dict(stored, offset=block["offset"]) if is_packed(block) else stored
+
+    def open_container(self, block: dict, replication: int, block_size: int, mtime: float = None) -> SharedBlock:
+        """Registra un contenedor en escritura; su bloque ya no es huérfano para los block reports"""
+        container = SharedBlock(block, replication, block_size, mtime)
+        self.containers[container.name] = container
+        self._index_blocks(container, container.blocks)
+        return container
+
+    def get_open_container(self, block_id: str) -> SharedBlock:
+        container = self.containers.get(block_id)
+        if container is None:
+            raise FileNotFoundError(f"Contenedor no encontrado: {block_id}")
+        if not container.under_construction:
+            raise FileExistsError(f"El contenedor {block_id} ya está cerrado")
+        return container
+
+    def pack(self, block_id: str, size: int, files: List[dict], mtime: float = None) -> List[INodeFile]:
+        """Cierra un contenedor creando sus archivos, cada uno con su ``path``, ``offset`` y ``size``.
+
+        Todo se valida antes de modificar el árbol, de modo que un lote
+        inválido no deja archivos a medias.
+        """
+        container = self.get_open_container(block_id)
+        if not 0 < size <= container.block_size:
+            raise ValueError(f"Tamaño de contenedor inválido: {size}")
+        seen = set()
+        for entry in files:
+            parts = tuple(split_path(entry["path"]))
+            if not parts or parts in seen:
+                raise ValueError(f"Ruta inválida o repetida en el lote: {entry['path']}")
+            seen.add(parts)
+            if entry["offset"] < 0 or entry["size"] < 0 or entry["offset"] + entry["size"] > size:
+                raise ValueError(f"{entry['path']} queda fuera del contenedor")
+            node = self.root
+            for depth, part in enumerate(parts):
+                if not node.is_directory:
+                    raise NotADirectoryError(f"{parts[depth - 1]} es un archivo en {entry['path']}")
+                node = node.children.get(part)
+                if node is None:
+                    break
+            if node is not None:
+                raise FileExistsError(f"Ya existe: {entry['path']}")
+        # Un archivo del lote no puede ser directorio de otro, como /a y /a/b
+        for parts in seen:
+            for depth in range(1, len(parts)):
+                if parts[:depth] in seen:
+                    raise NotADirectoryError(f"/{'/'.join(parts[:depth])} es un archivo del lote en /{'/'.join(parts)}")
+
+        mtime = mtime if mtime is not None else time.time()
+        created = [
+            self.create_file(entry["path"], entry["size"], [{"container": block_id, "offset": entry["offset"]}],
+                             container.replication, container.block_size, mtime)
+            for entry in files
+        ]
+        # El contenedor se cierra solo cuando existen todos sus archivos
+        container.size = size
+        container.under_construction = False
+        container.mtime = mtime
+        return created
+
+    def abandon_container(self, block_id: str) -> List[dict]:
+        """Descarta un contenedor que no llegó a cerrarse y devuelve su bloque"""
+        container = self.get_open_container(block_id)
+        del self.containers[block_id]
+        return self._unindex_blocks(container.blocks)
+
+    def ec_policy_for(self, path: str) -> Optional[str]:
+        """Política de erasure coding del directorio más cercano que la define"""
+        node = self.root
+        policy = node.ec_policy
+        for part in split_path(path):
+            node = node.children.get(part) if node.is_directory else None
+            if node is None or not node.is_directory:
+                break
+            policy = node.ec_policy or policy
+        return policy
+
+    def set_ec_policy(self, path: str, policy: Optional[str]) -> INodeDirectory:
+        """Fija (o quita con None) la política de un directorio para los archivos nuevos"""
+        node = self.get_directory(path)
+        node.ec_policy = policy or None
+        return node
+
+    def get_under_construction(self, path: str) -> INodeFile:
+        node = self.get_file(path)
+        if not node.under_construction:
+            raise FileExistsError(f"El archivo {path} ya está completo")
+        return node
+
+    def add_blocks(self, path: str, blocks: List[dict]) -> INodeFile:
+        """Agrega bloques al final de un archivo en construcción"""
+        node = self.get_under_construction(path)
+        node.blocks.extend(blocks)
+        self._index_blocks(node, blocks)
+        return node
+
+    def add_digests(self, path: str, digests: List[str], blocks: List[dict]) -> INodeFile:
+        """Agrega bloques direccionados por contenido a un archivo en construcción.
+
+        ``blocks`` son los bloques nuevos, cuyo identificador es su digest;
+        el resto de ``digests`` referencia bloques que ya existen.
+        """
+        node = self.get_under_construction(path)
+        new = {block["block_id"] for block in blocks}
+        for digest in digests:
+            if digest not in self.digests and digest not in new:
+                raise ValueError(f"Bloque desconocido: {digest}")
+        for block in blocks:
+            if block["block_id"] in self.digests:
+                # Otra edición ya aplicada registró el mismo digest: este archivo solo suma una referencia
+                continue
+            shared = SharedBlock(block, node.replication, node.block_size, node.mtime)
+            self.digests[shared.name] = shared
+            self._index_blocks(shared, shared.blocks)
+        references = [{"digest": digest} for digest in digests]
+        node.blocks.extend(references)
+        self._index_blocks(node, references)
+        return node
+
+    def complete_file(self, path: str, size: int, mtime: float = None) -> List[dict]:
+        """Cierra un archivo en construcción y devuelve los bloques asignados que no se usaron"""
+        node = self.get_under_construction(path)
+        used = -(-size // node.block_size)
+        if used > len(node.blocks):
+            raise ValueError(f"El tamaño {size} excede los {len(node.blocks)} bloques asignados a {path}")
+        unused = node.blocks[used:]
+        del node.blocks[used:]
+        node.size = size
+        node.under_construction = False
+        node.mtime = mtime if mtime is not None else time.time()
+        # Los bloques deduplicados que subió este archivo quedan completos para otros escritores
+        for block in node.blocks:
+            if "digest" in block:
+                self.digests[block["digest"]].under_construction = False
+        return self._unindex_blocks(unused)
+
+    def delete(self, path: str, directory: bool, mtime: float = None) -> List[dict]:
+        """Elimina un archivo o un directorio completo y devuelve los bloques que quedaron sin uso"""
+        parent, name = self._parent_and_name(path)
+        node = parent.children.get(name)
+        if node is None:
+            raise FileNotFoundError(f"No encontrado: {path}")
+        if directory and not node.is_directory:
+            raise NotADirectoryError(f"{path} no es un directorio")
+        if not directory and node.is_directory:
+            raise IsADirectoryError(f"{path} es un directorio")
+        parent.remove_child(name)
+        parent.mtime = mtime if mtime is not None else time.time()
+
+        released = []
+        for file_node in self.walk_files(node):
+            released.extend(self._unindex_blocks(file_node.blocks))
+        return released
+
+    def under_construction_files(self):
+        """Recorre los archivos en construcción junto con su ruta"""
+        stack = [("", self.root)]
+        while stack:
+            prefix, directory = stack.pop()
+            for name, child in directory.children.items():
+                if child.is_directory:
+                    stack.append((f"{prefix}/{name}", child))
+                elif child.under_construction:
+                    yield f"{prefix}/{name}", child
+
+    def walk_files(self, node: INode):
+        """Recorre todos los archivos bajo ``node``"""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.is_directory:
+                stack.extend(current.children.values())
+            else:
+                yield current
+
+    def list(self, path: str, start_after: str = None, limit: int = 1000) -> Tuple[dict, List[dict], Optional[str]]:
+        """Lista una página de un directorio sin recorrer sus subdirectorios.
+
+        Devuelve el resumen del nodo, las entradas de la página y el nombre a
+        pasar como ``start_after`` para la siguiente página (None si no hay más).
+        """
+        node = self.resolve(path)
+        if node is None:
+            raise FileNotFoundError(f"Ruta no encontrada: {path}")
+        if not node.is_directory:
+            return node.summary(), [node.summary()], None
+
+        names = node.sorted_names()
+        start = bisect.bisect_right(names, start_after) if start_after else 0
+        page = names[start:start + limit]
+        entries = [node.children[name].summary() for name in page]
+        next_marker = page[-1] if page and start + limit < len(names) else None
+        return node.summary(), entries, next_marker
+
+    def to_dict(self) -> dict:
+        data = self.root.to_dict()
+        if self.containers:
+            data["containers"] = [container.to_dict() for container in self.containers.values()]
+        if self.digests:
+            data["digests"] = [shared.to_dict() for shared in self.digests.values()]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Namespace':
+        namespace = cls()
+        namespace.root.mtime = data.get("mtime", namespace.root.mtime)
+        namespace.root.ec_policy = data.get("ec_policy")
+        # Los bloques compartidos primero: los archivos suman sus referencias al indexarse
+        for key, shared_blocks in (("containers", namespace.containers), ("digests", namespace.digests)):
+            for entry in data.get(key, []):
+                shared = SharedBlock.from_dict(entry)
+                shared_blocks[shared.name] = shared
+                namespace._index_blocks(shared, shared.blocks)
+        stack = [(namespace.root, data.get("children", []))]
+        while stack:
+            directory, children = stack.pop()
+            for child in children:
+                if child["type"] == "directory":
+                    node = INodeDirectory(child["name"], child["mtime"], child.get("ec_policy"))
+                    stack.append((node, child.get("children", [])))
+                else:
+                    node = INodeFile(child["name"], child["size"], child["blocks"], child["replication"],
+                                     child["block_size"], child["mtime"], child.get("under_construction", False),
+                                     child.get("ec_policy"), child.get("codec"))
+                    namespace._index_blocks(node, node.blocks)
+                directory.children[node.name] = node
+        return namespace
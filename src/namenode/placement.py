@@ -0,0 +1,117 @@
+import random
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_RACK = "default"  # Rack de los DataNodes sin etiqueta en cluster_config.yaml
+DEFAULT_PLACEMENT = "p2c"
+
+def node_cost(metrics: dict, assigned: Dict[str, int]) -> float:
+    """Costo de poner un bloque más en un nodo: crece con su carga y con los bloques que ya está recibiendo.
+
+    ``assigned`` cuenta los bloques dados a cada nodo en la petición en
+    curso, que las métricas todavía no reflejan.
+    """
+    pending = assigned.get(metrics["node_id"], 0) + metrics.get("in_flight", 0)
+    return (1 + pending) * (1 + metrics.get("load", 0) / 100)
+
+class PlacementPolicy:
+    """Elige un nodo entre candidatos equivalentes en cuanto a racks"""
+
+    name = ""
+
+    def pick(self, candidates: List[dict], assigned: Dict[str, int], rng: random.Random) -> dict:
+        raise NotImplementedError
+
+class PowerOfTwoChoices(PlacementPolicy):
+    """Toma dos candidatos al azar y se queda con el de menor costo.
+
+    Reparte casi tan bien como buscar el mejor nodo, pero las métricas
+    atrasadas no hacen que todos los bloques caigan en el mismo.
+    """
+
+    name = "p2c"
+
+    def pick(self, candidates, assigned, rng):
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = rng.sample(candidates, 2)
+        key = lambda metrics: (node_cost(metrics, assigned), -metrics.get("available_space", 0))
+        return min(first, second, key=key)
+
+class WeightedRandom(PlacementPolicy):
+    """Sorteo ponderado por espacio libre e inverso al costo"""
+
+    name = "random"
+
+    def pick(self, candidates, assigned, rng):
+        weights = [(metrics.get("available_space", 0) + 1) / node_cost(metrics, assigned) for metrics in candidates]
+        return rng.choices(candidates, weights)[0]
+
+class LeastLoaded(PlacementPolicy):
+    """Criterio anterior: menor carga y más espacio, contando los bloques ya asignados en la petición"""
+
+    name = "load"
+
+    def pick(self, candidates, assigned, rng):
+        return min(candidates, key=lambda metrics: (
+            assigned.get(metrics["node_id"], 0), metrics.get("load", 0), -metrics.get("available_space", 0)
+        ))
+
+PLACEMENT_POLICIES = {policy.name: policy for policy in (PowerOfTwoChoices(), WeightedRandom(), LeastLoaded())}
+
+def get_placement(name: Optional[str]) -> PlacementPolicy:
+    try:
+        return PLACEMENT_POLICIES[name or DEFAULT_PLACEMENT]
+    except KeyError:
+        raise ValueError(f"Política de ubicación desconocida: {name} (disponibles: {', '.join(PLACEMENT_POLICIES)})")
+
+class PlacementEngine:
+    """Elige los DataNodes de bloques nuevos, grupos con erasure coding y re-replicaciones.
+
+    Solo usa la vista de métricas en memoria de ``ClusterHealth``. Cada nodo
+    elegido se cuenta en ``assigned``, de modo que los bloques de una misma
+    petición se reparten entre todo el clúster en lugar de apilarse en los
+    nodos que parecían menos cargados. Las réplicas de un bloque van a racks
+    distintos mientras queden racks sin usar.
+    """
+
+    def __init__(self, health, racks: Optional[Dict[str, str]] = None, policy: Optional[str] = None,
+                 rng: Optional[random.Random] = None):
+        self.health = health
+        self.racks = racks or {}
+        self.policy = get_placement(policy)
+        self.rng = rng or random.Random()
+
+    def rack(self, node_id: str) -> str:
+        return self.racks.get(node_id, DEFAULT_RACK)
+
+    def choose(self, count: int, replicas: Iterable[str] = (), exclude: Iterable[str] = (),
+               assigned: Optional[Dict[str, int]] = None) -> List[dict]:
+        """Métricas de hasta ``count`` nodos vivos distintos para un bloque.
+
+        ``replicas`` son los nodos que ya tienen el bloque: no se eligen y sus
+        racks cuentan como usados. ``exclude`` son nodos que no deben elegirse
+        por otros motivos.
+        """
+        assigned = {} if assigned is None else assigned
+        replicas = set(replicas)
+        skip = replicas | set(exclude)
+        candidates = [
+            metrics for metrics in self.health.live_nodes()
+            if metrics["node_id"] not in skip and metrics["node_id"] in self.health.datanodes
+        ]
+        used_racks = {self.rack(node_id) for node_id in replicas}
+        chosen = []
+        while candidates and len(chosen) < count:
+            other_racks = [metrics for metrics in candidates if self.rack(metrics["node_id"]) not in used_racks]
+            node = self.policy.pick(other_racks or candidates, assigned, self.rng)
+            candidates.remove(node)
+            chosen.append(node)
+            used_racks.add(self.rack(node["node_id"]))
+            assigned[node["node_id"]] = assigned.get(node["node_id"], 0) + 1
+        return chosen
+
+    def report(self) -> dict:
+        racks: Dict[str, List[str]] = {}
+        for node_id in sorted(self.health.datanodes):
+            racks.setdefault(self.rack(node_id), []).append(node_id)
+        return {"policy": self.policy.name, "racks": racks}
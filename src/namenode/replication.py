@@ -0,0 +1,243 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional, Set
+import grpc
+from ..proto import dfs_pb2, dfs_pb2_grpc
+from ..common.channels import AsyncChannelPool
+
+MONITOR_INTERVAL = 3.0  # Segundos entre rondas de la cola de replicación
+SCAN_INTERVAL = 300.0  # Segundos entre recorridos completos de los bloques
+STARTUP_DELAY = 20.0  # Margen para recibir los block reports antes del primer recorrido
+GRACE_PERIOD = 30.0  # Antigüedad mínima de un archivo para juzgar sus réplicas
+PENDING_TIMEOUT = 300.0  # Tiempo máximo de una copia antes de darla por fallida
+MAX_STREAMS_PER_NODE = 2  # Copias simultáneas en las que participa cada DataNode
+MAX_SCHEDULED_PER_ROUND = 100
+
+class ReplicationMonitor:
+    """Repara los bloques con menos réplicas vivas de las que pide su archivo.
+
+    Los bloques sospechosos se encolan en un heap ordenado por réplicas vivas,
+    de modo que los que están a punto de perderse se copian primero. Cada copia
+    se ordena al DataNode origen con ``SyncBlock``, que la envía por
+    ``ReplicateBlock`` con el ancho de banda limitado. Las réplicas sobrantes,
+    por ejemplo de un nodo que vuelve tras darse por muerto, se invalidan.
+    """
+
+    def __init__(self, namenode, interval: float = MONITOR_INTERVAL, scan_interval: float = SCAN_INTERVAL,
+                 startup_delay: float = STARTUP_DELAY):
+        self.namenode = namenode
+        self.interval = interval
+        self.scan_interval = scan_interval
+        self.startup_delay = startup_delay
+        self.queue: List[tuple] = []
+        self.queued: Set[str] = set()
+        self.counter = itertools.count()
+        # Copias en curso: bloque -> origen, destinos y plazo
+        self.pending: Dict[str, dict] = {}
+        self.streams: Dict[str, int] = {}
+        self.dead: Set[str] = set()
+        self.under_replicated = 0
+        self.missing = 0
+        self.last_scan: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.channels = AsyncChannelPool()
+
+    def live_replicas(self, block_id: str) -> List[str]:
+        health = self.namenode.health
+        return [node_id for node_id in self.namenode.block_map.get_locations(block_id) if health.is_alive(node_id)]
+
+    def enqueue(self, block_id: str):
+        """Encola un bloque para revisar sus réplicas en la próxima ronda"""
+        if block_id in self.queued or block_id not in self.namenode.namespace.blocks:
+            return
+        self.queued.add(block_id)
+        heapq.heappush(self.queue, (len(self.live_replicas(block_id)), next(self.counter), block_id))
+
+    def scan(self):
+        """Recorre todos los bloques y encola los que no tienen las réplicas pedidas"""
+        now = time.time()
+        under_replicated = missing = 0
+        for block_id, file_node in list(self.namenode.namespace.blocks.items()):
+            # Los grupos con erasure coding no tienen réplicas que copiar: se reconstruyen al leer
+            if file_node.under_construction or file_node.ec_policy or now - file_node.mtime < GRACE_PERIOD:
+                continue
+            live = len(self.live_replicas(block_id))
+            if live == 0:
+                missing += 1
+            if live != file_node.replication:
+                if live < file_node.replication:
+                    under_replicated += 1
+                self.enqueue(block_id)
+        self.under_replicated = under_replicated
+        self.missing = missing
+        self.last_scan = time.monotonic()
+
+    def check_excess(self, block_ids):
+        """Encola los bloques con más réplicas vivas de las pedidas (p. ej. tras volver un nodo)"""
+        for block_id in block_ids:
+            file_node = self.namenode.namespace.blocks.get(block_id)
+            if file_node is not None and len(self.live_replicas(block_id)) > file_node.replication:
+                self.enqueue(block_id)
+
+    def check_dead_nodes(self):
+        """Recorre los bloques en cuanto un nodo deja de enviar heartbeats"""
+        dead = set(self.namenode.health.dead_nodes())
+        new_dead = dead - self.dead
+        self.dead = dead
+        if new_dead:
+            print(f"DataNodes dados por muertos: {', '.join(sorted(new_dead))}")
+            self.scan()
+
+    def expire_pending(self):
+        now = time.monotonic()
+        for block_id, work in list(self.pending.items()):
+            if work["deadline"] < now:
+                print(f"Replicación de {block_id} expirada")
+                self.finish(block_id)
+                self.enqueue(block_id)
+
+    def finish(self, block_id: str):
+        work = self.pending.pop(block_id, None)
+        if work is None:
+            return
+        for node_id in [work["source"]] + work["targets"]:
+            self.streams[node_id] -= 1
+
+    def available(self, node_id: str) -> bool:
+        return self.streams.get(node_id, 0) < MAX_STREAMS_PER_NODE
+
+    def invalidating(self, block_id: str) -> Set[str]:
+        """Nodos con un borrado pendiente del bloque: su próximo heartbeat eliminaría una copia nueva"""
+        return {node_id for node_id, blocks in self.namenode.invalidations.items() if block_id in blocks}
+
+    def choose_targets(self, block_id: str, replicas: List[str], holders: Set[str], count: int) -> List[str]:
+        """Nodos vivos sin el bloque elegidos por el motor de ubicación, en racks distintos a sus réplicas vivas"""
+        busy = [node_id for node_id in self.namenode.datanodes if not self.available(node_id)]
+        exclude = set(busy) | holders | self.invalidating(block_id)
+        targets = self.namenode.placement.choose(count, replicas=replicas, exclude=exclude)
+        return [metrics["node_id"] for metrics in targets]
+
+    def remove_excess(self, block_id: str, replicas: List[str], excess: int):
+        """Invalida las réplicas sobrantes en los nodos más cargados"""
+        metrics = self.namenode.health.metrics
+        replicas = sorted(replicas, key=lambda node_id: (-metrics[node_id]["load"], metrics[node_id]["available_space"]))
+        for node_id in replicas[:excess]:
+            self.namenode.invalidations.setdefault(node_id, set()).add(block_id)
+            self.namenode.block_map.remove(block_id, node_id)
+
+    def schedule(self, block_id: str) -> bool:
+        """Programa la copia de un bloque; devuelve False si debe reintentarse más tarde"""
+        file_node = self.namenode.namespace.blocks.get(block_id)
+        if file_node is None or file_node.under_construction or file_node.ec_policy or block_id in self.pending:
+            return True
+        replicas = self.live_replicas(block_id)
+        if len(replicas) > file_node.replication:
+            self.remove_excess(block_id, replicas, len(replicas) - file_node.replication)
+            return True
+        needed = file_node.replication - len(replicas)
+        if needed <= 0:
+            return True
+        if not replicas:
+            # Sin réplicas vivas no hay origen; se reintenta si vuelve algún nodo
+            return True
+
+        sources = [node_id for node_id in replicas if self.available(node_id)]
+        if not sources:
+            return False
+        sources.sort(key=lambda node_id: self.namenode.health.metrics[node_id]["load"])
+        source = sources[0]
+        holders = self.namenode.block_map.get_locations(block_id)
+        targets = self.choose_targets(block_id, replicas, holders, needed)
+        if not targets:
+            return False
+
+        self.pending[block_id] = {
+            "source": source,
+            "targets": targets,
+            "deadline": time.monotonic() + PENDING_TIMEOUT
+        }
+        for node_id in [source] + targets:
+            self.streams[node_id] = self.streams.get(node_id, 0) + 1
+        asyncio.create_task(self.replicate(block_id, source, targets))
+        return True
+
+    async def replicate(self, block_id: str, source: str, targets: List[str]):
+        """Pide al nodo origen que copie el bloque a los destinos"""
+        request = dfs_pb2.BlockRequest(
+            block_id=block_id,
+            target_nodes=[self.namenode.node_address(node_id) for node_id in targets]
+        )
+        try:
+            with self.channels.channel(self.namenode.node_address(source)) as channel:
+                stub = dfs_pb2_grpc.FileServiceStub(channel)
+                response = await stub.SyncBlock(request, timeout=PENDING_TIMEOUT)
+            success, message = response.success, response.message
+        except grpc.RpcError as e:
+            success, message = False, e.details()
+        except Exception as e:
+            success, message = False, str(e)
+
+        if self.pending.get(block_id, {}).get("targets") != targets:
+            return  # La copia ya expiró y se reprogramó
+        self.finish(block_id)
+        if success:
+            # Los destinos también lo informarán en su próximo heartbeat
+            for node_id in targets:
+                self.namenode.block_map.add(block_id, node_id)
+            print(f"Bloque {block_id} replicado de {source} a {', '.join(targets)}")
+            if not self.pending and not self.queue:
+                # Actualiza los contadores de la métrica al terminar la tanda de copias
+                self.scan()
+        else:
+            print(f"Error replicating block {block_id} from {source}: {message}")
+            self.enqueue(block_id)
+
+    def process_queue(self):
+        """Programa copias empezando por los bloques con menos réplicas vivas"""
+        deferred = []
+        scheduled = 0
+        while self.queue and scheduled < MAX_SCHEDULED_PER_ROUND:
+            _, _, block_id = heapq.heappop(self.queue)
+            self.queued.discard(block_id)
+            if self.schedule(block_id):
+                scheduled += 1
+            else:
+                deferred.append(block_id)
+        for block_id in deferred:
+            self.enqueue(block_id)
+
+    async def run(self):
+        await asyncio.sleep(self.startup_delay)
+        self.dead = set(self.namenode.health.dead_nodes())
+        self.scan()
+        while True:
+            try:
+                self.check_dead_nodes()
+                self.expire_pending()
+                if time.monotonic() - self.last_scan >= self.scan_interval:
+                    self.scan()
+                self.process_queue()
+            except Exception as e:
+                print(f"Error in replication monitor: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.channels.aclose()
+
+    def report(self) -> dict:
+        return {
+            "under_replicated_blocks": self.under_replicated,
+            "missing_blocks": self.missing,
+            "pending_replications": len(self.pending),
+            "queued_blocks": len(self.queue),
+            "last_scan_age_seconds": time.monotonic() - self.last_scan if self.last_scan is not None else None
+        }
@@ -1,82 +1,290 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Body, Request
+from fastapi.responses import JSONResponse
 from typing import Dict, List
 import uvicorn
 import uuid
-import random
-import aiohttp
 import asyncio
 import argparse
 import json
+import time
+from contextlib import asynccontextmanager
 from ..common.config import Config
+from ..common.erasure import POLICIES, ECPolicy, get_policy
+from ..common.compression import check_codec
+from ..common.checksum import is_digest
+from .health import ClusterHealth
+from .blockmap import BlockMap
+from .editlog import EditLog
+from .namespace import Namespace, stored_block_ids
+from .leases import LeaseManager
+from .replication import ReplicationMonitor
+from .placement import PlacementEngine
+from .balancer import Balancer
 
-PERSISTENCE_FILE = "namenode_state.json"
+MAX_BLOCKS_PER_REQUEST = 64  # Bloques máximos entregados por cada addblock
+LEASE_CHECK_INTERVAL = 5.0
+METADATA_LEASE = 5.0  # Segundos que un cliente puede reutilizar listados y ubicaciones sin consultarlos
+PERSISTENCE_FILE = "namenode_state.json"  # Formato anterior, solo se lee para migrar
+METADATA_DIR = "namenode_meta"
 
-def save_state(self):
-    state = {
-        "files": self.files,
-        "directory_structure": self.directory_structure
-    }
-    with open(PERSISTENCE_FILE, "w") as f:
-        json.dump(state, f)
-
-def load_state(self):
+def load_legacy_state(path: str = PERSISTENCE_FILE):
+    """Lee el estado guardado por versiones que reescribían un único JSON"""
     try:
-        with open(PERSISTENCE_FILE, "r") as f:
-            state = json.load(f)
-            self.files = state.get("files", {})
-            self.directory_structure = state.get("directory_structure", {"/": {}})
+        with open(path, "r") as f:
+            return json.load(f)
     except Exception:
-        self.files = {}
-        self.directory_structure = {"/": {}}
+        return None
 
 class NameNode:
-    def __init__(self):
-        self.files: Dict[str, dict] = {}
-        self.datanodes = {
-            "datanode1": {"host": "3.232.66.23", "port": 50051, "load": 0},
-            "datanode2": {"host": "44.208.230.35", "port": 50052, "load": 0},
-            "datanode3": {"host": "54.235.162.161", "port": 50053, "load": 0}
-        }
-        self.block_size = 64 * 1024 * 1024
-        self.replication_factor = 2
-        self.directory_structure = {"/": {}}
-        load_state(self)
-
-    async def select_optimal_datanodes(self, file_size: int) -> List[dict]:
-        """Selecciona los DataNodes óptimos basado en carga y disponibilidad"""
-        available_nodes = []
-        
-        # Obtener métricas de cada DataNode
-        for node_id, node_info in self.datanodes.items():
+    def __init__(self, config: Config = None, metadata_dir: str = METADATA_DIR):
+        config = config or Config()
+        self.namespace = Namespace()
+        self.datanodes: Dict[str, dict] = {}
+        for node_id, address in config.DATANODES.items():
+            self.register_datanode(node_id, address)
+        self.block_size = config.BLOCK_SIZE
+        self.replication_factor = config.REPLICATION_FACTOR
+        self.health = ClusterHealth(self.datanodes)
+        self.placement = PlacementEngine(self.health, config.DATANODE_RACKS, config.PLACEMENT_POLICY)
+        self.block_map = BlockMap()
+        # Bloques pendientes de borrar en cada DataNode, enviados en la respuesta al heartbeat
+        self.invalidations: Dict[str, set] = {}
+        self.edit_log = EditLog(metadata_dir)
+        self.leases = LeaseManager()
+        self.replication = ReplicationMonitor(self)
+        self.balancer = Balancer(self, config.BALANCER_THRESHOLD, config.BALANCER_PERIOD)
+        self.load_metadata()
+
+    def load_metadata(self):
+        """Carga el último checkpoint y reproduce las ediciones posteriores"""
+        state, edits = self.edit_log.load()
+        if state is None and not edits:
+            state = load_legacy_state()
+        if state is not None:
+            self.restore(state)
+        for edit in edits:
             try:
-                metrics_port = node_info['port'] + 100  # Usar puerto de métricas
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(f"http://{node_info['host']}:{metrics_port}/metrics") as response:
-                        metrics = await response.json()
-                        available_nodes.append({
-                            "node_id": node_id,
-                            "load": metrics["load"],
-                            "available_space": metrics["available_space"],
-                            "latency": metrics["latency"]
-                        })
+                self.apply_edit(edit)
             except Exception as e:
-                print(f"Error getting metrics from {node_id}: {e}")
+                # Edición rechazada también cuando se registró: se descarta igual que entonces
+                print(f"Edit {edit['txid']} rejected on replay: {e}")
+        # Los escritores de archivos en construcción tienen un lease nuevo para reanudar o expirar
+        for path, _ in self.namespace.under_construction_files():
+            self.leases.grant(path)
+        # Los contenedores abiertos usan su identificador de bloque como clave del lease
+        for block_id, container in self.namespace.containers.items():
+            if container.under_construction:
+                self.leases.grant(block_id)
 
-        # Ordenar por menor carga y mayor espacio disponible
-        available_nodes.sort(key=lambda x: (x["load"], -x["available_space"]))
-        
-        # Seleccionar los mejores nodos para replicación
-        selected_nodes = available_nodes[:self.replication_factor]
-        return selected_nodes
+    def snapshot(self) -> dict:
+        """Estado completo de los metadatos para los checkpoints"""
+        return {"namespace": self.namespace.to_dict()}
+
+    def restore(self, state: dict):
+        if "namespace" in state:
+            self.namespace = Namespace.from_dict(state["namespace"])
+            return
+
+        # Formato anterior: diccionario plano de archivos y árbol anidado de directorios
+        self.namespace = Namespace()
+        stack = [("", state.get("directory_structure", {}))]
+        while stack:
+            prefix, children = stack.pop()
+            for name, child in children.items():
+                if isinstance(child, dict) and name != "/":
+                    self.namespace.mkdirs(f"{prefix}/{name}")
+                    stack.append((f"{prefix}/{name}", child))
+        for path, info in state.get("files", {}).items():
+            self.namespace.create_file(path, info["size"], info["blocks"], self.replication_factor, self.block_size)
+
+    def apply_edit(self, edit: dict):
+        """Aplica una mutación de metadatos; usado por las rutas y al reproducir el log"""
+        op = edit["op"]
+        mtime = edit.get("mtime")
+        if op == "mkdir":
+            self.namespace.mkdirs(edit["path"], mtime)
+        elif op == "create_file":
+            self.namespace.create_file(
+                edit["path"], edit["size"], edit["blocks"],
+                edit.get("replication", self.replication_factor),
+                edit.get("block_size", self.block_size), mtime
+            )
+        elif op == "open_file":
+            self.namespace.create_file(
+                edit["path"], 0, [], edit["replication"], edit["block_size"], mtime,
+                under_construction=True, ec_policy=edit.get("ec_policy"), codec=edit.get("codec")
+            )
+        elif op == "set_ec_policy":
+            self.namespace.set_ec_policy(edit["path"], edit["policy"])
+        elif op == "add_blocks":
+            self.namespace.add_blocks(edit["path"], edit["blocks"])
+        elif op == "add_digests":
+            self.namespace.add_digests(edit["path"], edit["digests"], edit["blocks"])
+        elif op == "complete":
+            for block in self.namespace.complete_file(edit["path"], edit["size"], mtime):
+                self.invalidate_block(block)
+        elif op in ("rmdir", "delete"):
+            for block in self.namespace.delete(edit["path"], directory=(op == "rmdir"), mtime=mtime):
+                self.invalidate_block(block)
+        elif op == "open_container":
+            self.namespace.open_container(edit["block"], edit["replication"], edit["block_size"], mtime)
+        elif op == "pack":
+            self.namespace.pack(edit["block_id"], edit["size"], edit["files"], mtime)
+        elif op == "abandon_container":
+            for block in self.namespace.abandon_container(edit["block_id"]):
+                self.invalidate_block(block)
+        else:
+            raise ValueError(f"Operación desconocida en el edit log: {op}")
+
+    def invalidate_block(self, block: dict):
+        """Programa el borrado de un bloque (o de cada celda de un grupo) en todos los nodos que lo tienen"""
+        if "cells" in block:
+            assigned = [[cell] for cell in block["cells"]]
+        else:
+            assigned = [[block["leader"]] + block["followers"]]
+        for block_id, nodes in zip(stored_block_ids(block), assigned):
+            node_ids = set(self.block_map.get_locations(block_id))
+            node_ids.update(node["node_id"] for node in nodes)
+            for node_id in node_ids:
+                self.invalidations.setdefault(node_id, set()).add(block_id)
+                self.block_map.remove(block_id, node_id)
+
+    def node_address(self, node_id: str) -> str:
+        node = self.datanodes[node_id]
+        return f"{node['host']}:{node['port']}"
+
+    def block_locations(self, block: dict) -> dict:
+        """Ubicaciones de un bloque para el cliente, con los nodos vivos primero.
+
+        Se prefieren las réplicas confirmadas por block reports; si aún no hay
+        ninguna, se usan los nodos asignados al crear el archivo. En un grupo
+        con erasure coding cada celda indica si su nodo está vivo, para que el
+        cliente reconstruya desde la paridad sin esperar a un nodo caído.
+        """
+        if "cells" in block:
+            return dict(block, cells=[
+                dict(cell, address=self.node_address(cell["node_id"]), alive=self.health.is_alive(cell["node_id"]))
+                for cell in block["cells"]
+            ])
+        reported = self.block_map.get_locations(block["block_id"])
+        if reported:
+            nodes = [node_id for node_id in reported if node_id in self.datanodes]
+        else:
+            nodes = [
+                node["node_id"] for node in [block["leader"]] + block["followers"] if node["node_id"] in self.datanodes
+            ]
+        nodes.sort(key=lambda node_id: not self.health.is_alive(node_id))
+        if not nodes:
+            return block
+        located = [{"node_id": node_id, "address": self.node_address(node_id)} for node_id in nodes]
+        return dict(block, leader=located[0], followers=located[1:])
+
+    async def commit_edit(self, edit: dict):
+        """Registra una mutación en el edit log y espera a que sea durable y esté aplicada en memoria.
+
+        Si ``apply_edit`` la rechaza (por ejemplo, la ruta ya no existe), la
+        excepción llega al llamador; la edición queda en el log y al
+        reproducirlo se rechaza del mismo modo, sin alterar el estado.
+        """
+        await self.edit_log.append(edit)
+
+    def register_datanode(self, node_id: str, address: str):
+        """Agrega o actualiza un DataNode en el registro de nodos"""
+        host, port = address.rsplit(':', 1)
+        node = self.datanodes.setdefault(node_id, {"load": 0})
+        node["host"] = host
+        node["port"] = int(port)
+
+    def handle_heartbeat(self, heartbeat: dict) -> dict:
+        """Procesa un heartbeat con block report incremental opcional"""
+        node_id = heartbeat["node_id"]
+        if heartbeat.get("address"):
+            self.register_datanode(node_id, heartbeat["address"])
+        elif node_id not in self.datanodes:
+            raise HTTPException(status_code=400, detail=f"DataNode desconocido: {node_id}")
+
+        self.health.record_heartbeat(node_id, heartbeat)
+        self.datanodes[node_id]["load"] = heartbeat.get("load", 0)
+
+        report = heartbeat.get("blocks")
+        if report:
+            self.block_map.process_report(node_id, report.get("added", []), report.get("removed", []))
+
+        commands = []
+        invalid = self.invalidations.pop(node_id, None)
+        if invalid:
+            commands.append({"action": "delete", "blocks": sorted(invalid)})
+        return {"commands": commands}
+
+    async def lease_monitor(self):
+        """Abandona los archivos en construcción cuyo escritor dejó de renovar el lease"""
+        while True:
+            await asyncio.sleep(LEASE_CHECK_INTERVAL)
+            for path in self.leases.expired():
+                self.leases.release(path)
+                if path in self.namespace.containers:
+                    edit = {"op": "abandon_container", "block_id": path}
+                else:
+                    edit = {"op": "delete", "path": path, "mtime": time.time()}
+                try:
+                    await self.commit_edit(edit)
+                    print(f"Lease expirado, archivo incompleto abandonado: {path}")
+                except Exception as e:
+                    print(f"Error abandoning {path}: {e}")
+
+    def check_lease(self, path: str, lease_id: str):
+        if not self.leases.check(path, lease_id):
+            raise HTTPException(status_code=409, detail=f"Lease inválido o expirado para {path}")
+
+    def handle_bad_block(self, node_id: str, block_id: str):
+        """Descarta una réplica corrupta informada por un DataNode.
+
+        La copia solo se borra del nodo si quedan otras réplicas conocidas.
+        """
+        self.block_map.remove(block_id, node_id)
+        if self.block_map.get_locations(block_id):
+            self.invalidations.setdefault(node_id, set()).add(block_id)
+        self.replication.enqueue(block_id)
+
+    def handle_block_report(self, node_id: str, blocks: List[str]):
+        """Procesa un block report completo y ordena borrar los bloques huérfanos"""
+        if node_id not in self.datanodes:
+            raise HTTPException(status_code=400, detail=f"DataNode desconocido: {node_id}")
+        known = [block_id for block_id in blocks if block_id in self.namespace.blocks]
+        orphans = set(blocks) - set(known)
+        self.block_map.process_full_report(node_id, known)
+        self.replication.check_excess(known)
+        if orphans:
+            self.invalidations.setdefault(node_id, set()).update(orphans)
+
+    def select_optimal_datanodes(self, file_size: int, count: int = None, assigned: Dict[str, int] = None) -> List[dict]:
+        """Selecciona los DataNodes de un bloque con el motor de ubicación.
+
+        Usa la vista de métricas en caché, por lo que no hace viajes de red;
+        ``assigned`` acumula los bloques ya repartidos en la misma petición.
+        """
+        return self.placement.choose(count or self.replication_factor, assigned=assigned)
 
     async def allocate_blocks(self, file_size: int) -> List[dict]:
-        """Asigna bloques a DataNodes óptimos"""
-        num_blocks = (file_size + self.block_size - 1) // self.block_size
+        """Asigna los bloques de un archivo de tamaño conocido"""
+        return await self.allocate((file_size + self.block_size - 1) // self.block_size)
+
+    async def allocate(self, num_blocks: int, ec_policy: str = None) -> List[dict]:
+        """Asigna ``num_blocks`` bloques nuevos (o grupos con erasure coding) a DataNodes óptimos"""
+        file_size = num_blocks * self.block_size
         blocks = []
+        assigned: Dict[str, int] = {}
+
+        # Solo se sondea en línea si la caché aún no tiene ningún nodo vivo
+        if num_blocks and not self.health.live_nodes():
+            await self.health.refresh()
+
+        if ec_policy:
+            return self.allocate_groups(num_blocks, get_policy(ec_policy), assigned)
         
         for _ in range(num_blocks):
             block_id = str(uuid.uuid4())
-            selected_nodes = await self.select_optimal_datanodes(file_size)
+            selected_nodes = self.select_optimal_datanodes(file_size, assigned=assigned)
             if not selected_nodes:
                 raise HTTPException(status_code=500, detail="No hay DataNodes disponibles para almacenar bloques. Verifica que los DataNodes estén activos y accesibles.")
             
@@ -88,89 +296,328 @@ class NameNode:
                 "block_id": block_id,
                 "leader": {
                     "node_id": leader["node_id"],
-                    "address": f"{self.datanodes[leader['node_id']]['host']}:{self.datanodes[leader['node_id']]['port']}"
+                    "address": self.node_address(leader["node_id"])
                 },
                 "followers": [{
                     "node_id": node["node_id"],
-                    "address": f"{self.datanodes[node['node_id']]['host']}:{self.datanodes[node['node_id']]['port']}"
+                    "address": self.node_address(node["node_id"])
                 } for node in followers]
             })
         
         return blocks
 
-    def update_directory_structure(self, path: str, is_directory: bool = False):
-        """Actualiza la estructura de directorios"""
-        current = self.directory_structure
-        parts = path.strip('/').split('/')
-        
-        for i, part in enumerate(parts):
-            if i == len(parts) - 1 and not is_directory:
-                current[part] = "file"
-            else:
-                if part not in current:
-                    current[part] = {}
-                current = current[part]
-        save_state(self)
-
-async def run_server(host: str, port: int, config_path: str = None):
+    def allocate_groups(self, num_groups: int, policy: ECPolicy, assigned: Dict[str, int] = None) -> List[dict]:
+        """Asigna grupos de bloques con erasure coding: cada celda en un DataNode distinto"""
+        groups = []
+        for _ in range(num_groups):
+            selected_nodes = self.select_optimal_datanodes(0, policy.total_units, assigned)
+            if len(selected_nodes) < policy.total_units:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"La política {policy.name} necesita {policy.total_units} DataNodes activos "
+                           f"y solo hay {len(selected_nodes)}"
+                )
+            group_id = str(uuid.uuid4())
+            groups.append({
+                "block_id": group_id,
+                "ec_policy": policy.name,
+                "cells": [{
+                    "block_id": f"{group_id}_{index}",
+                    "node_id": node["node_id"],
+                    "address": self.node_address(node["node_id"])
+                } for index, node in enumerate(selected_nodes)]
+            })
+        return groups
+
+async def run_server(host: str, port: int, config_path: str = None, metadata_dir: str = METADATA_DIR):
     """Inicia el servidor FastAPI del NameNode"""
     # Cargar configuración
     config = Config.load(config_path)
     
     # Crear instancia del NameNode
-    namenode = NameNode()
+    namenode = NameNode(config, metadata_dir)
     
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Tareas en segundo plano del NameNode
+        namenode.health.start()
+        namenode.edit_log.start(namenode.snapshot, namenode.apply_edit)
+        lease_task = asyncio.create_task(namenode.lease_monitor())
+        namenode.replication.start()
+        namenode.balancer.start_periodic()
+        yield
+        lease_task.cancel()
+        await namenode.balancer.stop()
+        await namenode.replication.stop()
+        await namenode.health.stop()
+        await namenode.edit_log.stop()
+
     # Configurar FastAPI
-    app = FastAPI(title="NameNode API")
+    app = FastAPI(title="NameNode API", lifespan=lifespan)
     
+
     # Agregar rutas
+    @app.get("/metrics")
+    async def get_metrics():
+        return {
+            "cluster": namenode.health.report(),
+            "blocks": len(namenode.block_map.locations),
+            "replication": namenode.replication.report(),
+            "placement": namenode.placement.report(),
+            "balancer": namenode.balancer.report()
+        }
+
+    @app.post("/balancer")
+    async def start_balancer(threshold: float = None):
+        """Lanza una corrida del balancer; ``threshold`` en puntos porcentuales sobre la utilización media"""
+        if threshold is not None and threshold <= 0:
+            raise ValueError("El umbral del balancer debe ser positivo")
+        if not namenode.balancer.start(threshold):
+            raise HTTPException(status_code=409, detail="El balancer ya está en ejecución")
+        return namenode.balancer.report()
+
+    @app.get("/balancer")
+    async def balancer_status():
+        return namenode.balancer.report()
+
+    @app.delete("/balancer")
+    async def stop_balancer():
+        if namenode.balancer.task is None:
+            raise HTTPException(status_code=409, detail="El balancer no está en ejecución")
+        namenode.balancer.task.cancel()
+        return {"status": "stopping"}
+
+    @app.post("/heartbeat")
+    async def heartbeat(payload: dict = Body(...)):
+        return namenode.handle_heartbeat(payload)
+
+    @app.post("/blockreport")
+    async def block_report(payload: dict = Body(...)):
+        namenode.handle_block_report(payload["node_id"], payload.get("blocks", []))
+        return {"blocks": len(payload.get("blocks", []))}
+
+    @app.post("/badblock")
+    async def bad_block(payload: dict = Body(...)):
+        namenode.handle_bad_block(payload["node_id"], payload["block_id"])
+        return {"block_id": payload["block_id"]}
+
     @app.post("/files")
     async def create_file(filename: str, size: int):
-        if filename in namenode.files:
+        if namenode.namespace.resolve(filename) is not None:
             raise HTTPException(status_code=400, detail="File already exists")
         
         blocks = await namenode.allocate_blocks(size)
-        namenode.files[filename] = {
+        await namenode.commit_edit({
+            "op": "create_file",
+            "path": filename,
             "size": size,
-            "blocks": blocks
+            "blocks": blocks,
+            "replication": namenode.replication_factor,
+            "block_size": namenode.block_size,
+            "mtime": time.time()
+        })
+        return {"filename": filename, "blocks": blocks, "block_size": namenode.block_size}
+
+    @app.post("/files/open")
+    async def open_file(filename: str, ec_policy: str = None, codec: str = None):
+        """Crea un archivo en construcción y concede el lease de escritura.
+
+        Sin ``ec_policy`` se usa la del directorio más cercano que la defina.
+        ``codec`` indica que el cliente sube los bloques comprimidos por chunk.
+        """
+        if namenode.namespace.resolve(filename) is not None:
+            raise HTTPException(status_code=400, detail="File already exists")
+        policy = get_policy(ec_policy or namenode.namespace.ec_policy_for(filename))
+        codec = check_codec(codec)
+        if policy and codec:
+            raise ValueError("La compresión no puede combinarse con erasure coding")
+        edit = {
+            "op": "open_file",
+            "path": filename,
+            "replication": namenode.replication_factor,
+            "block_size": namenode.block_size,
+            "mtime": time.time()
         }
-        namenode.update_directory_structure(filename)
-        save_state(namenode)
+        if policy:
+            # Cada celda se guarda una sola vez; la paridad da la tolerancia a fallos
+            edit.update(replication=1, block_size=policy.group_size(namenode.block_size), ec_policy=policy.name)
+        if codec:
+            edit["codec"] = codec
+        await namenode.commit_edit(edit)
+        lease_id = namenode.leases.grant(filename)
+        return {
+            "filename": filename,
+            "lease_id": lease_id,
+            "block_size": edit["block_size"],
+            "ec_policy": policy.to_dict() if policy else None,
+            "codec": codec
+        }
+
+    @app.post("/files/addblock")
+    async def add_block(filename: str, lease_id: str, count: int = 1):
+        """Asigna los siguientes ``count`` bloques de un archivo en construcción"""
+        namenode.check_lease(filename, lease_id)
+        file_node = namenode.namespace.get_under_construction(filename)
+        blocks = await namenode.allocate(min(max(count, 1), MAX_BLOCKS_PER_REQUEST), file_node.ec_policy)
+        # El lease pudo expirar mientras se asignaban los bloques
+        namenode.check_lease(filename, lease_id)
+        await namenode.commit_edit({"op": "add_blocks", "path": filename, "blocks": blocks})
         return {"filename": filename, "blocks": blocks}
 
+    @app.post("/files/adddigests")
+    async def add_digests(payload: dict = Body(...)):
+        """Agrega bloques direccionados por contenido a un archivo en construcción.
+
+        El cliente envía el digest de cada bloque y solo sube los que vuelven
+        con ``exists`` en falso; los demás ya están guardados en el clúster y
+        el archivo suma una referencia a ellos.
+        """
+        filename = payload["filename"]
+        lease_id = payload["lease_id"]
+        digests = payload["digests"]
+        namenode.check_lease(filename, lease_id)
+        file_node = namenode.namespace.get_under_construction(filename)
+        if file_node.ec_policy or file_node.codec:
+            raise ValueError("La deduplicación solo admite archivos replicados y sin compresión")
+        if not 0 < len(digests) <= MAX_BLOCKS_PER_REQUEST or not all(is_digest(digest) for digest in digests):
+            raise ValueError("Lista de digests inválida")
+        new = [digest for digest in dict.fromkeys(digests) if digest not in namenode.namespace.digests]
+        blocks = await namenode.allocate(len(new))
+        for block, digest in zip(blocks, new):
+            block["block_id"] = digest
+        namenode.check_lease(filename, lease_id)
+        # Otro escritor pudo registrar los mismos digests mientras se asignaban los bloques
+        blocks = [block for block in blocks if block["block_id"] not in namenode.namespace.digests]
+        await namenode.commit_edit({"op": "add_digests", "path": filename, "digests": digests, "blocks": blocks})
+
+        reply = []
+        for digest in digests:
+            shared = namenode.namespace.digests[digest]
+            # Un bloque que otro archivo aún está subiendo se sube también: su escritor podría fallar
+            exists = digest not in new and not shared.under_construction
+            reply.append(dict(namenode.block_locations(shared.blocks[0]), exists=exists))
+        return {"filename": filename, "blocks": reply}
+
+    @app.post("/files/renew")
+    async def renew_lease(filename: str, lease_id: str):
+        namenode.check_lease(filename, lease_id)
+        return {"filename": filename, "lease_id": lease_id}
+
+    @app.post("/files/complete")
+    async def complete_file(filename: str, lease_id: str, size: int):
+        """Fija el tamaño final, libera los bloques sobrantes y cierra el lease"""
+        namenode.check_lease(filename, lease_id)
+        await namenode.commit_edit({"op": "complete", "path": filename, "size": size, "mtime": time.time()})
+        namenode.leases.release(filename)
+        return {"filename": filename, "size": size}
+
+    @app.get("/files/{path:path}")
+    async def get_file(path: str):
+        file_node = namenode.namespace.get_file(path)
+        if file_node.under_construction:
+            raise HTTPException(status_code=409, detail=f"El archivo {path} está en construcción")
+        info = file_node.to_dict()
+        info["blocks"] = [namenode.block_locations(namenode.namespace.locate(block)) for block in file_node.blocks]
+        if file_node.ec_policy:
+            info["ec_policy"] = get_policy(file_node.ec_policy).to_dict()
+        info["lease"] = METADATA_LEASE
+        return info
+
+    @app.post("/containers/open")
+    async def open_container():
+        """Asigna un bloque contenedor para empaquetar archivos pequeños y concede su lease"""
+        block = (await namenode.allocate(1))[0]
+        await namenode.commit_edit({
+            "op": "open_container",
+            "block": block,
+            "replication": namenode.replication_factor,
+            "block_size": namenode.block_size,
+            "mtime": time.time()
+        })
+        lease_id = namenode.leases.grant(block["block_id"])
+        return {"block": block, "lease_id": lease_id, "block_size": namenode.block_size}
+
+    @app.post("/containers/commit")
+    async def commit_container(payload: dict = Body(...)):
+        """Crea de una vez los archivos guardados en un contenedor, con su offset y tamaño en él"""
+        block_id = payload["block_id"]
+        namenode.check_lease(block_id, payload["lease_id"])
+        files = [{"path": entry["path"], "offset": entry["offset"], "size": entry["size"]} for entry in payload["files"]]
+        size = max((entry["offset"] + entry["size"] for entry in files), default=0)
+        await namenode.commit_edit({"op": "pack", "block_id": block_id, "size": size, "files": files, "mtime": time.time()})
+        namenode.leases.release(block_id)
+        return {"block_id": block_id, "files": len(files), "size": size}
+
+    @app.delete("/containers")
+    async def abandon_container(block_id: str, lease_id: str):
+        namenode.check_lease(block_id, lease_id)
+        await namenode.commit_edit({"op": "abandon_container", "block_id": block_id})
+        namenode.leases.release(block_id)
+        return {"block_id": block_id}
+
+    @app.delete("/files")
+    async def delete_file(path: str):
+        await namenode.commit_edit({"op": "delete", "path": path, "mtime": time.time()})
+        namenode.leases.release(path)
+        return {"message": f"Archivo {path} eliminado"}
+
     @app.post("/directory")
     async def create_directory(path: str):
-        namenode.update_directory_structure(path, is_directory=True)
-        save_state(namenode)
+        await namenode.commit_edit({"op": "mkdir", "path": path, "mtime": time.time()})
         return {"message": f"Directory {path} created"}
 
     @app.get("/ls/{path:path}")
-    async def list_directory(path: str):
-        current = namenode.directory_structure
-        for part in path.strip('/').split('/'):
-            if part:
-                if part not in current:
-                    raise HTTPException(status_code=404, detail="Path not found")
-                current = current[part]
-        return {"contents": current}
+    async def list_directory(path: str, start_after: str = None, limit: int = 1000):
+        # Solo el nivel pedido y una página: no se serializa el subárbol
+        node, entries, next_marker = namenode.namespace.list(path, start_after, min(max(limit, 0), 10000))
+        return {
+            "path": "/" + path.strip("/"),
+            "type": node["type"],
+            "entries": entries,
+            "next": next_marker,
+            "lease": METADATA_LEASE
+        }
+
+    @app.get("/ecpolicies")
+    async def list_ec_policies():
+        return {"policies": [policy.to_dict() for policy in POLICIES.values()]}
+
+    @app.get("/ecpolicy/{path:path}")
+    async def get_ec_policy(path: str):
+        """Política efectiva de una ruta: la del archivo o la heredada de sus directorios"""
+        node = namenode.namespace.resolve(path)
+        if node is None:
+            raise FileNotFoundError(f"Ruta no encontrada: {path}")
+        policy = node.ec_policy if not node.is_directory else namenode.namespace.ec_policy_for(path)
+        return {"path": "/" + path.strip("/"), "ec_policy": policy}
+
+    @app.post("/ecpolicy")
+    async def set_ec_policy(path: str, policy: str = None):
+        """Fija la política de erasure coding de un directorio; sin ``policy`` la quita"""
+        get_policy(policy)
+        await namenode.commit_edit({"op": "set_ec_policy", "path": path, "policy": policy or None})
+        return {"path": path, "ec_policy": policy or None}
     
     @app.delete("/directory")
     async def delete_directory(path: str):
-        # Navegar hasta el directorio padre
-        current = namenode.directory_structure
-        parts = path.strip('/').split('/')
-        for i, part in enumerate(parts):
-            if i == len(parts) - 1:
-                # Eliminar el directorio si existe
-                if part in current and isinstance(current[part], dict):
-                    del current[part]
-                    save_state(namenode)
-                    return {"message": f"Directorio {path} eliminado"}
-                else:
-                    raise HTTPException(status_code=404, detail="Directorio no encontrado")
-            if part not in current or not isinstance(current[part], dict):
-                raise HTTPException(status_code=404, detail="Ruta no encontrada")
-            current = current[part]
+        # Si la ruta no existe, apply_edit rechaza la edición y la excepción llega como error HTTP
+        await namenode.commit_edit({"op": "rmdir", "path": path, "mtime": time.time()})
+        return {"message": f"Directorio {path} eliminado"}
+
+    # Errores del árbol de nombres
+    @app.exception_handler(FileNotFoundError)
+    async def not_found(request: Request, exc: FileNotFoundError):
+        return JSONResponse(status_code=404, content={"detail": str(exc)})
+
+    @app.exception_handler(FileExistsError)
+    async def already_exists(request: Request, exc: FileExistsError):
+        return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+    @app.exception_handler(NotADirectoryError)
+    @app.exception_handler(IsADirectoryError)
+    @app.exception_handler(ValueError)
+    async def invalid_path(request: Request, exc: Exception):
+        return JSONResponse(status_code=400, content={"detail": str(exc)})
     
     # Iniciar servidor
     config = uvicorn.Config(app, host=host, port=port)
@@ -183,11 +630,12 @@ def main():
     parser.add_argument('--host', default="0.0.0.0", help='Host address to bind to')
     parser.add_argument('--port', type=int, required=True, help='Port to listen on')
     parser.add_argument('--config', help='Path to configuration file')
+    parser.add_argument('--metadata-dir', default=METADATA_DIR, help='Directory for the edit log and checkpoints')
     
     args = parser.parse_args()
     
     # Iniciar el servidor
-    asyncio.run(run_server(args.host, args.port, args.config))
+    asyncio.run(run_server(args.host, args.port, args.config, args.metadata_dir))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
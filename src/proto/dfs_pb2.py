@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tdfs.proto\x12\x03\x64\x66s\"W\n\tBlockData\x12\x10\n\x08\x62lock_id\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\x12\x13\n\x0bsource_node\x18\x03 \x01(\t\x12\x15\n\rreplica_nodes\x18\x04 \x03(\t\" \n\x0c\x42lockRequest\x12\x10\n\x08\x62lock_id\x18\x01 \x01(\t\"1\n\rBlockResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"9\n\rLeaderRequest\x12\x10\n\x08\x62lock_id\x18\x01 \x01(\t\x12\x16\n\x0e\x66ollower_nodes\x18\x02 \x03(\t\"2\n\x0eLeaderResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t2\x9f\x02\n\x0b\x46ileService\x12\x32\n\x08PutBlock\x12\x0e.dfs.BlockData\x1a\x12.dfs.BlockResponse\"\x00(\x01\x12\x31\n\x08GetBlock\x12\x11.dfs.BlockRequest\x1a\x0e.dfs.BlockData\"\x00\x30\x01\x12\x38\n\x0eReplicateBlock\x12\x0e.dfs.BlockData\x1a\x12.dfs.BlockResponse\"\x00(\x01\x12\x34\n\tSyncBlock\x12\x11.dfs.BlockRequest\x1a\x12.dfs.BlockResponse\"\x00\x12\x39\n\x0c\x42\x65\x63omeLeader\x12\x12.dfs.LeaderRequest\x1a\x13.dfs.LeaderResponse\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tdfs.proto\x12\x03\x64\x66s\"{\n\tBlockData\x12\x10\n\x08\x62lock_id\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\x12\x13\n\x0bsource_node\x18\x03 \x01(\t\x12\x15\n\rreplica_nodes\x18\x04 \x03(\t\x12\x15\n\x08\x63hecksum\x18\x05 \x01(\rH\x00\x88\x01\x01\x42\x0b\n\t_checksum\"V\n\x0c\x42lockRequest\x12\x10\n\x08\x62lock_id\x18\x01 \x01(\t\x12\x0e\n\x06offset\x18\x02 \x01(\x03\x12\x0e\n\x06length\x18\x03 \x01(\x03\x12\x14\n\x0ctarget_nodes\x18\x04 \x03(\t\"1\n\rBlockResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"9\n\rLeaderRequest\x12\x10\n\x08\x62lock_id\x18\x01 \x01(\t\x12\x16\n\x0e\x66ollower_nodes\x18\x02 \x03(\t\"2\n\x0eLeaderResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"\"\n\x0bPingRequest\x12\x13\n\x0bsource_node\x18\x01 \x01(\t\"\x1f\n\x0cPingResponse\x12\x0f\n\x07node_id\x18\x01 \x01(\t2\xce\x02\n\x0b\x46ileService\x12\x32\n\x08PutBlock\x12\x0e.dfs.BlockData\x1a\x12.dfs.BlockResponse\"\x00(\x01\x12\x31\n\x08GetBlock\x12\x11.dfs.BlockRequest\x1a\x0e.dfs.BlockData\"\x00\x30\x01\x12\x38\n\x0eReplicateBlock\x12\x0e.dfs.BlockData\x1a\x12.dfs.BlockResponse\"\x00(\x01\x12\x34\n\tSyncBlock\x12\x11.dfs.BlockRequest\x1a\x12.dfs.BlockResponse\"\x00\x12\x39\n\x0c\x42\x65\x63omeLeader\x12\x12.dfs.LeaderRequest\x1a\x13.dfs.LeaderResponse\"\x00\x12-\n\x04Ping\x12\x10.dfs.PingRequest\x1a\x11.dfs.PingResponse\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -32,15 +32,19 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'dfs_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_BLOCKDATA']._serialized_start=18
-  _globals['_BLOCKDATA']._serialized_end=105
-  _globals['_BLOCKREQUEST']._serialized_start=107
-  _globals['_BLOCKREQUEST']._serialized_end=139
-  _globals['_BLOCKRESPONSE']._serialized_start=141
-  _globals['_BLOCKRESPONSE']._serialized_end=190
-  _globals['_LEADERREQUEST']._serialized_start=192
-  _globals['_LEADERREQUEST']._serialized_end=249
-  _globals['_LEADERRESPONSE']._serialized_start=251
-  _globals['_LEADERRESPONSE']._serialized_end=301
-  _globals['_FILESERVICE']._serialized_start=304
-  _globals['_FILESERVICE']._serialized_end=591
+  _globals['_BLOCKDATA']._serialized_end=141
+  _globals['_BLOCKREQUEST']._serialized_start=143
+  _globals['_BLOCKREQUEST']._serialized_end=229
+  _globals['_BLOCKRESPONSE']._serialized_start=231
+  _globals['_BLOCKRESPONSE']._serialized_end=280
+  _globals['_LEADERREQUEST']._serialized_start=282
+  _globals['_LEADERREQUEST']._serialized_end=339
+  _globals['_LEADERRESPONSE']._serialized_start=341
+  _globals['_LEADERRESPONSE']._serialized_end=391
+  _globals['_PINGREQUEST']._serialized_start=393
+  _globals['_PINGREQUEST']._serialized_end=427
+  _globals['_PINGRESPONSE']._serialized_start=429
+  _globals['_PINGRESPONSE']._serialized_end=460
+  _globals['_FILESERVICE']._serialized_start=463
+  _globals['_FILESERVICE']._serialized_end=797
 # @@protoc_insertion_point(module_scope)
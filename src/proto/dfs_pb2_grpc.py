@@ -59,6 +59,11 @@ class FileServiceStub(object):
                 request_serializer=dfs__pb2.LeaderRequest.SerializeToString,
                 response_deserializer=dfs__pb2.LeaderResponse.FromString,
                 _registered_method=True)
+        self.Ping = channel.unary_unary(
+                '/dfs.FileService/Ping',
+                request_serializer=dfs__pb2.PingRequest.SerializeToString,
+                response_deserializer=dfs__pb2.PingResponse.FromString,
+                _registered_method=True)
 
 
 class FileServiceServicer(object):
@@ -96,6 +101,13 @@ class FileServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def Ping(self, request, context):
+        """Medición del RTT entre DataNodes
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_FileServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -124,6 +136,11 @@ def add_FileServiceServicer_to_server(servicer, server):
                     request_deserializer=dfs__pb2.LeaderRequest.FromString,
                     response_serializer=dfs__pb2.LeaderResponse.SerializeToString,
             ),
+            'Ping': grpc.unary_unary_rpc_method_handler(
+                    servicer.Ping,
+                    request_deserializer=dfs__pb2.PingRequest.FromString,
+                    response_serializer=dfs__pb2.PingResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'dfs.FileService', rpc_method_handlers)
@@ -269,3 +286,30 @@ class FileService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def Ping(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/dfs.FileService/Ping',
+            dfs__pb2.PingRequest.SerializeToString,
+            dfs__pb2.PingResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)